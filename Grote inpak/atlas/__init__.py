@@ -0,0 +1,250 @@
+"""
+Atlas pipeline modules voor de Grote inpak Streamlit applicatie.
+
+De submodules worden pas bij het eerste gebruik van een naam geïmporteerd
+(module `__getattr__`), zodat `import atlas` de cold start van de app niet
+belast met modules die een run niet nodig heeft (http.server, sqlite3, ...).
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from .backlog import backlog_counts, belgian_holidays, compute_backlog
+    from .batch import run_batch, snapshot_store, stock_history
+    from .exports import EXPORT_FORMATS, ExportCache, export_bytes, filter_key, get_export_cache
+    from .forecast import ForecastData, ForecastStore, get_forecast_store, weekly_demand
+    from .incremental import IncrementalOverview, get_incremental_overview
+    from .load_planner import LoadPlan, TruckSpec, case_dimensions, plan_loads
+    from .lookup_service import LookupIndex, LookupService, get_lookup_service
+    from .metrics_cache import DashboardAggregates, MetricsMemo, dashboard_aggregates, get_metrics_memo
+    from .packed_archive import PackedArchive, get_packed_archive, packed_archive_loader
+    from .packed_index import PackedCaseIndex, get_packed_index, invalidate_packed_index
+    from .paging import PAGE_SIZES, Page, SortIndex, get_sort_index, paginate
+    from .pipeline import build_frames
+    from .po_inbox import POInbox, get_po_inbox, join_purchase_orders, parse_po_file
+    from .profiling import PipelineProfiler, PipelineRun, get_profiler
+    from .rack_index import RackIndex, get_rack_index, size_classes
+    from .row_hash import FrameDelta, HashLedger, get_hash_ledger, row_hashes
+    from .schema import compact_dtypes, memory_report
+    from .shared_dataset import Dataset, DatasetRegistry, apply_overlays, get_dataset_registry
+    from .snapshot import SnapshotStore, file_fingerprint, project_input_files, project_path
+    from .state_store import StateStore, diff_state, get_state_store
+    from .stock_history import StockHistory, get_stock_history, stock_files_key
+    from .stock_index import STOCK_SITES, StockIndex, get_stock_index
+    from .sync_worker import (
+        ConnectionPool,
+        SyncStatus,
+        SyncWorker,
+        UpsertSink,
+        database_sync_job,
+        frames_sync_job,
+        get_sync_worker,
+        get_upsert_sink,
+    )
+    from .validation import (
+        ValidatedFrameCache,
+        bytes_source_key,
+        file_source_key,
+        get_validated_cache,
+        validate_frame,
+    )
+    from .watcher import InputWatcher, WatcherStatus, get_input_watcher
+
+__all__ = [
+    "backlog_counts",
+    "belgian_holidays",
+    "compute_backlog",
+    "run_batch",
+    "snapshot_store",
+    "stock_history",
+    "EXPORT_FORMATS",
+    "ExportCache",
+    "export_bytes",
+    "filter_key",
+    "get_export_cache",
+    "ForecastData",
+    "ForecastStore",
+    "get_forecast_store",
+    "weekly_demand",
+    "IncrementalOverview",
+    "get_incremental_overview",
+    "LoadPlan",
+    "TruckSpec",
+    "case_dimensions",
+    "plan_loads",
+    "LookupIndex",
+    "LookupService",
+    "get_lookup_service",
+    "DashboardAggregates",
+    "MetricsMemo",
+    "dashboard_aggregates",
+    "get_metrics_memo",
+    "PackedArchive",
+    "get_packed_archive",
+    "packed_archive_loader",
+    "PackedCaseIndex",
+    "get_packed_index",
+    "invalidate_packed_index",
+    "PAGE_SIZES",
+    "Page",
+    "SortIndex",
+    "get_sort_index",
+    "paginate",
+    "build_frames",
+    "POInbox",
+    "get_po_inbox",
+    "join_purchase_orders",
+    "parse_po_file",
+    "PipelineProfiler",
+    "PipelineRun",
+    "get_profiler",
+    "RackIndex",
+    "get_rack_index",
+    "size_classes",
+    "FrameDelta",
+    "HashLedger",
+    "get_hash_ledger",
+    "row_hashes",
+    "compact_dtypes",
+    "memory_report",
+    "Dataset",
+    "DatasetRegistry",
+    "apply_overlays",
+    "get_dataset_registry",
+    "SnapshotStore",
+    "file_fingerprint",
+    "project_input_files",
+    "project_path",
+    "StateStore",
+    "diff_state",
+    "get_state_store",
+    "StockHistory",
+    "get_stock_history",
+    "stock_files_key",
+    "STOCK_SITES",
+    "StockIndex",
+    "get_stock_index",
+    "ConnectionPool",
+    "SyncStatus",
+    "SyncWorker",
+    "UpsertSink",
+    "database_sync_job",
+    "frames_sync_job",
+    "get_sync_worker",
+    "get_upsert_sink",
+    "ValidatedFrameCache",
+    "bytes_source_key",
+    "file_source_key",
+    "get_validated_cache",
+    "validate_frame",
+    "InputWatcher",
+    "WatcherStatus",
+    "get_input_watcher",
+]
+
+# naam -> submodule
+_EXPORTS: Dict[str, str] = {
+    "backlog_counts": "backlog",
+    "belgian_holidays": "backlog",
+    "compute_backlog": "backlog",
+    "run_batch": "batch",
+    "snapshot_store": "batch",
+    "stock_history": "batch",
+    "EXPORT_FORMATS": "exports",
+    "ExportCache": "exports",
+    "export_bytes": "exports",
+    "filter_key": "exports",
+    "get_export_cache": "exports",
+    "ForecastData": "forecast",
+    "ForecastStore": "forecast",
+    "get_forecast_store": "forecast",
+    "weekly_demand": "forecast",
+    "IncrementalOverview": "incremental",
+    "get_incremental_overview": "incremental",
+    "LoadPlan": "load_planner",
+    "TruckSpec": "load_planner",
+    "case_dimensions": "load_planner",
+    "plan_loads": "load_planner",
+    "LookupIndex": "lookup_service",
+    "LookupService": "lookup_service",
+    "get_lookup_service": "lookup_service",
+    "DashboardAggregates": "metrics_cache",
+    "MetricsMemo": "metrics_cache",
+    "dashboard_aggregates": "metrics_cache",
+    "get_metrics_memo": "metrics_cache",
+    "PackedArchive": "packed_archive",
+    "get_packed_archive": "packed_archive",
+    "packed_archive_loader": "packed_archive",
+    "PackedCaseIndex": "packed_index",
+    "get_packed_index": "packed_index",
+    "invalidate_packed_index": "packed_index",
+    "PAGE_SIZES": "paging",
+    "Page": "paging",
+    "SortIndex": "paging",
+    "get_sort_index": "paging",
+    "paginate": "paging",
+    "build_frames": "pipeline",
+    "POInbox": "po_inbox",
+    "get_po_inbox": "po_inbox",
+    "join_purchase_orders": "po_inbox",
+    "parse_po_file": "po_inbox",
+    "PipelineProfiler": "profiling",
+    "PipelineRun": "profiling",
+    "get_profiler": "profiling",
+    "RackIndex": "rack_index",
+    "get_rack_index": "rack_index",
+    "size_classes": "rack_index",
+    "FrameDelta": "row_hash",
+    "HashLedger": "row_hash",
+    "get_hash_ledger": "row_hash",
+    "row_hashes": "row_hash",
+    "compact_dtypes": "schema",
+    "memory_report": "schema",
+    "Dataset": "shared_dataset",
+    "DatasetRegistry": "shared_dataset",
+    "apply_overlays": "shared_dataset",
+    "get_dataset_registry": "shared_dataset",
+    "SnapshotStore": "snapshot",
+    "file_fingerprint": "snapshot",
+    "project_input_files": "snapshot",
+    "project_path": "snapshot",
+    "StateStore": "state_store",
+    "diff_state": "state_store",
+    "get_state_store": "state_store",
+    "StockHistory": "stock_history",
+    "get_stock_history": "stock_history",
+    "stock_files_key": "stock_history",
+    "STOCK_SITES": "stock_index",
+    "StockIndex": "stock_index",
+    "get_stock_index": "stock_index",
+    "ConnectionPool": "sync_worker",
+    "SyncStatus": "sync_worker",
+    "SyncWorker": "sync_worker",
+    "UpsertSink": "sync_worker",
+    "database_sync_job": "sync_worker",
+    "frames_sync_job": "sync_worker",
+    "get_sync_worker": "sync_worker",
+    "get_upsert_sink": "sync_worker",
+    "ValidatedFrameCache": "validation",
+    "bytes_source_key": "validation",
+    "file_source_key": "validation",
+    "get_validated_cache": "validation",
+    "validate_frame": "validation",
+    "InputWatcher": "watcher",
+    "WatcherStatus": "watcher",
+    "get_input_watcher": "watcher",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *__all__})
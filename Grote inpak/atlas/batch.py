@@ -0,0 +1,201 @@
+"""
+Headless batch pipeline die overview snapshots voorberekent.
+
+Draait dezelfde stages als de app (laden, valideren, stock,
+build_overview, metrics, backlog, database sync) zonder Streamlit en
+schrijft het resultaat als snapshot (zie `atlas.snapshot`). De app laadt
+die snapshot zolang de inputbestanden niet gewijzigd zijn.
+
+Gebruik (bv. via cron of Windows Task Scheduler):
+    python -m atlas.batch
+    python -m atlas.batch --interval 15     # elke 15 minuten, blijft draaien
+"""
+
+import argparse
+import logging
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Optional
+
+from .backlog import backlog_counts, compute_backlog
+from .packed_archive import packed_archive_loader
+from .packed_index import get_packed_index
+from .pipeline import build_frames
+from .profiling import PipelineProfiler, get_profiler
+from .rack_index import get_rack_index
+from .snapshot import SnapshotStore, file_fingerprint, project_input_files, project_path
+from .stock_history import StockHistory, get_stock_history, stock_files_key
+from .sync_worker import database_sync_job
+from .validation import file_source_key, get_validated_cache, validation_messages
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+def snapshot_store(config: Any) -> SnapshotStore:
+    """Snapshot directory shared by the batch pipeline and the app."""
+    return SnapshotStore(getattr(config, "SNAPSHOT_DIR", None) or Path(config.REPO_DIR) / "cache" / "snapshots")
+
+
+def stock_history(config: Any) -> StockHistory:
+    """Stock history directory shared by the batch pipeline and the app."""
+    return get_stock_history(getattr(config, "STOCK_HISTORY_DIR", None) or Path(config.REPO_DIR) / "cache" / "stock_history")
+
+
+def run_batch(
+    config: Any,
+    store: SnapshotStore,
+    profiler: PipelineProfiler,
+    sync: bool = True,
+    force: bool = False,
+) -> Optional[str]:
+    """
+    Run the pipeline once on the project files and write a snapshot.
+
+    Returns:
+        The new snapshot version, or None when the latest snapshot already
+        matches the current input files (and `force` is not set)
+    """
+    from scripts.build_overview import (
+        build_overview,
+        find_pils_csv,
+        load_packed_archive,
+        read_erp,
+        read_pils,
+        read_stock_files,
+        sync_to_database,
+    )
+    from utils import DataValidator, MetricsCalculator
+
+    repo_dir = Path(config.REPO_DIR)
+    pils_path = find_pils_csv(repo_dir)
+    key = "project:" + file_fingerprint(project_input_files(repo_dir, pils_path))
+    if not force and store.find(key):
+        logger.info("Snapshot voor %s is up-to-date", key)
+        return None
+
+    with profiler.run("batch"):
+        with profiler.stage("load_and_validate_data"):
+            # Zelfde cache als de app: ongewijzigde inputs worden niet opnieuw gevalideerd
+            cache = get_validated_cache(repo_dir / "cache" / "validated")
+            erp_path = project_path(repo_dir, "ERP link.xlsx")
+            validation = {}
+            frames_in = {}
+            for kind, path, read in (("pils", pils_path, read_pils), ("erp", erp_path, read_erp)):
+                frames_in[kind], result, hit = cache.load(
+                    kind,
+                    file_source_key(path),
+                    lambda read=read, path=path: read(path),
+                    lambda df, kind=kind: DataValidator.clean_dataframe(df, kind)
+                )
+                profiler.cache_event(kind, hit)
+                valid, errors, warnings = result
+                validation[kind] = {"valid": valid, "errors": len(errors), "warnings": len(warnings)}
+                for message in validation_messages(result):
+                    logger.warning("%s validatie: %s", kind, message)
+            df_pils, df_erp = frames_in["pils"], frames_in["erp"]
+
+        stock_dir = project_path(repo_dir, "stock files")
+        with profiler.stage("read_stock_files"):
+            df_stock = read_stock_files(stock_dir, df_erp, use_cache=True)
+
+        with profiler.stage("record_stock_history"):
+            try:
+                source, taken_at = stock_files_key(stock_dir)
+                stock_history(config).record(df_stock, taken_at, source)
+            except Exception:
+                logger.exception("Stock historiek niet bijgewerkt")
+
+        frames, raw_mb = build_frames(
+            df_pils,
+            df_erp,
+            df_stock,
+            build_overview,
+            profiler,
+            verify=getattr(config, "VERIFY_INCREMENTAL_OVERVIEW", False)
+        )
+
+        with profiler.stage("metrics"):
+            metrics = MetricsCalculator.calculate_executive_metrics(frames["overview"], frames["transport"])
+
+        with profiler.stage("backlog"):
+            backlog = compute_backlog(
+                frames["overview"],
+                extra_holidays=getattr(config, "EXTRA_HOLIDAYS", ()),
+                excluded_holidays=getattr(config, "WORKED_HOLIDAYS", ())
+            )
+            packed_dir = project_path(repo_dir, "packed files")
+            try:
+                loader = packed_archive_loader(packed_dir, repo_dir / "cache" / "packed_archive", seed=load_packed_archive)
+                packed = get_packed_index(packed_dir, loader)
+                backlog = packed.exclude_packed(backlog)
+            except Exception:
+                packed = None
+                logger.exception("Packed archief niet beschikbaar; backlog zonder uitsluiting")
+            if packed is not None:
+                try:
+                    # Gepackte cases geven hun rekslot vrij (enkel de verschillen)
+                    racks = get_rack_index(repo_dir / "cache" / "rack_index.sqlite", getattr(config, "KANBAN_RACKS", None))
+                    racks.release_packed(packed)
+                except Exception:
+                    logger.exception("Rekslots van gepackte cases niet vrijgegeven")
+            frames["backlog"] = backlog
+
+        with profiler.stage("write_snapshot"):
+            version = store.write(key, frames, meta={
+                "metrics": metrics,
+                "backlog_counts": backlog_counts(backlog),
+                "backlog_date": date.today().isoformat(),
+                "raw_memory_mb": raw_mb,
+                "validation": validation,
+            })
+
+        if sync:
+            with profiler.stage("sync_to_database"):
+                database_sync_job(
+                    df_pils,
+                    df_erp,
+                    frames["df_stock"],
+                    getattr(config, "SYNC_DATABASE_URL", None),
+                    repo_dir / "cache" / "sync_hashes",
+                    sync_to_database
+                )()
+
+    logger.info("Snapshot %s geschreven (%d cases)", version, len(frames["overview"]))
+    return version
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interval", type=float, default=None, help="Minuten tussen runs; zonder deze optie één run")
+    parser.add_argument("--force", action="store_true", help="Ook bouwen als de snapshot al up-to-date is")
+    parser.add_argument("--no-sync", action="store_true", help="Database sync overslaan")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    for path in (APP_DIR.parent, APP_DIR):
+        if str(path) not in sys.path:
+            sys.path.append(str(path))
+    from config import AppConfig
+
+    config = AppConfig.get_config()
+    store = snapshot_store(config)
+    profiler = get_profiler(Path(config.REPO_DIR) / "cache" / "logs" / "pipeline_timings.jsonl")
+
+    while True:
+        try:
+            run_batch(config, store, profiler, sync=not args.no_sync, force=args.force)
+        except Exception:
+            logger.exception("Batch run mislukt")
+            if args.interval is None:
+                return 1
+        if args.interval is None:
+            return 0
+        time.sleep(args.interval * 60)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,228 @@
+"""
+Benchmark suite voor de Atlas overview pipeline.
+
+Meet `read_pils`, `read_erp`, `read_stock_files`, `build_overview` en
+`MetricsCalculator.calculate_executive_metrics` op synthetische bestanden
+(1x, 10x, 100x het huidige volume), en de Atlas stages (compacte dtypes,
+backlog, overlays, dashboard aggregaten, stock index) op een synthetische
+overview in geheugen, zodat die ook zonder `build_overview` gemeten
+worden. Tijd (mediaan
+over de herhalingen) en piekgeheugen (tracemalloc) worden vergeleken met
+opgeslagen baselines; een regressie boven de tolerantie geeft exit code 1.
+De baselines zijn machine-specifiek en staan niet in git: neem ze op met
+`--update-baseline` op de machine die vergelijkt.
+
+Gebruik:
+    python -m atlas.benchmark --scales 1 10
+    python -m atlas.benchmark --scales 1 10 100 --update-baseline
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .backlog import compute_backlog
+from .metrics_cache import dashboard_aggregates
+from .schema import compact_dtypes
+from .shared_dataset import apply_overlays
+from .stock_index import StockIndex
+from .synthetic import generate_dataset, generate_frames
+
+APP_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_DIR = APP_DIR / "cache" / "benchmark"
+DEFAULT_BASELINE = APP_DIR / "benchmarks" / "baselines.json"
+
+# Kleine absolute verschillen zijn ruis, geen regressie
+_MIN_DELTA_SECONDS = 0.05
+_MIN_DELTA_MB = 5.0
+
+
+def _measure(fn: Callable[[], Any], repeat: int) -> Tuple[Any, float, float]:
+    """Median wall time over `repeat` runs plus the peak traced memory of one extra run."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, statistics.median(durations), peak / 1024 / 1024
+
+
+def run_suite(data_dir: Path, scale: float, repeat: int = 3, seed: int = 0) -> pd.DataFrame:
+    """
+    Run all benchmarks on the synthetic dataset for `scale`.
+
+    Benchmarks whose code is not importable, or whose input could not be
+    produced, are reported as skipped instead of failing the suite. The
+    Atlas stages run on `generate_frames` and are always measured.
+
+    Returns:
+        DataFrame with benchmark, scale, seconds, peak_mb and status columns
+    """
+    paths = generate_dataset(data_dir / f"{scale:g}x", scale=scale, seed=seed)
+    frames = generate_frames(scale=scale, seed=seed)
+    labels = frames["overview"]["case_label"].iloc[::10]
+    state = {
+        "status_map": dict.fromkeys(labels, "Klaar"),
+        "priorities": dict.fromkeys(labels.iloc[::2], True),
+        "comments": dict.fromkeys(labels, "benchmark"),
+    }
+    rows: List[Dict[str, Any]] = []
+    outputs: Dict[str, Any] = {}
+
+    try:
+        from scripts.build_overview import build_overview, read_erp, read_pils, read_stock_files
+    except ImportError as exc:
+        build_overview = read_erp = read_pils = read_stock_files = None
+        import_error = f"scripts.build_overview niet beschikbaar: {exc}"
+    try:
+        from utils import MetricsCalculator
+    except ImportError as exc:
+        MetricsCalculator = None
+        metrics_error = f"utils niet beschikbaar: {exc}"
+
+    benchmarks: Sequence[Tuple[str, Callable[[], Any], Sequence[str], Optional[str]]] = (
+        ("read_pils", lambda: read_pils(paths["pils"]), (), None if read_pils else import_error),
+        ("read_erp", lambda: read_erp(paths["erp"]), (), None if read_erp else import_error),
+        (
+            "read_stock_files",
+            lambda: read_stock_files(paths["stock_dir"], outputs["read_erp"], use_cache=False),
+            ("read_erp",),
+            None if read_stock_files else import_error,
+        ),
+        (
+            "build_overview",
+            lambda: build_overview(
+                outputs["read_pils"], outputs["read_erp"], df_stock=outputs["read_stock_files"], comments_map={}
+            ),
+            ("read_pils", "read_erp", "read_stock_files"),
+            None if build_overview else import_error,
+        ),
+        (
+            "calculate_executive_metrics",
+            lambda: MetricsCalculator.calculate_executive_metrics(*outputs["build_overview"]),
+            ("build_overview",),
+            None if MetricsCalculator else metrics_error,
+        ),
+        ("compact_dtypes", lambda: compact_dtypes(frames["overview"]), (), None),
+        ("compute_backlog", lambda: compute_backlog(frames["overview"]), (), None),
+        ("apply_overlays", lambda: apply_overlays(frames["overview"], **state), (), None),
+        ("dashboard_aggregates", lambda: dashboard_aggregates(frames["overview"], frames["transport"]), (), None),
+        ("stock_index", lambda: StockIndex(frames["df_stock"]), (), None),
+    )
+
+    for name, fn, needs, skip_reason in benchmarks:
+        missing = [n for n in needs if n not in outputs]
+        if skip_reason is None and missing:
+            skip_reason = f"geen input van {', '.join(missing)}"
+        row = {"benchmark": name, "scale": scale, "seconds": None, "peak_mb": None, "status": "ok"}
+        if skip_reason:
+            row["status"] = f"skipped: {skip_reason}"
+        else:
+            try:
+                outputs[name], row["seconds"], row["peak_mb"] = _measure(fn, repeat)
+            except Exception as exc:
+                row["status"] = f"error: {type(exc).__name__}: {exc}"
+        rows.append(row)
+    return pd.DataFrame(rows, columns=["benchmark", "scale", "seconds", "peak_mb", "status"])
+
+
+def load_baselines(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baselines(path: Path, results: pd.DataFrame) -> None:
+    """Store the measured results as the new baseline, keeping other scales."""
+    baselines = load_baselines(path)
+    for row in results.itertuples(index=False):
+        if row.status != "ok":
+            continue
+        baselines.setdefault(f"{row.scale:g}x", {})[row.benchmark] = {
+            "seconds": round(row.seconds, 4),
+            "peak_mb": round(row.peak_mb, 2),
+        }
+    baselines["_meta"] = {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "updated": pd.Timestamp.now().isoformat(timespec="seconds"),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def compare(
+    results: pd.DataFrame,
+    baselines: Dict[str, Any],
+    time_tolerance: float = 0.25,
+    memory_tolerance: float = 0.25,
+) -> pd.DataFrame:
+    """
+    Add baseline columns and a regression flag to `results`.
+
+    A benchmark regresses when time or peak memory exceeds its baseline by
+    more than the tolerance and by more than a small absolute margin.
+    """
+    compared = results.copy()
+    base = [baselines.get(f"{r.scale:g}x", {}).get(r.benchmark, {}) for r in results.itertuples(index=False)]
+    compared["base_seconds"] = [b.get("seconds") for b in base]
+    compared["base_peak_mb"] = [b.get("peak_mb") for b in base]
+    seconds = pd.to_numeric(compared["seconds"])
+    peak = pd.to_numeric(compared["peak_mb"])
+    base_seconds = pd.to_numeric(compared["base_seconds"])
+    base_peak = pd.to_numeric(compared["base_peak_mb"])
+    slower = (seconds > base_seconds * (1 + time_tolerance)) & (seconds - base_seconds > _MIN_DELTA_SECONDS)
+    larger = (peak > base_peak * (1 + memory_tolerance)) & (peak - base_peak > _MIN_DELTA_MB)
+    compared["regression"] = (slower | larger).fillna(False)
+    return compared
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10], help="Volumes t.o.v. vandaag (default: 1 10)")
+    parser.add_argument("--repeat", type=int, default=3, help="Herhalingen per benchmark (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR, help="Map voor de synthetische bestanden")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON bestand")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true", help="Resultaten opslaan als nieuwe baseline")
+    args = parser.parse_args()
+
+    for path in (APP_DIR, APP_DIR.parent):
+        if str(path) not in sys.path:
+            sys.path.append(str(path))
+
+    results = pd.concat(
+        [run_suite(args.data_dir, scale, repeat=args.repeat, seed=args.seed) for scale in args.scales],
+        ignore_index=True,
+    )
+    compared = compare(results, load_baselines(args.baseline), args.time_tolerance, args.memory_tolerance)
+    with pd.option_context("display.width", 200, "display.max_colwidth", 80):
+        print(compared.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    if args.update_baseline:
+        save_baselines(args.baseline, results)
+        print(f"Baseline opgeslagen in {args.baseline}")
+        return 0
+    return 1 if compared["regression"].any() else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+"""
+On-demand exports van de overview en backlog tabellen.
+
+Exports worden pas gebouwd wanneer een gebruiker erom vraagt en daarna
+gememoized per (dataset versie, filterstatus, formaat), zodat een rerun
+van de pagina geen xlsx meer opbouwt. Excel wordt rij per rij geschreven
+met xlsxwriter in constant-memory mode; CSV en Parquet zijn lichtere
+alternatieven voor grote tabellen.
+"""
+
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# formaat -> (extensie, mime type)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def filter_key(**state: Any) -> str:
+    """Stable key of a filter state (values may be dicts, lists or dates)."""
+    raw = json.dumps(state, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _xlsx_bytes(frame: pd.DataFrame, sheet_name: str) -> bytes:
+    import xlsxwriter
+
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True, "remove_timezone": True})
+    sheet = workbook.add_worksheet(sheet_name[:31])
+    bold = workbook.add_format({"bold": True})
+    date_format = workbook.add_format({"num_format": "dd/mm/yyyy"})
+    sheet.write_row(0, 0, [str(col) for col in frame.columns], bold)
+
+    # Kolommen één keer omzetten naar Python waarden; lege cellen als None
+    columns = []
+    formats = []
+    for name in frame.columns:
+        values = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            cells = np.array(values.dt.tz_localize(None).dt.to_pydatetime() if values.dt.tz else values.dt.to_pydatetime(), dtype=object)
+            cells[values.isna().to_numpy()] = None
+            formats.append(date_format)
+        else:
+            cells = np.array(values.astype(object).where(values.notna(), None), dtype=object)
+            if values.dtype == object or isinstance(values.dtype, pd.CategoricalDtype):
+                # Gemengde kolommen: alles wat xlsxwriter niet kent als tekst
+                plain = (str, bool, int, float, type(None))
+                cells = np.array([v if isinstance(v, plain) else str(v) for v in cells], dtype=object)
+            formats.append(None)
+        columns.append(cells)
+        if formats[-1] is not None:
+            sheet.set_column(len(columns) - 1, len(columns) - 1, 12, formats[-1])
+
+    for row, cells in enumerate(zip(*columns), start=1):
+        sheet.write_row(row, 0, cells)
+    workbook.close()
+    return buffer.getvalue()
+
+
+def _parquet_bytes(frame: pd.DataFrame) -> bytes:
+    # Gemengde object kolommen (bv. ['x', 3, None]) kent Arrow niet: als tekst
+    mixed = [
+        name for name in frame.columns
+        if frame[name].dtype == object
+        and pd.api.types.infer_dtype(frame[name], skipna=True).startswith("mixed")
+    ]
+    if mixed:
+        frame = frame.astype({name: "string" for name in mixed})
+    buffer = io.BytesIO()
+    frame.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def export_bytes(frame: pd.DataFrame, fmt: str = "xlsx", sheet_name: str = "Export") -> bytes:
+    """Serialize `frame` as xlsx, csv (`;`, UTF-8 with BOM for Excel) or parquet."""
+    if fmt == "xlsx":
+        return _xlsx_bytes(frame, sheet_name)
+    if fmt == "csv":
+        return frame.to_csv(index=False, sep=";", date_format="%d/%m/%Y").encode("utf-8-sig")
+    if fmt == "parquet":
+        return _parquet_bytes(frame)
+    raise ValueError(f"Onbekend exportformaat: {fmt}")
+
+
+class ExportCache:
+    """Built exports by key, evicting the oldest once `max_bytes` is exceeded."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: Hashable, data: bytes) -> bytes:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return data
+
+
+_cache: Optional[ExportCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_export_cache() -> ExportCache:
+    """Process-wide export cache shared by all sessions."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExportCache()
+        return _cache
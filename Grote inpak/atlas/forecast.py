@@ -0,0 +1,204 @@
+"""
+Forecast ingestion voor de FOR####/FORESCO exports.
+
+De `forecast files` map bevat `;`-gescheiden exports met opgevulde velden:
+`_FOR1953.CSV_.CSV` met header (Sched shg Date, Case Number, Case Type, ...)
+en `_FORESCO.CSV_*.CSV` zonder header. Elke export wordt één keer per
+bestandsversie getypeerd ingelezen; de samengevoegde, per Case Number
+ontdubbelde cases en de wekelijkse vraag worden gecachet per combinatie
+van bestandsversies.
+"""
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+# Positionele layout van de FORESCO exports (geen header)
+_FORESCO_COLUMNS = {
+    0: "sched_date",
+    1: "model",
+    2: "item_number",
+    3: "order_number",
+    4: "case_number",
+    5: "case_type",
+    6: "status",
+    7: "packing_status",
+    8: "planner_code",
+    9: "planner_name",
+}
+
+# Header layout van de FOR#### exports
+_FOR_COLUMNS = {
+    "Sched shg Date": "sched_date",
+    "Case Number": "case_number",
+    "Case Type": "case_type",
+    "Item Number": "item_number",
+    "Location": "location",
+    "Status": "status",
+    "Packing code": "packing_code",
+    "Packing status": "packing_status",
+    "Planner Code": "planner_code",
+}
+
+FORECAST_COLUMNS = (
+    "case_number", "case_type", "sched_date", "item_number", "location", "status",
+    "planner_code", "planner_name", "model", "order_number", "packing_status", "source",
+)
+_CATEGORY_COLUMNS = ("case_type", "location", "status", "planner_code", "planner_name", "packing_status", "source")
+_GROUP_COLUMNS = ["case_type", "planner_code", "location"]
+
+
+def _file_version(path: Path) -> Tuple[str, int, int]:
+    stat = path.stat()
+    return path.name, stat.st_size, stat.st_mtime_ns
+
+
+def forecast_files(directory: Union[str, Path]) -> List[Path]:
+    """Forecast exports in `directory` (FOR####, FORESCO and variants)."""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return sorted(
+        p for p in directory.iterdir()
+        if p.is_file() and p.name.upper().startswith("_FOR") and ".CSV" in p.name.upper()
+    )
+
+
+def parse_forecast_file(path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Typed parse of one forecast export.
+
+    The layout is detected from the first line: a quoted `Sched shg Date`
+    header means the FOR#### layout, otherwise the positional FORESCO one.
+    Trailer rows without a case number are dropped.
+
+    Returns:
+        DataFrame with FORECAST_COLUMNS
+    """
+    path = Path(path)
+    with path.open("r", encoding="latin-1") as handle:
+        first_line = handle.readline()
+
+    if "Sched shg Date" in first_line:
+        raw = pd.read_csv(path, sep=";", dtype=str, encoding="latin-1", engine="c")
+        raw.columns = raw.columns.str.strip()
+        raw = raw[[c for c in _FOR_COLUMNS if c in raw.columns]].rename(columns=_FOR_COLUMNS)
+    else:
+        raw = pd.read_csv(
+            path, sep=";", header=None, dtype=str, encoding="latin-1", engine="c",
+            usecols=list(_FORESCO_COLUMNS),
+        ).rename(columns=_FORESCO_COLUMNS)
+
+    frame = raw.apply(lambda col: col.str.strip()).replace("", pd.NA)
+    frame = frame.loc[frame["case_number"].notna()]
+    frame = frame.reindex(columns=list(FORECAST_COLUMNS))
+    frame["sched_date"] = pd.to_datetime(frame["sched_date"], format="%Y%m%d", errors="coerce")
+    frame["case_number"] = frame["case_number"].str.upper().astype("string")
+    frame["item_number"] = frame["item_number"].astype("string")
+    frame["source"] = path.name
+    for col in _CATEGORY_COLUMNS:
+        frame[col] = frame[col].astype("category")
+    return frame.reset_index(drop=True)
+
+
+def merge_forecasts(frames: List[Tuple[int, pd.DataFrame]]) -> pd.DataFrame:
+    """
+    Merge exports and keep one row per Case Number.
+
+    The row from the most recent export (file mtime) wins; within the same
+    export generation the latest scheduled date wins.
+
+    Args:
+        frames: (file mtime_ns, parsed frame) per export
+    """
+    parts = [frame.assign(_mtime=mtime) for mtime, frame in frames if not frame.empty]
+    if not parts:
+        return pd.DataFrame(columns=list(FORECAST_COLUMNS))
+    merged = pd.concat(parts, ignore_index=True)
+    for col in _CATEGORY_COLUMNS:
+        merged[col] = merged[col].astype("category")
+    merged = merged.sort_values(["_mtime", "sched_date"], kind="stable", na_position="first")
+    merged = merged.drop_duplicates("case_number", keep="last")
+    return merged.drop(columns="_mtime").sort_values("sched_date", kind="stable").reset_index(drop=True)
+
+
+def weekly_demand(cases: pd.DataFrame) -> pd.DataFrame:
+    """
+    Number of cases per week (Monday) by case type, planner code and location.
+
+    Returns:
+        DataFrame with week, case_type, planner_code, location and cases columns
+    """
+    dated = cases.loc[cases["sched_date"].notna()]
+    if dated.empty:
+        return pd.DataFrame(columns=["week", *_GROUP_COLUMNS, "cases"])
+    week = dated["sched_date"].dt.to_period("W-SUN").dt.start_time.rename("week")
+    keys = [week] + [dated[col].astype("string").fillna("") for col in _GROUP_COLUMNS]
+    weekly = dated.groupby(keys, sort=True).size().rename("cases").reset_index()
+    for col in _GROUP_COLUMNS:
+        weekly[col] = weekly[col].astype("category")
+    weekly["cases"] = weekly["cases"].astype("int32")
+    return weekly
+
+
+@dataclass(frozen=True)
+class ForecastData:
+    """Merged forecast cases and their weekly aggregate for one set of file versions."""
+
+    version: str
+    files: Tuple[str, ...]
+    cases: pd.DataFrame
+    weekly: pd.DataFrame
+
+
+class ForecastStore:
+    """Parses each export once per file version and caches the merged result."""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._parsed: Dict[Tuple[str, int, int], pd.DataFrame] = {}
+        self._result: Optional[ForecastData] = None
+
+    def load(self) -> ForecastData:
+        """Current forecast; only new or changed exports are parsed again."""
+        with self._lock:
+            versions = [(path, _file_version(path)) for path in forecast_files(self.directory)]
+            digest = hashlib.sha1(repr([v for _, v in versions]).encode("utf-8")).hexdigest()
+            if self._result is not None and self._result.version == digest:
+                return self._result
+
+            parsed = {}
+            for path, version in versions:
+                frame = self._parsed.get(version)
+                if frame is None:
+                    frame = parse_forecast_file(path)
+                parsed[version] = frame
+            # Oude bestandsversies vrijgeven
+            self._parsed = parsed
+
+            cases = merge_forecasts([(version[2], frame) for version, frame in parsed.items()])
+            self._result = ForecastData(
+                version=digest,
+                files=tuple(path.name for path, _ in versions),
+                cases=cases,
+                weekly=weekly_demand(cases),
+            )
+            return self._result
+
+
+_stores: Dict[Path, ForecastStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_forecast_store(directory: Union[str, Path]) -> ForecastStore:
+    """Process-wide forecast store per directory."""
+    key = Path(directory).resolve()
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ForecastStore(key)
+        return _stores[key]
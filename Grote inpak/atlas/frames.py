@@ -0,0 +1,54 @@
+"""
+Kleine helpers voor kolomdetectie en natural keys in de Atlas frames.
+
+De exports (PILS, ERP link, stock) gebruiken wisselende kolomnamen; deze
+helpers zoeken de eerste kolom die overeenkomt met een lijst kandidaten.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+PILS_KEY_CANDIDATES = (("Packing Number", "packing_number"), ("Case", "case_label"))
+ERP_KEY_CANDIDATES = (("item_number", "Item number", "Item Number", "kistnummer", "ERP code"),)
+STOCK_KEY_CANDIDATES = (
+    ("item_number", "Item number", "Item Number", "ERP code", "No."),
+    ("site", "Site", "locatie", "Locatie", "location", "Location", "stock_location"),
+)
+
+NATURAL_KEYS: Dict[str, Sequence[Sequence[str]]] = {
+    "pils": PILS_KEY_CANDIDATES,
+    "erp": ERP_KEY_CANDIDATES,
+    "stock": STOCK_KEY_CANDIDATES,
+}
+
+
+def pick_column(df: pd.DataFrame, candidates: Sequence[str]) -> Optional[str]:
+    """Return the first column of `df` matching one of the candidates (case-insensitive)."""
+    lookup = {str(col).strip().lower(): col for col in df.columns}
+    for candidate in candidates:
+        col = lookup.get(candidate.strip().lower())
+        if col is not None:
+            return col
+    return None
+
+
+def natural_key_columns(df: pd.DataFrame, kind: str) -> List[str]:
+    """
+    Resolve the natural key columns for a frame kind ('pils', 'erp', 'stock').
+
+    Raises:
+        KeyError: if one of the key columns cannot be found
+    """
+    columns = []
+    for candidates in NATURAL_KEYS[kind]:
+        col = pick_column(df, candidates)
+        if col is None:
+            raise KeyError(f"Geen sleutelkolom gevonden voor {kind}: {list(candidates)}")
+        columns.append(col)
+    return columns
+
+
+def normalize_key(values: pd.Series) -> pd.Series:
+    """Strip padding and upper-case key values ('T304740007     ' -> 'T304740007')."""
+    return values.astype("string").str.strip().str.upper()
@@ -0,0 +1,84 @@
+"""
+Import-time profiel als bewaking tegen trage cold starts.
+
+Draait `python -X importtime` in een apart proces per module, toont de
+zwaarste imports en faalt (exit code 1) als een module boven zijn budget
+komt. Bedoeld om na wijzigingen aan de imports van de app te draaien.
+
+Gebruik:
+    python -m atlas.import_profile
+    python -m atlas.import_profile atlas.backlog --budget-ms 400 --top 15
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Budget per module in milliseconden (cumulatief, inclusief afhankelijkheden).
+# `atlas` zelf is lazy; components en scripts.build_overview zijn de rest van
+# de import-keten van streamlit_app_v2.
+DEFAULT_BUDGETS_MS: Dict[str, float] = {
+    "atlas": 100.0,
+    "components": 1500.0,
+    "scripts.build_overview": 1500.0,
+}
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_import(module: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Returns:
+        List of (module, self_us, cumulative_us, depth) entries
+    """
+    # Zelfde sys.path als streamlit_app_v2: de repo-root (scripts) en de app-map
+    paths = [str(APP_DIR.parent), str(APP_DIR), os.environ.get("PYTHONPATH", "")]
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(APP_DIR),
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(p for p in paths if p)},
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import van {module} mislukt:\n{proc.stderr.strip()[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", help="Modules om te profileren (default: alle modules met een budget)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Budget voor alle opgegeven modules")
+    parser.add_argument("--top", type=int, default=10, help="Aantal zwaarste imports om te tonen (default: %(default)s)")
+    args = parser.parse_args()
+
+    budgets = {m: args.budget_ms or DEFAULT_BUDGETS_MS.get(m, 1000.0) for m in args.modules} or DEFAULT_BUDGETS_MS
+    failed = False
+    for module, budget_ms in budgets.items():
+        entries = profile_import(module)
+        total_ms = next((cum for name, _, cum, _ in entries if name == module), 0) / 1000
+        status = "OK" if total_ms <= budget_ms else "TE TRAAG"
+        failed |= total_ms > budget_ms
+        print(f"{module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms) -> {status}")
+        heaviest = sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]
+        for name, self_us, cumulative_us, _ in heaviest:
+            print(f"    {self_us / 1000:8.1f} ms self  {cumulative_us / 1000:8.1f} ms cum  {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,424 @@
+"""
+Incrementele build van overview en transport.
+
+Een nieuwe PILS export wordt per Packing Number/Case vergeleken met de
+vorige snapshot. Alleen cases die toegevoegd, verwijderd of gewijzigd zijn
+(of waarvan de ERP/stock input of comment wijzigde) worden opnieuw door
+`build_overview` gehaald, samen met alle cases die een item of kist (case
+type) met zo'n case delen; het gecachte resultaat wordt daarmee gepatcht.
+
+Voorwaarde voor `build_fn`: het resultaat van een case mag enkel afhangen
+van de cases met hetzelfde item of dezelfde kist (bv. stock toewijzen per
+item in PILS volgorde mag, een globale rangschikking niet). Na elke
+volledige build wordt dat gecontroleerd op een steekproef van groepen;
+voldoet de build niet, dan blijft hij volledig.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .frames import natural_key_columns, normalize_key, pick_column
+from .row_hash import row_hashes
+
+logger = logging.getLogger(__name__)
+
+# PILS kolommen waarlangs ERP/stock wijzigingen een case raken
+_PILS_LINK_COLUMNS = (("Case Type", "case_type"), ("Item number", "item_number"))
+
+
+def _changed_keys(previous: Optional[pd.Series], current: pd.Series) -> Set[str]:
+    """Keys that were added, removed or whose row hash changed."""
+    if previous is None:
+        return set(current.index)
+    joined = pd.concat([previous.rename("old"), current.rename("new")], axis=1)
+    changed = joined["old"].isna() | joined["new"].isna() | (joined["old"] != joined["new"])
+    return set(joined.index[changed.to_numpy()])
+
+
+def _frame_hashes(frame: Optional[pd.DataFrame], kind: str) -> Optional[pd.Series]:
+    if frame is None or frame.empty:
+        return pd.Series(dtype="uint64")
+    try:
+        keys = natural_key_columns(frame, kind)
+    except KeyError:
+        return None
+    return row_hashes(frame, keys)
+
+
+def _labels(values: pd.Series) -> pd.Series:
+    return values.astype("string").fillna("").str.strip()
+
+
+def _key_tokens(keys: Set[str]) -> Set[str]:
+    """Normalized first key component (item / kistnummer) of changed rows."""
+    return {str(k).split("\x1f")[0].strip().upper() for k in keys}
+
+
+class IncrementalOverview:
+    """
+    Cache around `build_overview` that patches only affected cases.
+
+    The patched result is ordered like the full build (PILS order) and cast
+    back to the dtypes of the last full build. `build_fn` must compute each
+    case from the cases sharing its item or case type only; after a full
+    build this is probed on `probe_groups` groups and patching stays off
+    when the probe differs. With `verify=True` every incremental result is
+    additionally compared against a full rebuild; on a mismatch the full
+    result is used and incremental mode is switched off.
+    """
+
+    def __init__(
+        self,
+        build_fn: Callable[..., Tuple[pd.DataFrame, pd.DataFrame]],
+        verify: bool = False,
+        max_changed_ratio: float = 0.5,
+        probe_groups: int = 5,
+    ):
+        self.build_fn = build_fn
+        self.verify = verify
+        self.max_changed_ratio = max_changed_ratio
+        self.probe_groups = probe_groups
+        self.enabled = True
+        self._patchable = False
+        self.last_stats: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pils_hashes: Optional[pd.Series] = None
+        self._erp_hashes: Optional[pd.Series] = None
+        self._stock_hashes: Optional[pd.Series] = None
+        self._comments: Dict[str, str] = {}
+        self._links: Optional[pd.DataFrame] = None
+        self._overview: Optional[pd.DataFrame] = None
+        self._transport: Optional[pd.DataFrame] = None
+
+    def build(
+        self,
+        df_pils: pd.DataFrame,
+        df_erp: pd.DataFrame,
+        df_stock: Optional[pd.DataFrame] = None,
+        comments_map: Optional[dict] = None,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Build overview and transport, incrementally when possible.
+
+        Returns:
+            Tuple of (overview, transport); copies the caller may modify
+        """
+        comments_map = dict(comments_map or {})
+        with self._lock:
+            pils_hashes = _frame_hashes(df_pils, "pils")
+            erp_hashes = _frame_hashes(df_erp, "erp")
+            stock_hashes = _frame_hashes(df_stock, "stock")
+
+            overview, transport = None, None
+            if self.enabled and self._patchable and pils_hashes is not None:
+                overview, transport = self._patch(
+                    df_pils, df_erp, df_stock, comments_map,
+                    pils_hashes, erp_hashes, stock_hashes,
+                )
+
+            if overview is None:
+                overview, transport = self.build_fn(
+                    df_pils, df_erp, df_stock=df_stock, comments_map=comments_map
+                )
+                self.last_stats = {"mode": "full", "cases": int(len(overview))}
+                # Patchen kan alleen als de build de PILS volgorde aanhoudt en per groep rekent
+                self._patchable = (
+                    is_pils_ordered(overview, df_pils)
+                    and is_pils_ordered(transport, df_pils)
+                    and self._probe(df_pils, df_erp, df_stock, comments_map, overview, transport)
+                )
+            elif self.verify:
+                full_overview, full_transport = self.build_fn(
+                    df_pils, df_erp, df_stock=df_stock, comments_map=comments_map
+                )
+                if not (_frames_equal(overview, full_overview) and _frames_equal(transport, full_transport)):
+                    logger.warning("Incrementele overview wijkt af van volledige build; incrementeel uitgeschakeld")
+                    self.enabled = False
+                    overview, transport = full_overview, full_transport
+                    self.last_stats = {"mode": "full", "cases": int(len(overview)), "verify": "mismatch"}
+                else:
+                    self.last_stats["verify"] = "ok"
+
+            self._pils_hashes = pils_hashes
+            self._erp_hashes = erp_hashes
+            self._stock_hashes = stock_hashes
+            self._comments = comments_map
+            self._links = _case_links(df_pils)
+            self._overview = overview
+            self._transport = transport
+            return overview.copy(), transport.copy()
+
+    def _affected_cases(
+        self,
+        df_pils: pd.DataFrame,
+        df_erp: pd.DataFrame,
+        comments_map: dict,
+        pils_hashes: pd.Series,
+        erp_hashes: Optional[pd.Series],
+        stock_hashes: Optional[pd.Series],
+    ) -> Optional[Set[str]]:
+        if erp_hashes is None or stock_hashes is None:
+            return None
+
+        case_col = pick_column(df_pils, ("Case", "case_label"))
+        if case_col is None:
+            return None
+
+        # PILS rijen die toegevoegd, gewijzigd of verwijderd zijn
+        changed_rows = _changed_keys(self._pils_hashes, pils_hashes)
+        affected = {str(k).split("\x1f")[-1].strip() for k in changed_rows}
+
+        # Cases waarvan de ERP of stock input wijzigde
+        tokens = _key_tokens(_changed_keys(self._erp_hashes, erp_hashes))
+        stock_tokens = _key_tokens(_changed_keys(self._stock_hashes, stock_hashes))
+        if stock_tokens and df_erp is not None and not df_erp.empty:
+            # Stock items hangen via de ERP link aan een kistnummer
+            erp_values = df_erp.astype("string").apply(lambda col: col.str.strip().str.upper())
+            linked = erp_values.isin(stock_tokens).any(axis=1).to_numpy()
+            tokens |= set(pd.unique(erp_values.loc[linked].to_numpy().ravel()).tolist()) - {pd.NA}
+        tokens |= stock_tokens
+        if tokens:
+            mask = np.zeros(len(df_pils), dtype=bool)
+            for candidates in _PILS_LINK_COLUMNS:
+                col = pick_column(df_pils, candidates)
+                if col is not None:
+                    mask |= normalize_key(df_pils[col]).isin(tokens).fillna(False).to_numpy()
+            affected |= set(_labels(df_pils.loc[mask, case_col]))
+
+        # Gewijzigde comments
+        for label in set(self._comments) | set(comments_map):
+            if self._comments.get(label) != comments_map.get(label):
+                affected.add(str(label).strip())
+
+        # Cases die een item of kist delen met een geraakte case (oude en nieuwe waarden)
+        links = _case_links(df_pils)
+        if links is None or self._links is None:
+            return None
+        return _neighbours(links, affected, self._links)
+
+    def _probe(
+        self,
+        df_pils: pd.DataFrame,
+        df_erp: pd.DataFrame,
+        df_stock: Optional[pd.DataFrame],
+        comments_map: dict,
+        overview: pd.DataFrame,
+        transport: pd.DataFrame,
+    ) -> bool:
+        """Recompute a few item/kist groups the way `_patch` does and compare with the full build."""
+        links = _case_links(df_pils)
+        if links is None or "case_label" not in overview.columns:
+            return False
+        if links.empty or not self.probe_groups:
+            return True
+        tokens = pd.unique(links["token"].to_numpy())
+        picks = tokens[np.linspace(0, len(tokens) - 1, min(self.probe_groups, len(tokens))).astype(int)]
+        recompute = set(links.loc[links["token"].isin(picks), "case"])
+        fresh = self._recompute(df_pils, df_erp, df_stock, comments_map, links, recompute)
+        for full, part in zip((overview, transport), fresh):
+            if "case_label" not in full.columns:
+                if len(part):
+                    return False
+                continue
+            rows = full.loc[_labels(full["case_label"]).isin(recompute).to_numpy()]
+            if not _rows_equal(rows, part.reindex(columns=full.columns)):
+                logger.warning("build_overview rekent niet per item/kist; incrementele build uitgeschakeld")
+                return False
+        return True
+
+    def _recompute(
+        self,
+        df_pils: pd.DataFrame,
+        df_erp: pd.DataFrame,
+        df_stock: Optional[pd.DataFrame],
+        comments_map: dict,
+        links: pd.DataFrame,
+        recompute: Set[str],
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Rows of the `recompute` cases, built together with their complete groups.
+
+        The build input holds every case sharing an item or kist with a
+        recomputed case, so each of them sees the same group as in a full build.
+        """
+        context = _neighbours(links, recompute)
+        case_col = pick_column(df_pils, ("Case", "case_label"))
+        subset = df_pils.loc[_labels(df_pils[case_col]).isin(context).to_numpy()]
+        overview, transport = self.build_fn(
+            subset, df_erp, df_stock=df_stock,
+            comments_map={k: v for k, v in comments_map.items() if str(k).strip() in context},
+        )
+        return tuple(
+            frame.loc[_labels(frame["case_label"]).isin(recompute).to_numpy()] if "case_label" in frame.columns else frame
+            for frame in (overview, transport)
+        )
+
+    def _patch(
+        self,
+        df_pils: pd.DataFrame,
+        df_erp: pd.DataFrame,
+        df_stock: Optional[pd.DataFrame],
+        comments_map: dict,
+        pils_hashes: pd.Series,
+        erp_hashes: Optional[pd.Series],
+        stock_hashes: Optional[pd.Series],
+    ) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        affected = self._affected_cases(df_pils, df_erp, comments_map, pils_hashes, erp_hashes, stock_hashes)
+        if affected is None or "case_label" not in self._overview.columns:
+            return None, None
+        if self._transport is not None and len(self._transport.columns) and "case_label" not in self._transport.columns:
+            return None, None
+        if len(affected) > self.max_changed_ratio * max(len(df_pils), 1):
+            return None, None
+
+        case_col = pick_column(df_pils, ("Case", "case_label"))
+        case_labels = _labels(df_pils[case_col])
+        if affected:
+            links = _case_links(df_pils)
+            if len(_neighbours(links, affected)) > self.max_changed_ratio * max(len(df_pils), 1):
+                return None, None
+            new_overview, new_transport = self._recompute(
+                df_pils, df_erp, df_stock, comments_map, links, affected
+            )
+        else:
+            new_overview, new_transport = self._overview.iloc[0:0], self._transport.iloc[0:0]
+
+        # Volgorde van de volledige build: eerste positie van de case in PILS
+        order = pd.Series(np.arange(len(case_labels)), index=case_labels.to_numpy()).groupby(level=0).min()
+        overview = _patch_frame(self._overview, new_overview, affected, order)
+        transport = _patch_frame(self._transport, new_transport, affected, order)
+        if overview is None or transport is None:
+            return None, None
+
+        self.last_stats = {
+            "mode": "incremental",
+            "cases": int(len(overview)),
+            "recomputed": len(affected),
+        }
+        return overview, transport
+
+
+def _case_links(df_pils: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """(case, token) pairs: the item number and case type of every PILS case."""
+    case_col = pick_column(df_pils, ("Case", "case_label"))
+    if case_col is None:
+        return None
+    labels = _labels(df_pils[case_col])
+    parts = []
+    for candidates in _PILS_LINK_COLUMNS:
+        col = pick_column(df_pils, candidates)
+        if col is not None:
+            # Prefix per kolom: een item en een case type met dezelfde code zijn geen groep
+            values = normalize_key(df_pils[col])
+            present = (values.notna() & values.ne("")).fillna(False).to_numpy()
+            parts.append(pd.DataFrame({"case": labels[present], "token": f"{candidates[0]}:" + values[present]}))
+    if not parts:
+        return pd.DataFrame({"case": pd.Series(dtype="string"), "token": pd.Series(dtype="string")})
+    return pd.concat(parts, ignore_index=True).drop_duplicates()
+
+
+def _neighbours(links: pd.DataFrame, cases: Set[str], previous: Optional[pd.DataFrame] = None) -> Set[str]:
+    """`cases` plus every case sharing an item or kist with one of them (also via `previous` links)."""
+    tokens = set(links.loc[links["case"].isin(cases), "token"])
+    if previous is not None:
+        tokens |= set(previous.loc[previous["case"].isin(cases), "token"])
+    return set(cases) | set(links.loc[links["token"].isin(tokens), "case"])
+
+
+def _patch_frame(
+    cached: pd.DataFrame,
+    fresh: pd.DataFrame,
+    affected: Set[str],
+    order: pd.Series,
+) -> Optional[pd.DataFrame]:
+    """Replace the rows of affected cases and restore the full-build order."""
+    if cached is None:
+        return None
+    if cached.empty and fresh.empty:
+        return cached
+    if "case_label" not in cached.columns:
+        return None
+
+    kept = cached.loc[~_labels(cached["case_label"]).isin(affected).to_numpy()]
+    kept = kept.loc[_labels(kept["case_label"]).isin(order.index).to_numpy()]
+    patched = pd.concat([kept, fresh.reindex(columns=cached.columns)], ignore_index=True)
+
+    rank = order.reindex(_labels(patched["case_label"]).to_numpy()).to_numpy()
+    patched = patched.iloc[np.argsort(rank, kind="stable")].reset_index(drop=True)
+    # Dtypes zoals de volledige build ze zou afleiden: de verse rijen winnen
+    # waar ze waarden hebben, anders de dtype van de gecachte build
+    dtypes = cached.dtypes.to_dict()
+    for col in fresh.columns.intersection(cached.columns):
+        if fresh[col].notna().any():
+            dtypes[col] = fresh[col].dtype
+        if isinstance(dtypes[col], pd.CategoricalDtype):
+            # Categorieën opnieuw afleiden uit alle rijen, zoals de volledige build
+            dtypes[col] = "category"
+    try:
+        patched = patched.astype(dtypes)
+    except (TypeError, ValueError):
+        return None
+    return patched
+
+
+def _frames_equal(left: pd.DataFrame, right: pd.DataFrame) -> bool:
+    try:
+        pd.testing.assert_frame_equal(
+            left.reset_index(drop=True), right.reset_index(drop=True), check_like=False
+        )
+    except AssertionError:
+        return False
+    return True
+
+
+def _rows_equal(left: pd.DataFrame, right: pd.DataFrame) -> bool:
+    """Same rows and values; categories and integer/float widths may differ (subset builds)."""
+    def plain(frame: pd.DataFrame) -> pd.DataFrame:
+        frame = frame.reset_index(drop=True)
+        categorical = [c for c in frame.columns if isinstance(frame[c].dtype, pd.CategoricalDtype)]
+        return frame.astype({c: object for c in categorical})
+
+    try:
+        pd.testing.assert_frame_equal(plain(left), plain(right), check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+
+def is_pils_ordered(overview: pd.DataFrame, df_pils: pd.DataFrame) -> bool:
+    """True when the frame rows follow the PILS order, a precondition for patching."""
+    case_col = pick_column(df_pils, ("Case", "case_label"))
+    if overview is None or case_col is None:
+        return False
+    if overview.empty:
+        return True
+    if "case_label" not in overview.columns:
+        return False
+    labels = _labels(df_pils[case_col])
+    order = pd.Series(np.arange(len(labels)), index=labels.to_numpy()).groupby(level=0).min()
+    rank = order.reindex(_labels(overview["case_label"]).to_numpy())
+    return bool(rank.notna().all() and rank.is_monotonic_increasing)
+
+
+_builders: Dict[int, IncrementalOverview] = {}
+_builders_lock = threading.Lock()
+
+
+def get_incremental_overview(
+    build_fn: Callable[..., Tuple[pd.DataFrame, pd.DataFrame]],
+    verify: bool = False,
+) -> IncrementalOverview:
+    """Process-wide incremental builder per build function."""
+    with _builders_lock:
+        builder = _builders.get(id(build_fn))
+        if builder is None or builder.build_fn is not build_fn:
+            builder = _builders[id(build_fn)] = IncrementalOverview(build_fn, verify=verify)
+        builder.verify = verify
+        return builder
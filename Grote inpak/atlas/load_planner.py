@@ -0,0 +1,253 @@
+"""
+Laadplanning voor het transport naar Willebroek.
+
+Verdeelt de te verplaatsen cases over vrachtwagens met een first-fit
+decreasing heuristiek op vloeroppervlak en gewicht per case_type (uit de
+config). Priority cases en cases met de vroegste deadline (zelfde
+termijnregels als de backlog) gaan eerst; binnen dezelfde urgentie worden
+de grootste kisten eerst geplaatst. Een optionele verbeterstap probeert de
+laatste vrachtwagen leeg te maken door zijn cases in de restruimte van de
+vorige te plaatsen. Alles op numpy arrays: 1000+ cases in milliseconden.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .backlog import add_business_days, belgian_holidays, term_werkdagen
+
+# (lengte m, breedte m, gewicht kg) per prefix als de config geen case_type kent
+DEFAULT_CASE_DIMENSIONS: Dict[str, Tuple[float, float, float]] = {
+    "K": (2.4, 1.2, 900.0),
+    "C": (1.2, 1.0, 350.0),
+    "": (1.2, 1.0, 500.0),
+}
+
+
+@dataclass(frozen=True)
+class TruckSpec:
+    """Usable capacity of one truck."""
+
+    floor_m2: float = 13.6 * 2.45
+    max_weight_kg: float = 24000.0
+    # Kisten sluiten nooit perfect aan: niet meer dan dit deel van de vloer plannen
+    fill_factor: float = 0.9
+
+    @property
+    def usable_m2(self) -> float:
+        return self.floor_m2 * self.fill_factor
+
+    @classmethod
+    def from_config(cls, config: Any) -> "TruckSpec":
+        """Truck spec from `config.TRUCK_SPEC` (dict), defaults otherwise."""
+        return cls(**(getattr(config, "TRUCK_SPEC", None) or {}))
+
+
+@dataclass(frozen=True)
+class LoadPlan:
+    """Result of `plan_loads`."""
+
+    assignments: pd.DataFrame
+    trucks: pd.DataFrame
+    unplaced: pd.DataFrame
+    elapsed_ms: float
+
+    @property
+    def truck_count(self) -> int:
+        return len(self.trucks)
+
+
+def case_dimensions(
+    case_type: pd.Series,
+    dimensions: Optional[Mapping[str, Sequence[float]]] = None,
+) -> pd.DataFrame:
+    """
+    Floor area and weight per case.
+
+    Looks up the exact case_type in `dimensions` (config `CASE_DIMENSIONS`),
+    then its prefix letter, then the default. Evaluated once per distinct
+    case_type and broadcast back.
+
+    Returns:
+        DataFrame with `area_m2` and `weight_kg` columns
+    """
+    table = {**DEFAULT_CASE_DIMENSIONS, **{str(k).strip().upper(): v for k, v in (dimensions or {}).items()}}
+    codes, uniques = pd.factorize(case_type.astype("string").str.strip().str.upper())
+    area = np.empty(len(uniques) + 1)
+    weight = np.empty(len(uniques) + 1)
+    for i, code in enumerate([*uniques, ""]):
+        length, width, kg = table.get(code) or table.get(code[:1]) or table[""]
+        area[i], weight[i] = length * width, kg
+    # factorize geeft -1 voor ontbrekende case_types: laatste slot = default
+    return pd.DataFrame({"area_m2": area[codes], "weight_kg": weight[codes]}, index=case_type.index)
+
+
+def case_deadlines(
+    cases: pd.DataFrame,
+    extra_holidays: Sequence = (),
+    excluded_holidays: Sequence = (),
+) -> pd.Series:
+    """Deadline per case with the backlog term rules (existing `deadline` column wins)."""
+    if "deadline" in cases.columns:
+        return pd.to_datetime(cases["deadline"], errors="coerce")
+    if "arrival_date" not in cases.columns:
+        return pd.Series(pd.NaT, index=cases.index, dtype="datetime64[ns]")
+    arrival = pd.to_datetime(cases["arrival_date"], errors="coerce")
+    case_type = cases["case_type"] if "case_type" in cases.columns else pd.Series("", index=cases.index)
+    holidays = None
+    if arrival.notna().any():
+        holidays = belgian_holidays(
+            range(arrival.min().year, arrival.max().year + 2),
+            extra=extra_holidays,
+            exclude=excluded_holidays,
+        )
+    return add_business_days(arrival, term_werkdagen(case_type)["term_werkdagen"], holidays)
+
+
+def _first_fit(
+    area: np.ndarray,
+    weight: np.ndarray,
+    order: np.ndarray,
+    truck: TruckSpec,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Place cases in `order` into the first truck with room; -1 for cases that never fit."""
+    n = len(area)
+    assigned = np.full(n, -1, dtype=np.int64)
+    free_area = np.empty(n)
+    free_weight = np.empty(n)
+    opened = 0
+    for i in order:
+        if area[i] > truck.usable_m2 or weight[i] > truck.max_weight_kg:
+            continue
+        fits = (free_area[:opened] >= area[i] - 1e-9) & (free_weight[:opened] >= weight[i])
+        slot = int(fits.argmax()) if opened and fits.any() else opened
+        if slot == opened:
+            free_area[slot], free_weight[slot] = truck.usable_m2, truck.max_weight_kg
+            opened += 1
+        free_area[slot] -= area[i]
+        free_weight[slot] -= weight[i]
+        assigned[i] = slot
+    return assigned, free_area[:opened].copy(), free_weight[:opened].copy()
+
+
+def _empty_last_trucks(
+    area: np.ndarray,
+    weight: np.ndarray,
+    assigned: np.ndarray,
+    free_area: np.ndarray,
+    free_weight: np.ndarray,
+    deadline: float,
+) -> Tuple[np.ndarray, int]:
+    """
+    Local improvement: move the cases of the last truck into earlier slack.
+
+    Repeats while the last truck can be emptied completely and time is left.
+    Moves only go to earlier trucks, so no case leaves later than planned.
+    """
+    trucks = len(free_area)
+    while trucks > 1 and time.perf_counter() < deadline:
+        last = trucks - 1
+        members = np.flatnonzero(assigned == last)
+        trial_area = free_area[:last].copy()
+        trial_weight = free_weight[:last].copy()
+        moves = {}
+        for i in members[np.argsort(-area[members], kind="stable")]:
+            fits = (trial_area >= area[i] - 1e-9) & (trial_weight >= weight[i])
+            if not fits.any():
+                break
+            slot = int(fits.argmax())
+            trial_area[slot] -= area[i]
+            trial_weight[slot] -= weight[i]
+            moves[i] = slot
+        if len(moves) != len(members):
+            break
+        for i, slot in moves.items():
+            assigned[i] = slot
+        free_area[:last], free_weight[:last] = trial_area, trial_weight
+        trucks = last
+    return assigned, trucks
+
+
+def plan_loads(
+    cases: pd.DataFrame,
+    truck: Optional[TruckSpec] = None,
+    dimensions: Optional[Mapping[str, Sequence[float]]] = None,
+    improve: bool = True,
+    time_budget_ms: float = 250.0,
+    extra_holidays: Sequence = (),
+    excluded_holidays: Sequence = (),
+) -> LoadPlan:
+    """
+    Assign cases to truck loads.
+
+    Order: priority cases first, then earliest deadline (cases without a
+    deadline last), then largest floor area (first-fit decreasing). Truck 1
+    is the first to leave.
+
+    Args:
+        cases: Frame with `case_label`, `case_type` and optionally
+            `priority`, `deadline` or `arrival_date`
+        truck: Truck capacity (default `TruckSpec()`)
+        dimensions: case_type/prefix -> (length m, width m, weight kg)
+        improve: Run the local improvement pass
+        time_budget_ms: Upper bound for the improvement pass
+
+    Returns:
+        LoadPlan with per-case assignments, per-truck totals and the cases
+        that do not fit in an empty truck
+    """
+    started = time.perf_counter()
+    truck = truck or TruckSpec()
+    plan = cases.copy()
+    case_type = plan["case_type"] if "case_type" in plan.columns else pd.Series("", index=plan.index)
+    dims = case_dimensions(case_type, dimensions)
+    plan["area_m2"] = dims["area_m2"]
+    plan["weight_kg"] = dims["weight_kg"]
+    plan["deadline"] = case_deadlines(plan, extra_holidays, excluded_holidays)
+    priority = (
+        plan["priority"].astype("boolean").fillna(False).to_numpy(dtype=bool)
+        if "priority" in plan.columns else np.zeros(len(plan), dtype=bool)
+    )
+
+    area = plan["area_m2"].to_numpy(dtype=float)
+    weight = plan["weight_kg"].to_numpy(dtype=float)
+    deadline_day = plan["deadline"].dt.normalize().to_numpy(dtype="datetime64[D]").astype(np.int64)
+    deadline_day[plan["deadline"].isna().to_numpy()] = np.iinfo(np.int64).max
+    # lexsort: laatste sleutel is de primaire
+    order = np.lexsort((-area, deadline_day, ~priority))
+
+    assigned, free_area, free_weight = _first_fit(area, weight, order, truck)
+    trucks = len(free_area)
+    if improve and trucks > 1:
+        assigned, trucks = _empty_last_trucks(
+            area, weight, assigned, free_area, free_weight,
+            started + time_budget_ms / 1000.0,
+        )
+
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    plan["truck"] = pd.Series(assigned + 1, index=plan.index, dtype="Int32").mask(assigned < 0)
+    plan["load_order"] = rank
+    plan["priority"] = priority
+
+    placed = plan.loc[plan["truck"].notna()].sort_values(["truck", "load_order"], kind="stable")
+    placed["load_order"] = placed.groupby("truck").cumcount().add(1).astype("int32")
+    totals = placed.groupby("truck", sort=True).agg(
+        cases=("area_m2", "size"),
+        priority_cases=("priority", "sum"),
+        area_m2=("area_m2", "sum"),
+        weight_kg=("weight_kg", "sum"),
+        earliest_deadline=("deadline", "min"),
+    ).reset_index()
+    totals["fill_area_pct"] = (totals["area_m2"] / truck.floor_m2 * 100).round(1)
+    totals["fill_weight_pct"] = (totals["weight_kg"] / truck.max_weight_kg * 100).round(1)
+
+    return LoadPlan(
+        assignments=placed.reset_index(drop=True),
+        trucks=totals,
+        unplaced=plan.loc[plan["truck"].isna()].drop(columns=["truck", "load_order"]).reset_index(drop=True),
+        elapsed_ms=(time.perf_counter() - started) * 1000.0,
+    )
@@ -0,0 +1,335 @@
+"""
+Lokale HTTP lookup service voor handscanners.
+
+Een scanner vraagt per case label (bv. `AC36F`) in één keer de locatie,
+status, priority, stocklocatie en deadline op, zonder Streamlit rerun. De
+service houdt een hash index op `case_label` en `item_number` over dezelfde
+overview dataset als de app; een nieuwe dataset versie wordt volledig
+opgebouwd en dan in één toewijzing actief (lezers zien altijd één versie).
+Status, priority en comments komen uit de gedeelde state store.
+
+Endpoints (JSON):
+    GET  /health
+    GET  /case/<case_label>
+    GET  /cases?labels=AC36F,AB12C      (of herhaald ?label=...)
+    POST /cases   {"labels": ["AC36F", "AB12C"]}
+    GET  /item/<item_number>
+
+Los draaien op de laatste batch snapshot:
+    python -m atlas.lookup_service --port 8765
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .load_planner import case_deadlines
+
+logger = logging.getLogger(__name__)
+
+# Overview kolommen in een lookup antwoord (voor zover aanwezig)
+LOOKUP_COLUMNS = (
+    "case_label", "case_type", "item_number", "productielocatie", "locatie",
+    "in_willebroek", "stock_location", "arrival_date", "deadline",
+)
+# (state veld, antwoordveld, default) zoals in `apply_overlays`
+_OVERLAYS = (("status_map", "status", ""), ("priorities", "priority", False), ("comments", "comment", ""))
+MAX_BATCH = 500
+
+
+def _key(value: Any) -> str:
+    return str(value).strip().upper()
+
+
+def _json_values(values: pd.Series) -> List[Any]:
+    """Column values as JSON-ready Python objects (dates as ISO strings, missing as None)."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return [None if pd.isna(v) else v.date().isoformat() for v in values]
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype(bool).tolist()
+    cells = values.astype(object).where(values.notna(), None).tolist()
+    return [v.item() if isinstance(v, np.generic) else (v.strip() if isinstance(v, str) else v) for v in cells]
+
+
+@dataclass(frozen=True)
+class LookupIndex:
+    """Immutable lookup tables of one dataset version."""
+
+    version: str
+    built_at: datetime
+    cases: Mapping[str, Dict[str, Any]]
+    items: Mapping[str, Tuple[str, ...]]
+
+    @classmethod
+    def build(
+        cls,
+        version: str,
+        overview: pd.DataFrame,
+        extra_holidays: Sequence = (),
+        excluded_holidays: Sequence = (),
+    ) -> "LookupIndex":
+        """Precompute one JSON-ready record per case label plus the item -> cases map."""
+        if overview.empty or "case_label" not in overview.columns:
+            return cls(version, datetime.now(), {}, {})
+        frame = overview.drop_duplicates("case_label", keep="last")
+        frame = frame.assign(deadline=case_deadlines(frame, extra_holidays, excluded_holidays))
+        # Status/priority/comment uit de overview zelf dienen als basis voor de overlays
+        columns = [c for c in (*LOOKUP_COLUMNS, *(o[1] for o in _OVERLAYS)) if c in frame.columns]
+        # Kolom per kolom omzetten, daarna één dict per rij
+        converted = {c: _json_values(frame[c]) for c in columns}
+        records = [dict(zip(columns, row)) for row in zip(*converted.values())]
+        keys = [_key(label) for label in frame["case_label"]]
+        cases = dict(zip(keys, records))
+        items: Dict[str, Tuple[str, ...]] = {}
+        if "item_number" in frame.columns:
+            grouped = pd.Series(keys, index=frame.index).groupby(
+                frame["item_number"].astype("string").str.strip().str.upper(), sort=False
+            )
+            items = {item: tuple(labels) for item, labels in grouped if item}
+        return cls(version, datetime.now(), cases, items)
+
+
+class LookupService:
+    """
+    Case lookups against the active `LookupIndex`.
+
+    `publish` swaps the index reference in one assignment; a request reads
+    the reference once, so it never mixes two versions. The overlay state
+    is re-read through `state_loader` at most every `state_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        state_loader: Optional[Callable[[], Mapping[str, Mapping[str, Any]]]] = None,
+        state_ttl: float = 2.0,
+    ):
+        self._index = LookupIndex("", datetime.now(), {}, {})
+        self._state_loader = state_loader
+        self._state_ttl = state_ttl
+        self._state: Mapping[str, Mapping[str, Any]] = {}
+        self._state_at = 0.0
+        self._state_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> str:
+        return self._index.version
+
+    def publish(self, index: LookupIndex) -> None:
+        """Make `index` the active version (atomic reference swap)."""
+        self._index = index
+        logger.info("Lookup index %s actief: %d cases", index.version, len(index.cases))
+
+    def _overlay_state(self) -> Mapping[str, Mapping[str, Any]]:
+        if self._state_loader is None:
+            return self._state
+        if time.monotonic() - self._state_at >= self._state_ttl and self._state_lock.acquire(blocking=False):
+            try:
+                self._state = self._state_loader()
+                self._state_at = time.monotonic()
+            except Exception:
+                logger.exception("State store niet leesbaar; vorige overlays blijven gelden")
+            finally:
+                self._state_lock.release()
+        return self._state
+
+    def _record(self, index: LookupIndex, state: Mapping[str, Mapping[str, Any]], label: str) -> Optional[dict]:
+        base = index.cases.get(_key(label))
+        if base is None:
+            return None
+        record = dict(base)
+        for field, column, default in _OVERLAYS:
+            value = (state.get(field) or {}).get(base["case_label"])
+            record[column] = value if value is not None else record.get(column, default)
+        record["priority"] = bool(record["priority"])
+        return record
+
+    def lookup(self, label: str) -> Optional[dict]:
+        """Record of one case label (case-insensitive, padding ignored), or None."""
+        return self._record(self._index, self._overlay_state(), label)
+
+    def lookup_many(self, labels: Iterable[str]) -> Dict[str, Any]:
+        """
+        Records of several case labels against one index version.
+
+        Returns:
+            Dict with `version`, `found` (label -> record) and `missing`
+        """
+        index, state = self._index, self._overlay_state()
+        found: Dict[str, dict] = {}
+        missing: List[str] = []
+        for label in labels:
+            record = self._record(index, state, label)
+            if record is None:
+                missing.append(label)
+            else:
+                found[label] = record
+        return {"version": index.version, "found": found, "missing": missing}
+
+    def by_item(self, item_number: str) -> Dict[str, Any]:
+        """All cases with `item_number`."""
+        index, state = self._index, self._overlay_state()
+        labels = index.items.get(_key(item_number), ())
+        return {"version": index.version, "cases": [self._record(index, state, label) for label in labels]}
+
+    def health(self) -> Dict[str, Any]:
+        index = self._index
+        return {
+            "version": index.version,
+            "cases": len(index.cases),
+            "items": len(index.items),
+            "built_at": index.built_at.isoformat(timespec="seconds"),
+        }
+
+    def start(self, host: str = "127.0.0.1", port: int = 8765) -> "LookupService":
+        """Serve HTTP in a daemon thread (no-op when already running)."""
+        if self._server is not None:
+            return self
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="atlas-lookup", daemon=True)
+        self._thread.start()
+        logger.info("Lookup service luistert op http://%s:%d", host, self._server.server_address[1])
+        return self
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        return self._server.server_address[:2] if self._server is not None else None
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _handler(service: LookupService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _batch(self, labels: List[str]) -> None:
+            labels = [label for label in labels if label.strip()]
+            if len(labels) > MAX_BATCH:
+                self._send(413, {"error": f"Maximaal {MAX_BATCH} labels per aanvraag"})
+                return
+            self._send(200, service.lookup_many(labels))
+
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+            if parts == ["health"]:
+                self._send(200, service.health())
+            elif len(parts) == 2 and parts[0] == "case":
+                # Versie en record uit dezelfde index
+                result = service.lookup_many([parts[1]])
+                if result["missing"]:
+                    self._send(404, {"version": result["version"], "error": f"Case {parts[1]} niet gevonden"})
+                else:
+                    self._send(200, {"version": result["version"], "case": result["found"][parts[1]]})
+            elif parts == ["cases"]:
+                query = parse_qs(url.query)
+                labels = [*query.get("label", []), *(l for v in query.get("labels", []) for l in v.split(","))]
+                self._batch(labels)
+            elif len(parts) == 2 and parts[0] == "item":
+                self._send(200, service.by_item(parts[1]))
+            else:
+                self._send(404, {"error": "Onbekend endpoint"})
+
+        def do_POST(self) -> None:
+            if urlsplit(self.path).path.strip("/") != "cases":
+                self._send(404, {"error": "Onbekend endpoint"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                labels = json.loads(self.rfile.read(length) or b"{}").get("labels", [])
+                if not isinstance(labels, list):
+                    raise ValueError("labels moet een lijst zijn")
+            except (ValueError, AttributeError) as exc:
+                self._send(400, {"error": f"Ongeldige aanvraag: {exc}"})
+                return
+            self._batch([str(label) for label in labels])
+
+        def log_message(self, format: str, *args: Any) -> None:
+            # Geen regel per scan op stderr
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+_service: Optional[LookupService] = None
+_service_lock = threading.Lock()
+
+
+def get_lookup_service(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    state_loader: Optional[Callable[[], Mapping[str, Mapping[str, Any]]]] = None,
+) -> LookupService:
+    """Process-wide lookup service, started on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = LookupService(state_loader).start(host, port)
+        return _service
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--poll", type=float, default=30.0, help="Seconden tussen checks op een nieuwe snapshot")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    app_dir = Path(__file__).resolve().parent.parent
+    for path in (app_dir.parent, app_dir):
+        if str(path) not in sys.path:
+            sys.path.append(str(path))
+    from config import AppConfig
+
+    from .batch import snapshot_store
+    from .state_store import get_state_store
+
+    config = AppConfig.get_config()
+    store = snapshot_store(config)
+    state_store = get_state_store(Path(config.STATE_FILE).with_suffix(".sqlite"), legacy_file=config.STATE_FILE)
+    service = get_lookup_service(args.host, args.port, state_store.load)
+
+    while True:
+        version = store.latest_version()
+        if version and version != service.version:
+            loaded = store.load(version)
+            if loaded is not None:
+                frames, _ = loaded
+                service.publish(LookupIndex.build(
+                    version,
+                    frames.get("overview", pd.DataFrame()),
+                    extra_holidays=getattr(config, "EXTRA_HOLIDAYS", ()),
+                    excluded_holidays=getattr(config, "WORKED_HOLIDAYS", ()),
+                ))
+        time.sleep(args.poll)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,231 @@
+"""
+Geversioneerde memoization van de executive metrics en dashboard aggregaten.
+
+Metrics en grafiekreeksen worden één keer per dataset versie berekend en
+gedeeld door alle sessies. De tellers die van status, priority en comments
+afhangen worden bij een edit incrementeel bijgewerkt: alleen de gewijzigde
+state entries worden verrekend, de frames worden niet opnieuw gescand.
+Tijdreeksen worden vooraf gedownsampled tot een vast maximum aantal punten,
+zodat het dashboard even snel rendert bij 1.000 als bij 100.000 cases.
+"""
+
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .state_store import diff_state
+
+# (state veld, overview kolom, default) zoals in `apply_overlays`
+_OVERLAY_FIELDS = (
+    ("status_map", "status", ""),
+    ("priorities", "priority", False),
+    ("comments", "comment", ""),
+)
+
+
+def downsample(series: pd.Series, max_points: int = 120) -> pd.Series:
+    """
+    Sum consecutive points into at most `max_points` buckets.
+
+    Each bucket is labelled with its first index value, so a daily series
+    becomes e.g. a weekly one once it is long enough.
+    """
+    if len(series) <= max_points:
+        return series
+    size = int(np.ceil(len(series) / max_points))
+    buckets = np.arange(len(series)) // size
+    summed = series.groupby(buckets).sum()
+    summed.index = series.index[::size][: len(summed)]
+    return summed
+
+
+def _top(counts: pd.Series, limit: int, other: str = "Overig") -> pd.Series:
+    counts = counts.sort_values(ascending=False, kind="stable")
+    if len(counts) <= limit:
+        return counts
+    return pd.concat([counts.iloc[:limit], pd.Series({other: counts.iloc[limit:].sum()})])
+
+
+@dataclass(frozen=True)
+class DashboardAggregates:
+    """Pre-aggregated, bounded-size chart series for one dataset version."""
+
+    by_location: pd.Series
+    by_case_type: pd.Series
+    in_willebroek: pd.Series
+    arrivals: pd.Series
+    transport_by_location: pd.Series
+
+
+def dashboard_aggregates(
+    overview: pd.DataFrame,
+    transport: pd.DataFrame,
+    max_points: int = 120,
+    max_categories: int = 20,
+) -> DashboardAggregates:
+    """Chart series of the executive dashboard, computed in one pass per frame."""
+    def counts(frame: pd.DataFrame, column: str) -> pd.Series:
+        if frame.empty or column not in frame.columns:
+            return pd.Series(dtype="int64")
+        return frame[column].astype("string").fillna("Onbekend").value_counts(sort=False)
+
+    arrivals = pd.Series(dtype="int64")
+    if "arrival_date" in overview.columns:
+        dates = pd.to_datetime(overview["arrival_date"], errors="coerce").dropna().dt.normalize()
+        if not dates.empty:
+            arrivals = dates.value_counts().sort_index().asfreq("D", fill_value=0)
+
+    return DashboardAggregates(
+        by_location=_top(counts(overview, "productielocatie"), max_categories),
+        by_case_type=_top(counts(overview, "case_type"), max_categories),
+        in_willebroek=counts(overview, "in_willebroek"),
+        arrivals=downsample(arrivals, max_points),
+        transport_by_location=_top(counts(transport, "productielocatie"), max_categories),
+    )
+
+
+class OverlayCounters:
+    """
+    Status, priority and comment counters over the overview with overlays.
+
+    Built with one pass over the overview; afterwards `sync()` only looks at
+    the state entries that changed since the previous call.
+    """
+
+    def __init__(self, overview: pd.DataFrame, state: Mapping[str, Mapping[str, Any]]):
+        labels = overview["case_label"].astype(str) if "case_label" in overview.columns else pd.Series(dtype=str)
+        self._rows: Dict[str, int] = labels.value_counts().to_dict()
+        self._base: Dict[str, Dict[str, Any]] = {}
+        self.counts: Dict[str, Counter] = {}
+        self._state: Dict[str, Dict[str, Any]] = {}
+        for field, column, default in _OVERLAY_FIELDS:
+            base = overview[column] if column in overview.columns else pd.Series(default, index=overview.index)
+            base = base.astype(object).where(base.notna(), default)
+            # Enkel waarden die afwijken van de default bijhouden
+            differs = base != default
+            self._base[field] = dict(zip(labels[differs], base[differs]))
+            mapping = dict(state.get(field) or {})
+            effective = labels.map(mapping).astype(object)
+            effective = effective.where(effective.notna(), base).fillna(default)
+            if field == "priorities":
+                effective = effective.astype(bool)
+            self.counts[field] = Counter(effective.tolist())
+            self._state[field] = mapping
+
+    def _effective(self, field: str, label: str, mapping: Mapping[str, Any], default: Any) -> Any:
+        value = mapping.get(label)
+        if value is None:
+            value = self._base[field].get(label, default)
+        return bool(value) if field == "priorities" else value
+
+    def sync(self, state: Mapping[str, Mapping[str, Any]]) -> int:
+        """
+        Apply the state entries that changed since the last call.
+
+        Returns:
+            Number of changed entries applied
+        """
+        applied = 0
+        for field, _, default in _OVERLAY_FIELDS:
+            previous = self._state[field]
+            current = dict(state.get(field) or {})
+            changes = diff_state(previous, current)
+            counter = self.counts[field]
+            for label in changes:
+                rows = self._rows.get(str(label))
+                if not rows:
+                    continue
+                counter[self._effective(field, label, previous, default)] -= rows
+                counter[self._effective(field, label, current, default)] += rows
+                applied += 1
+            self._state[field] = current
+        return applied
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for the KPI tiles."""
+        total = sum(self._rows.values())
+        return {
+            "priority_cases": int(self.counts["priorities"][True]),
+            "with_comments": int(total - self.counts["comments"][""]),
+            "status_counts": {k: int(v) for k, v in self.counts["status_map"].items() if k and v},
+        }
+
+
+class MetricsMemo:
+    """Metrics, aggregates and overlay counters per dataset version (latest `keep` versions)."""
+
+    def __init__(self, keep: int = 4):
+        self.keep = keep
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._entry_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def _memo(self, version: str, name: str, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(version)
+            if entry is not None and name in entry:
+                return entry[name]
+            lock = self._entry_locks.setdefault((version, name), threading.Lock())
+        with lock:
+            with self._lock:
+                entry = self._entries.get(version)
+                if entry is not None and name in entry:
+                    return entry[name]
+            value = compute()
+            with self._lock:
+                self._entries.setdefault(version, {})[name] = value
+                self._entries.move_to_end(version)
+                while len(self._entries) > self.keep:
+                    stale, _ = self._entries.popitem(last=False)
+                    for key in [k for k in self._entry_locks if k[0] == stale]:
+                        del self._entry_locks[key]
+            return value
+
+    def metrics(self, version: str, compute: Callable[[], dict], as_of: Optional[date] = None) -> dict:
+        """
+        Executive metrics of a dataset version, computed once per day.
+
+        `backlog_overdue` hangt af van de datum, dus de dag hoort bij de sleutel.
+        """
+        as_of = as_of or date.today()
+        return self._memo(version, f"metrics:{as_of.isoformat()}", compute)
+
+    def aggregates(
+        self,
+        version: str,
+        overview: pd.DataFrame,
+        transport: pd.DataFrame,
+        max_points: int = 120,
+    ) -> DashboardAggregates:
+        """Downsampled dashboard series of a dataset version, computed once."""
+        return self._memo(version, "aggregates", lambda: dashboard_aggregates(overview, transport, max_points))
+
+    def overlay_counts(
+        self,
+        version: str,
+        overview: pd.DataFrame,
+        state: Mapping[str, Mapping[str, Any]],
+    ) -> Dict[str, Any]:
+        """Status/priority/comment counters, updated incrementally from `state`."""
+        counters: OverlayCounters = self._memo(version, "counters", lambda: OverlayCounters(overview, state))
+        with self._entry_locks.setdefault((version, "counters"), threading.Lock()):
+            counters.sync(state)
+            return counters.summary()
+
+
+_memo: Optional[MetricsMemo] = None
+_memo_lock = threading.Lock()
+
+
+def get_metrics_memo() -> MetricsMemo:
+    """Process-wide metrics memo shared by all sessions."""
+    global _memo
+    with _memo_lock:
+        if _memo is None:
+            _memo = MetricsMemo()
+        return _memo
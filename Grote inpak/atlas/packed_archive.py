@@ -0,0 +1,361 @@
+"""
+Kolomgebaseerd packed archief met unieke case labels.
+
+De legacy PACKED exports (`PACKED.XLS`, `PACKED_Y.XLS`, `PACKED_N.XLS`) worden
+één keer per bestandsinhoud geconverteerd en als apart Arrow IPC bestand
+toegevoegd; bij het lezen blijft per case label enkel de regel uit de
+recentste export. De historiek van het bestaande archief
+(`load_packed_archive`) wordt één keer vooraan geïmporteerd. Lezen gebeurt
+memory-mapped en alleen voor de gevraagde kolommen, zodat de packed tab en
+de backlog uitsluiting niet trager worden naarmate de historiek groeit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Kolommen van de PACKED exports; rapportkolommen (BREAKLVL, ATFORESC*) vallen weg
+_EXPORT_COLUMNS = {
+    "PCCANO": "case_label",
+    "PCCATP": "case_type",
+    "PCPROD": "product",
+    "PCSERI": "serial_number",
+    "PCSTAT": "status",
+    "PCPCCD": "packing_code",
+    "PCPCKN": "packing_number",
+    "PCSCDT": "sched_date",
+    "SPEC_INST": "special_instructions",
+}
+PACKED_COLUMNS = (*_EXPORT_COLUMNS.values(), "source")
+# Projectie voor de packed index en de backlog uitsluiting
+INDEX_COLUMNS = ("case_label", "case_type", "status", "sched_date")
+
+_MANIFEST = "manifest.json"
+_LOCK = ".lock.sqlite"
+
+
+def packed_exports(directory: Union[str, Path]) -> List[Path]:
+    """PACKED exports in `directory`, oldest first (newer exports win on merge)."""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    files = [
+        p for p in directory.iterdir()
+        if p.is_file() and p.name.upper().startswith("PACKED") and p.suffix.lower() in (".xls", ".xlsx")
+    ]
+    return sorted(files, key=lambda p: (p.stat().st_mtime_ns, p.name))
+
+
+def read_packed_export(path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Typed rows of one PACKED export, one row per case label.
+
+    Returns:
+        DataFrame with PACKED_COLUMNS; rows without a case label are dropped
+    """
+    path = Path(path)
+    raw = pd.read_excel(path, dtype=str, engine="xlrd" if path.suffix.lower() == ".xls" else None)
+    raw.columns = raw.columns.astype(str).str.strip().str.upper()
+    frame = raw.reindex(columns=list(_EXPORT_COLUMNS)).rename(columns=_EXPORT_COLUMNS).astype("string")
+    # xlrd levert getallen als float: "20250114.0" -> "20250114"
+    frame = frame.apply(lambda col: col.str.strip().str.replace(r"\.0$", "", regex=True)).replace("", pd.NA)
+    frame = frame.loc[frame["case_label"].notna()].copy()
+    frame["sched_date"] = pd.to_datetime(frame["sched_date"], format="%Y%m%d", errors="coerce")
+    frame["source"] = pd.Series(path.name, index=frame.index, dtype="string")
+    return frame.drop_duplicates("case_label", keep="last").reset_index(drop=True)
+
+
+def _content_hash(path: Path) -> str:
+    digest = hashlib.sha1()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        (col, pa.timestamp("us") if col == "sched_date" else pa.string())
+        for col in PACKED_COLUMNS
+    ])
+
+
+def normalize_packed_frame(frame: pd.DataFrame, source: str) -> pd.DataFrame:
+    """
+    Packed rows from another source (e.g. `load_packed_archive()`) in the archive layout.
+
+    Returns:
+        DataFrame with PACKED_COLUMNS, one row per case label
+    """
+    frame = frame.reindex(columns=list(PACKED_COLUMNS))
+    for col in PACKED_COLUMNS:
+        if col != "sched_date":
+            frame[col] = frame[col].astype("string").str.strip().replace("", pd.NA)
+    if not pd.api.types.is_datetime64_any_dtype(frame["sched_date"]):
+        text = frame["sched_date"].astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+        frame["sched_date"] = pd.to_datetime(text, format="%Y%m%d", errors="coerce")
+    frame["source"] = frame["source"].fillna(source)
+    frame = frame.loc[frame["case_label"].notna()]
+    return frame.drop_duplicates("case_label", keep="last").reset_index(drop=True)
+
+
+class PackedArchive:
+    """
+    Deduplicated packed archive as a list of memory-mapped Arrow parts.
+
+    Every export is ingested once per content hash as a new part file that
+    holds only that export's rows; reads merge the parts in order, so per
+    case label the row of the most recent export wins. Once `compact_every`
+    parts exist they are folded into one. The manifest lists the parts and
+    is replaced atomically; the app and the batch pipeline can both sync
+    the same directory, since every read-modify-write of the manifest runs
+    under a cross-process lock.
+    """
+
+    def __init__(self, directory: Union[str, Path], compact_every: int = 16):
+        self.directory = Path(directory)
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, int, int], str] = {}
+        self._failed: Set[str] = set()
+        self._frames: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], pd.DataFrame] = {}
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Cross-process lock around manifest updates (SQLite write lock, ook op Windows)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.directory / _LOCK, timeout=60, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield
+        finally:
+            conn.execute("ROLLBACK")
+            conn.close()
+
+    def _manifest(self) -> dict:
+        try:
+            manifest = json.loads((self.directory / _MANIFEST).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault("ingested", {})
+        if "parts" not in manifest:
+            # Oud formaat: één generatie in `current`
+            current = manifest.pop("current", None)
+            manifest["parts"] = [current] if current else []
+        return manifest
+
+    def _write_manifest(self, manifest: dict) -> None:
+        tmp = self.directory / f".{_MANIFEST}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp, self.directory / _MANIFEST)
+
+    @property
+    def version(self) -> Optional[str]:
+        """Identifier of the current set of parts (changes with every ingest)."""
+        parts = self._manifest()["parts"]
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12] if parts else None
+
+    @property
+    def seeded(self) -> bool:
+        """True once the history from the legacy archive has been imported."""
+        return any(entry.get("seed") for entry in self._manifest()["ingested"].values())
+
+    def __len__(self) -> int:
+        return len(self.read(["case_label"]))
+
+    def _hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = (path.name, stat.st_size, stat.st_mtime_ns)
+        if key not in self._stats:
+            self._stats[key] = _content_hash(path)
+        return self._stats[key]
+
+    def _write_part(self, frame: pd.DataFrame) -> str:
+        import pyarrow as pa
+        from pyarrow import feather
+
+        name = f"packed-{datetime.now():%Y%m%d-%H%M%S%f}.arrow"
+        tmp = self.directory / f".{name}.tmp"
+        feather.write_feather(
+            pa.Table.from_pandas(frame, schema=_schema(), preserve_index=False), tmp, compression="uncompressed"
+        )
+        os.replace(tmp, self.directory / name)
+        return name
+
+    def _merged(self, parts: Sequence[str], columns: Sequence[str]) -> pd.DataFrame:
+        """Parts read in order, keeping the last row per case label."""
+        from pyarrow import feather
+
+        wanted = list(dict.fromkeys(["case_label", *columns]))
+        frames = [
+            feather.read_table(self.directory / part, columns=wanted, memory_map=True).to_pandas()
+            for part in parts
+        ]
+        if not frames:
+            return pd.DataFrame(columns=list(columns))
+        merged = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        merged = merged.drop_duplicates("case_label", keep="last").reset_index(drop=True)
+        return merged[list(columns)]
+
+    def _compact(self, manifest: dict) -> None:
+        """Fold all parts into one and remove part files the manifest no longer lists."""
+        if len(manifest["parts"]) >= self.compact_every:
+            merged = self._merged(manifest["parts"], PACKED_COLUMNS)
+            manifest["parts"] = [self._write_part(merged)]
+            self._write_manifest(manifest)
+        for stale in self.directory.glob("packed-*.arrow"):
+            if stale.name not in manifest["parts"]:
+                try:
+                    stale.unlink()
+                except OSError:
+                    # Nog gemapt door een lezer (Windows): volgende compactie ruimt op
+                    pass
+
+    def _add(self, key: str, frame: pd.DataFrame, entry: dict, first: bool = False) -> None:
+        """Write `frame` as a part and record `key` as ingested (caller holds the locks)."""
+        manifest = self._manifest()
+        if key in manifest["ingested"]:
+            return
+        part = self._write_part(frame)
+        if first:
+            # Historiek vóór de exports: nieuwere exports winnen bij het samenvoegen
+            manifest["parts"].insert(0, part)
+        else:
+            manifest["parts"].append(part)
+        manifest["ingested"][key] = {
+            **entry,
+            "part": part,
+            "rows": len(frame),
+            "ingested_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._write_manifest(manifest)
+        self._compact(manifest)
+        self._frames.clear()
+
+    def seed(self, legacy: Callable[[], pd.DataFrame], source: str = "load_packed_archive") -> int:
+        """
+        Import the packed history of the legacy archive once, ahead of all exports.
+
+        Returns:
+            Number of rows imported (0 when the archive was seeded before)
+        """
+        with self._lock, self._exclusive():
+            if self.seeded:
+                return 0
+            frame = normalize_packed_frame(legacy(), source)
+            self._add(f"seed:{source}", frame, {"file": source, "seed": True}, first=True)
+            logger.info("Packed archief gevuld met %d cases uit %s", len(frame), source)
+            return len(frame)
+
+    def ingest(self, path: Union[str, Path]) -> int:
+        """
+        Convert one export and append it to the archive as a new part.
+
+        Returns:
+            Number of rows written (0 when this content was ingested before)
+        """
+        path = Path(path)
+        with self._lock:
+            digest = self._hash(path)
+            if digest in self._failed or digest in self._manifest()["ingested"]:
+                return 0
+            try:
+                frame = read_packed_export(path)
+            except Exception:
+                # Zelfde inhoud niet bij elke sync opnieuw proberen
+                self._failed.add(digest)
+                raise
+            with self._exclusive():
+                if digest in self._manifest()["ingested"]:
+                    return 0
+                self._add(digest, frame, {"file": path.name})
+            logger.info("Packed export %s toegevoegd: %d regels", path.name, len(frame))
+            return len(frame)
+
+    def sync(
+        self,
+        export_dir: Union[str, Path],
+        seed: Optional[Callable[[], pd.DataFrame]] = None,
+    ) -> "PackedArchive":
+        """
+        Ingest every export in `export_dir` that is not in the archive yet.
+
+        With `seed` the legacy history is imported first if that has not
+        happened yet; a failing seed raises, so callers do not mistake an
+        unseeded archive for the full packed history.
+        """
+        if seed is not None and not self.seeded:
+            self.seed(seed)
+        for path in packed_exports(export_dir):
+            try:
+                self.ingest(path)
+            except Exception:
+                # Half gekopieerde of corrupte export: de rest van het archief blijft bruikbaar
+                logger.exception("Packed export %s kon niet ingelezen worden", path.name)
+        return self
+
+    def read(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Memory-mapped read of the archive, limited to `columns`.
+
+        Returns:
+            DataFrame with one row per case label
+        """
+        columns = tuple(columns or PACKED_COLUMNS)
+        with self._lock:
+            parts = tuple(self._manifest()["parts"])
+            key = (parts, columns)
+            if key not in self._frames:
+                if not parts:
+                    return pd.DataFrame(columns=list(columns))
+                # Onder het lock: een compactie elders mag de parts niet tijdens het lezen wegnemen
+                with self._exclusive():
+                    parts = tuple(self._manifest()["parts"])
+                    key = (parts, columns)
+                    frame = self._merged(parts, columns)
+                self._frames = {k: v for k, v in self._frames.items() if k[0] == parts}
+                self._frames[key] = frame
+            return self._frames[key]
+
+
+_archives: Dict[Path, PackedArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def get_packed_archive(directory: Union[str, Path]) -> PackedArchive:
+    """Process-wide packed archive per directory."""
+    key = Path(directory).resolve()
+    with _archives_lock:
+        if key not in _archives:
+            _archives[key] = PackedArchive(key)
+        return _archives[key]
+
+
+def packed_archive_loader(
+    export_dir: Union[str, Path],
+    archive_dir: Union[str, Path],
+    columns: Sequence[str] = INDEX_COLUMNS,
+    seed: Optional[Callable[[], pd.DataFrame]] = None,
+) -> Callable[[], pd.DataFrame]:
+    """
+    Loader for `get_packed_index`: seed once, ingest new exports, then read only `columns`.
+
+    Args:
+        seed: Legacy archive (`load_packed_archive`) imported before the first export
+    """
+    def load() -> pd.DataFrame:
+        return get_packed_archive(archive_dir).sync(export_dir, seed=seed).read(columns)
+    return load
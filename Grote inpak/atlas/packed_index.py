@@ -0,0 +1,151 @@
+"""
+Process-wide index van reeds gepackte cases, per archiefmap.
+
+Het packed archief wordt één keer per archiefversie ingelezen en gedeeld
+door alle tabs en sessies. Een goedkope fingerprint (bestandsnaam, grootte,
+mtime) bepaalt wanneer opnieuw gelezen wordt; de content hash van de
+case labels bepaalt of de index echt vervangen moet worden.
+"""
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _normalize_labels(labels: pd.Series) -> pd.Series:
+    return labels.astype("string").str.strip()
+
+
+class PackedCaseIndex:
+    """Immutable set of packed case labels with vectorized membership tests."""
+
+    def __init__(self, archive: pd.DataFrame):
+        self.archive = archive
+        if not archive.empty and "case_label" in archive.columns:
+            labels = _normalize_labels(archive["case_label"]).dropna()
+        else:
+            labels = pd.Series([], dtype="string")
+        self.labels = pd.Index(labels.unique())
+        self.content_hash = hashlib.sha1(
+            pd.util.hash_pandas_object(pd.Series(self.labels.sort_values()), index=False).to_numpy().tobytes()
+        ).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def contains(self, case_labels: pd.Series) -> np.ndarray:
+        """
+        Vectorized membership test.
+
+        Returns:
+            Boolean array, True where the case label is already packed
+        """
+        if len(self.labels) == 0:
+            return np.zeros(len(case_labels), dtype=bool)
+        return _normalize_labels(case_labels).isin(self.labels).fillna(False).to_numpy(dtype=bool)
+
+    def exclude_packed(self, df: pd.DataFrame, column: str = "case_label") -> pd.DataFrame:
+        """Return `df` without the rows whose case label is already packed."""
+        if df.empty or column not in df.columns:
+            return df
+        return df.loc[~self.contains(df[column])]
+
+
+def _fingerprint(archive_dir: Path) -> Tuple:
+    if not archive_dir.exists():
+        return ()
+    return tuple(
+        sorted(
+            (p.name, p.stat().st_size, p.stat().st_mtime_ns)
+            for p in archive_dir.iterdir()
+            if p.is_file()
+        )
+    )
+
+
+@dataclass
+class _Cached:
+    """Index of one archive folder plus the fingerprint it was checked against."""
+
+    index: Optional[PackedCaseIndex] = None
+    fingerprint: Optional[Tuple] = None
+    checked_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_indexes: Dict[Path, _Cached] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_packed_index(
+    archive_dir: Path,
+    loader: Callable[[], pd.DataFrame],
+    max_age_seconds: float = 300.0,
+) -> PackedCaseIndex:
+    """
+    Return the shared packed-case index of `archive_dir`, rebuilding it only when needed.
+
+    The archive is re-read when the files in `archive_dir` change, or at
+    most every `max_age_seconds` for archives kept outside that folder. The
+    existing index object is kept when the content hash did not change.
+
+    Args:
+        archive_dir: Folder with the packed exports
+        loader: Function returning the packed archive (e.g. `packed_archive_loader(...)`)
+        max_age_seconds: Maximum time between content checks
+
+    Raises:
+        Whatever `loader` raises when there is no previous index to fall back on
+    """
+    key = Path(archive_dir).resolve()
+    with _indexes_lock:
+        cached = _indexes.setdefault(key, _Cached())
+
+    with cached.lock:
+        fingerprint = _fingerprint(key)
+        now = time.monotonic()
+        if (
+            cached.index is not None
+            and fingerprint == cached.fingerprint
+            and now - cached.checked_at < max_age_seconds
+        ):
+            return cached.index
+
+        try:
+            archive = loader()
+        except Exception:
+            # Archief tijdelijk onleesbaar: vorige index blijft geldig. Zonder
+            # vorige index niets cachen, zodat de volgende oproep opnieuw probeert
+            if cached.index is not None:
+                return cached.index
+            raise
+
+        candidate = PackedCaseIndex(archive if archive is not None else pd.DataFrame())
+        if cached.index is None or candidate.content_hash != cached.index.content_hash:
+            cached.index = candidate
+        cached.fingerprint = fingerprint
+        cached.checked_at = now
+        return cached.index
+
+
+def invalidate_packed_index(archive_dir: Optional[Path] = None) -> None:
+    """
+    Force a re-read on the next `get_packed_index` call (e.g. after an upload).
+
+    Only the index of `archive_dir` is invalidated when given, otherwise all.
+    """
+    with _indexes_lock:
+        if archive_dir is None:
+            targets = list(_indexes.values())
+        else:
+            cached = _indexes.get(Path(archive_dir).resolve())
+            targets = [cached] if cached is not None else []
+    for cached in targets:
+        with cached.lock:
+            cached.fingerprint = None
@@ -0,0 +1,115 @@
+"""
+Server-side paginering voor de overview grid en de backlog tabel.
+
+Sorteren en knippen gebeurt in pandas; naar de browser gaat enkel de
+zichtbare pagina met de zichtbare kolommen. Voor kolommen van de gedeelde
+overview wordt de sorteervolgorde één keer per dataset versie berekend
+(`SortIndex`); een gefilterde weergave neemt daar enkel zijn rijen uit,
+zonder opnieuw te sorteren.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = (50, 100, 250, 500)
+
+
+@dataclass(frozen=True)
+class Page:
+    """One page of a (filtered, sorted) frame, projected on the visible columns."""
+
+    frame: pd.DataFrame
+    number: int
+    pages: int
+    total: int
+    start: int
+
+    @property
+    def stop(self) -> int:
+        return self.start + len(self.frame)
+
+
+def sort_positions(values: pd.Series, ascending: bool = True) -> np.ndarray:
+    """Stable sort order of `values` with missing values last, in either direction."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    order = values.reset_index(drop=True).sort_values(
+        ascending=ascending, kind="stable", na_position="last"
+    ).index
+    return order.to_numpy()
+
+
+class SortIndex:
+    """Sorted row labels of a shared frame per (column, direction), computed on first use."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self._frame = frame
+        self._orders: Dict[Tuple[str, bool], pd.Index] = {}
+        self._lock = threading.Lock()
+
+    def covers(self, column: str) -> bool:
+        return column in self._frame.columns
+
+    def order(self, column: str, ascending: bool = True) -> pd.Index:
+        key = (column, ascending)
+        with self._lock:
+            order = self._orders.get(key)
+        if order is None:
+            order = self._frame.index[sort_positions(self._frame[column], ascending)]
+            with self._lock:
+                self._orders[key] = order
+        return order
+
+
+def paginate(
+    frame: pd.DataFrame,
+    columns: Sequence[str],
+    sort_by: Optional[str] = None,
+    ascending: bool = True,
+    page: int = 1,
+    page_size: int = 100,
+    sort_index: Optional[SortIndex] = None,
+) -> Page:
+    """
+    Sort `frame` and cut out one page with only `columns`.
+
+    With a `sort_index` covering `sort_by` the precomputed order of the
+    shared frame is restricted to the rows of `frame` (its index labels must
+    come from that frame); otherwise only the rows of `frame` are sorted.
+    `page` is 1-based and clamped to the available pages.
+    """
+    if sort_by is None or sort_by not in frame.columns:
+        labels = frame.index
+    elif sort_index is not None and sort_index.covers(sort_by):
+        order = sort_index.order(sort_by, ascending)
+        labels = order[order.isin(frame.index)]
+    else:
+        labels = frame.index[sort_positions(frame[sort_by], ascending)]
+
+    total = len(labels)
+    pages = max(1, -(-total // page_size))
+    number = min(max(1, int(page)), pages)
+    start = (number - 1) * page_size
+    visible = frame.loc[labels[start:start + page_size], list(columns)]
+    return Page(frame=visible, number=number, pages=pages, total=total, start=start)
+
+
+_indexes: "OrderedDict[str, SortIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_sort_index(version: str, frame: pd.DataFrame, keep: int = 4) -> SortIndex:
+    """Process-wide sort index of a dataset version (latest `keep` versions)."""
+    with _indexes_lock:
+        index = _indexes.get(version)
+        if index is None:
+            index = _indexes[version] = SortIndex(frame)
+            while len(_indexes) > keep:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(version)
+        return index
@@ -0,0 +1,67 @@
+"""
+Gedeelde build stap van de Atlas pipeline.
+
+Zowel de Streamlit app als de headless batch pipeline bouwen overview en
+transport op dezelfde manier: incrementeel via `build_overview` en met
+compacte dtypes voor de gedeelde frames. De gedeelde frames bevatten geen
+sessie-state: status, priority en comment staan op hun default en worden
+per sessie met `apply_overlays` ingevuld.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from .incremental import get_incremental_overview
+from .profiling import PipelineProfiler
+from .schema import compact_dtypes, memory_report
+
+
+def build_frames(
+    df_pils: pd.DataFrame,
+    df_erp: pd.DataFrame,
+    df_stock: Optional[pd.DataFrame],
+    build_overview: Callable[..., Tuple[pd.DataFrame, pd.DataFrame]],
+    profiler: PipelineProfiler,
+    verify: bool = False,
+) -> Tuple[Dict[str, pd.DataFrame], float]:
+    """
+    Build overview/transport and compact all shared frames.
+
+    The build does not see the comments or statuses of the state store:
+    the dataset key only covers the input files, so baked-in state would
+    outlive its deletion in the store.
+
+    Returns:
+        Tuple of (frames, raw_mb) where raw_mb is the footprint of
+        overview, transport and stock before compacting
+    """
+    # Incrementeel: alleen gewijzigde cases worden opnieuw opgebouwd
+    overview_builder = get_incremental_overview(build_overview, verify=verify)
+    with profiler.stage("build_overview"):
+        overview, transport = overview_builder.build(
+            df_pils,
+            df_erp,
+            df_stock=df_stock,
+            comments_map={}
+        )
+    profiler.cache_event("overview_incremental", overview_builder.last_stats.get("mode") == "incremental")
+
+    # Sessie-kolommen op hun default (zie `apply_overlays`)
+    if "status" not in overview.columns:
+        overview.loc[:, "status"] = ""
+
+    raw_mb = memory_report({"overview": overview, "transport": transport, "df_stock": df_stock})["MB"].sum()
+    with profiler.stage("compact_dtypes"):
+        overview = compact_dtypes(overview)
+        transport = compact_dtypes(transport)
+        df_stock = compact_dtypes(df_stock)
+
+    frames = {
+        "overview": overview,
+        "transport": transport,
+        "df_pils": df_pils,
+        "df_erp": df_erp,
+        "df_stock": df_stock
+    }
+    return frames, raw_mb
@@ -0,0 +1,289 @@
+"""
+Streaming ingestie van de BE2NET_PO_INBOX purchase-order XML bestanden.
+
+Elke `<BE2NET_PO_NEW>` regel wordt met `iterparse` gelezen en meteen
+vrijgegeven, zodat het geheugen constant blijft ongeacht de bestandsgrootte.
+Resultaten worden per content hash gecachet (in het geheugen en optioneel op
+schijf); alleen nieuwe bestanden worden geparsed, bij veel bestanden
+parallel in een process pool.
+
+ItemNumber bevat het kisttype (bv. `C651`); Location is `<serienummer>/<case>`
+en eindigt op het case label uit de overview.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_RECORD_TAG = "BE2NET_PO_NEW"
+_FIELDS = {
+    "PurchaseOrderNumber": "po_number",
+    "Division": "division",
+    "VendorCode": "vendor_code",
+    "ItemNumber": "item_number",
+    "Quantity": "quantity",
+    "UnitOf": "unit",
+    "Location": "location",
+    "PackingCode": "packing_code",
+    "PackingInstruction": "packing_instruction",
+    "DeliveryDate": "delivery_date",
+    "DueDate": "due_date",
+    "CreationDateTime": "created_at",
+    "CompanyCode": "company_code",
+    "WarehouseCode": "warehouse_code",
+}
+PO_COLUMNS = (
+    "po_number", "item_number", "case_type", "case_label", "serial_number", "quantity", "unit",
+    "delivery_date", "due_date", "created_at", "division", "vendor_code", "packing_code",
+    "packing_instruction", "company_code", "warehouse_code", "location", "source",
+)
+_CATEGORY_COLUMNS = (
+    "case_type", "unit", "division", "vendor_code", "packing_code", "packing_instruction",
+    "company_code", "warehouse_code", "source",
+)
+
+# Vanaf dit aantal nieuwe bestanden loont een process pool
+PARALLEL_THRESHOLD = 32
+
+
+def _local(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def parse_po_records(path: Union[str, Path]) -> List[Dict[str, str]]:
+    """Raw field values per PO line, parsed with iterparse in constant memory."""
+    records = []
+    current: Optional[Dict[str, str]] = None
+    # Open elementen, om een verwerkte regel uit zijn ouder te kunnen halen
+    open_elems: List[ET.Element] = []
+    for event, elem in ET.iterparse(str(path), events=("start", "end")):
+        tag = _local(elem.tag)
+        if event == "start":
+            open_elems.append(elem)
+            if tag == _RECORD_TAG:
+                current = {}
+            continue
+        open_elems.pop()
+        if tag == _RECORD_TAG:
+            records.append(current or {})
+            current = None
+            # Verwerkte regel leegmaken én loskoppelen: anders blijven de lege
+            # elementen aan de boom hangen en groeit het geheugen met het bestand
+            elem.clear()
+            if open_elems:
+                open_elems[-1].remove(elem)
+        elif current is not None and tag in _FIELDS:
+            current[_FIELDS[tag]] = (elem.text or "").strip()
+    return records
+
+
+def _typed(records: List[Dict[str, str]], source: str) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(records).reindex(columns=list(_FIELDS.values()))
+    frame = frame.replace("", pd.NA)
+    location = frame["location"].astype("string")
+    frame["serial_number"] = location.str.extract(r"^(.+)/[^/]*$", expand=False)
+    frame["case_label"] = location.str.extract(r"([^/]+)$", expand=False).str.upper()
+    frame["case_type"] = frame["item_number"].astype("string").str.upper()
+    frame["quantity"] = pd.to_numeric(frame["quantity"], errors="coerce").astype("Int32")
+    for col in ("delivery_date", "due_date", "created_at"):
+        frame[col] = pd.to_datetime(frame[col], errors="coerce")
+    for col in ("po_number", "item_number", "location", "serial_number", "case_label"):
+        frame[col] = frame[col].astype("string")
+    frame["source"] = source
+    return frame.reindex(columns=list(PO_COLUMNS))
+
+
+def parse_po_file(path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Typed PO lines of one inbox file.
+
+    Returns:
+        DataFrame with PO_COLUMNS (categoricals are applied after merging)
+    """
+    path = Path(path)
+    return _typed(parse_po_records(path), path.name)
+
+
+def _parse_or_empty(path: Path) -> pd.DataFrame:
+    # Eén kapot of half geschreven bestand mag de rest niet blokkeren
+    try:
+        return parse_po_file(path)
+    except ET.ParseError as exc:
+        logger.warning("Ongeldig PO XML bestand overgeslagen: %s (%s)", path.name, exc)
+        return _typed([], path.name)
+
+
+def _content_hash(path: Path) -> str:
+    digest = hashlib.sha1()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _categorize(frame: pd.DataFrame) -> pd.DataFrame:
+    for col in _CATEGORY_COLUMNS:
+        frame[col] = frame[col].astype("category")
+    return frame
+
+
+def join_purchase_orders(
+    overview: pd.DataFrame,
+    purchase_orders: pd.DataFrame,
+    keys: Sequence[str] = ("case_label",),
+    columns: Sequence[str] = ("po_number", "delivery_date"),
+    prefix: str = "po_",
+) -> pd.DataFrame:
+    """
+    Left-join PO fields onto the overview.
+
+    By default on the case label from Location. Use
+    `keys=("case_type", "delivery_date")` to match on ItemNumber (the case
+    type) and delivery date instead. When several PO lines match, the most
+    recently created one is used.
+
+    Returns:
+        Copy of `overview` with the PO columns added (prefixed)
+    """
+    keys = list(keys)
+    if purchase_orders.empty or not set(keys) <= set(overview.columns):
+        return overview.assign(**{f"{prefix}{c.removeprefix(prefix)}": pd.NA for c in columns if c not in keys})
+    wanted = [c for c in columns if c not in keys]
+    latest = (
+        purchase_orders.sort_values("created_at", kind="stable", na_position="first")
+        .drop_duplicates(keys, keep="last")[keys + wanted]
+        .rename(columns={c: f"{prefix}{c.removeprefix(prefix)}" for c in wanted})
+    )
+    left = overview.copy()
+    right_keys = latest[keys].copy()
+    for key in keys:
+        if pd.api.types.is_datetime64_any_dtype(latest[key]):
+            left[f"_{key}"] = pd.to_datetime(left[key], errors="coerce").dt.normalize()
+            right_keys[key] = latest[key].dt.normalize()
+        else:
+            left[f"_{key}"] = left[key].astype("string").str.strip().str.upper()
+            right_keys[key] = latest[key].astype("string")
+    right = latest.drop(columns=keys).assign(**{f"_{k}": right_keys[k] for k in keys})
+    joined = left.merge(right, on=[f"_{k}" for k in keys], how="left", validate="many_to_one")
+    joined.index = overview.index
+    return joined.drop(columns=[f"_{k}" for k in keys])
+
+
+class POInbox:
+    """
+    Cached view of all PO XML files in a folder.
+
+    Files are identified by content hash; a cheap (name, size, mtime) lookup
+    avoids re-hashing unchanged files on every call.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        cache_dir: Optional[Union[str, Path]] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.directory = Path(directory)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._parsed: Dict[str, pd.DataFrame] = {}
+        self._result: Optional[Tuple[Tuple[str, ...], pd.DataFrame]] = None
+
+    def _files(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(p for p in self.directory.iterdir() if p.is_file() and p.suffix.lower() == ".xml")
+
+    def _hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = (path.name, stat.st_size, stat.st_mtime_ns)
+        if key not in self._hashes:
+            self._hashes[key] = _content_hash(path)
+        return self._hashes[key]
+
+    def _cached(self, digest: str) -> Optional[pd.DataFrame]:
+        frame = self._parsed.get(digest)
+        if frame is None and self.cache_dir is not None:
+            path = self.cache_dir / f"{digest}.pkl"
+            if path.exists():
+                try:
+                    frame = pd.read_pickle(path)
+                except Exception:
+                    frame = None
+        return frame
+
+    def _store(self, digest: str, frame: pd.DataFrame) -> None:
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_dir / f"{digest}.tmp"
+        frame.to_pickle(tmp)
+        os.replace(tmp, self.cache_dir / f"{digest}.pkl")
+
+    def _parse_many(self, paths: List[Path]) -> List[pd.DataFrame]:
+        if len(paths) < PARALLEL_THRESHOLD:
+            return [_parse_or_empty(p) for p in paths]
+        workers = self.max_workers or min(os.cpu_count() or 1, 8)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_parse_or_empty, paths, chunksize=8))
+
+    def load(self) -> pd.DataFrame:
+        """
+        All PO lines in the inbox; only new or changed files are parsed.
+
+        Returns:
+            DataFrame with PO_COLUMNS, sorted by delivery date
+        """
+        with self._lock:
+            files = self._files()
+            digests = [self._hash(p) for p in files]
+            if self._result is not None and self._result[0] == tuple(digests):
+                return self._result[1]
+
+            frames: Dict[str, pd.DataFrame] = {}
+            missing: List[Tuple[str, Path]] = []
+            for digest, path in zip(digests, files):
+                cached = self._cached(digest)
+                if cached is None:
+                    missing.append((digest, path))
+                else:
+                    frames[digest] = cached
+            if missing:
+                parsed = self._parse_many([p for _, p in missing])
+                for (digest, _), frame in zip(missing, parsed):
+                    frames[digest] = frame
+                    self._store(digest, frame)
+            self._parsed = frames
+
+            parts = [frames[d] for d in digests if not frames[d].empty]
+            if parts:
+                table = pd.concat(parts, ignore_index=True)
+            else:
+                table = _typed([], "")
+            table = _categorize(table.sort_values("delivery_date", kind="stable").reset_index(drop=True))
+            self._result = (tuple(digests), table)
+            return table
+
+
+_inboxes: Dict[Path, POInbox] = {}
+_inboxes_lock = threading.Lock()
+
+
+def get_po_inbox(directory: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None) -> POInbox:
+    """Process-wide inbox per directory."""
+    key = Path(directory).resolve()
+    with _inboxes_lock:
+        if key not in _inboxes:
+            _inboxes[key] = POInbox(key, cache_dir=cache_dir)
+        return _inboxes[key]
@@ -0,0 +1,273 @@
+"""
+Timing en profiling van de pipeline stages.
+
+Elke stage (laden, stock, state, build_overview, sync, tab renderers) wordt
+gemeten met `perf_counter` en als JSON regel gelogd; het logbestand roteert
+boven `max_log_bytes`. Per verwerking wordt een run bijgehouden met de
+stage-duren, cache hits/misses en optioneel een cProfile capture. De
+sidebar toont de laatste run en de stage-statistieken.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageStats:
+    """Aggregated durations of one stage across runs and sessions."""
+
+    count: int = 0
+    last_ms: float = 0.0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+
+@dataclass
+class PipelineRun:
+    """Timings of one processing run."""
+
+    run_id: str
+    label: str
+    started_at: datetime
+    stages: Dict[str, float] = field(default_factory=dict)
+    cache: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    total_ms: float = 0.0
+    profile: Optional[str] = None
+    error: Optional[str] = None
+
+
+class PipelineProfiler:
+    """
+    Process-wide stage timer.
+
+    Stages always update the aggregated statistics; they are also recorded
+    on the run that is active in the calling thread, so background work
+    (the database sync) does not end up in an unrelated session's run.
+    """
+
+    def __init__(
+        self,
+        log_path: Optional[Union[str, Path]] = None,
+        history: int = 20,
+        max_log_bytes: int = 5 * 1024 * 1024,
+        log_backups: int = 3,
+    ):
+        self.log_path = Path(log_path) if log_path else None
+        self.max_log_bytes = max_log_bytes
+        self.log_backups = log_backups
+        self._stats: Dict[str, StageStats] = {}
+        self._cache: Dict[str, Dict[str, int]] = {}
+        self._runs: Deque[PipelineRun] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self._local = threading.local()
+        self._counter = 0
+
+    def _active_run(self) -> Optional[PipelineRun]:
+        return getattr(self._local, "run", None)
+
+    def _log(self, event: dict) -> None:
+        line = json.dumps(event, default=str)
+        logger.info(line)
+        if self.log_path is None:
+            return
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                self._rotate()
+                with self.log_path.open("a", encoding="utf-8") as handle:
+                    handle.write(line + "\n")
+        except OSError:
+            # Logging mag de pipeline nooit breken
+            pass
+
+    def _rotate(self) -> None:
+        """Shift the log to `.1` ... `.{log_backups}` once it exceeds `max_log_bytes`."""
+        try:
+            if self.log_path.stat().st_size < self.max_log_bytes:
+                return
+        except FileNotFoundError:
+            return
+        for index in range(self.log_backups - 1, 0, -1):
+            older = self.log_path.with_name(f"{self.log_path.name}.{index}")
+            if older.exists():
+                os.replace(older, self.log_path.with_name(f"{self.log_path.name}.{index + 1}"))
+        if self.log_backups > 0:
+            os.replace(self.log_path, self.log_path.with_name(f"{self.log_path.name}.1"))
+        else:
+            self.log_path.unlink()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block of work as stage `name`."""
+        run = self._active_run()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                stats = self._stats.setdefault(name, StageStats())
+                stats.count += 1
+                stats.last_ms = duration_ms
+                stats.total_ms += duration_ms
+                stats.max_ms = max(stats.max_ms, duration_ms)
+                if run is not None:
+                    run.stages[name] = run.stages.get(name, 0.0) + duration_ms
+            event = {
+                "event": "stage",
+                "stage": name,
+                "duration_ms": round(duration_ms, 1),
+                "run_id": run.run_id if run else None,
+                "thread": threading.current_thread().name,
+            }
+            if error:
+                event["error"] = error
+            self._log(event)
+
+    def cache_event(self, name: str, hit: bool) -> None:
+        """Count a cache hit or miss for `name`."""
+        kind = "hit" if hit else "miss"
+        run = self._active_run()
+        with self._lock:
+            counts = self._cache.setdefault(name, {"hit": 0, "miss": 0})
+            counts[kind] += 1
+            if run is not None:
+                run_counts = run.cache.setdefault(name, {"hit": 0, "miss": 0})
+                run_counts[kind] += 1
+
+    @contextmanager
+    def run(self, label: str, profile: bool = False, top: int = 40) -> Iterator[PipelineRun]:
+        """
+        Record a processing run in the calling thread.
+
+        With `profile=True` the run is captured with cProfile; only one
+        profiled run can be active at a time, others run unprofiled.
+        """
+        with self._lock:
+            self._counter += 1
+            record = PipelineRun(
+                run_id=f"{datetime.now():%Y%m%d%H%M%S}-{self._counter}",
+                label=label,
+                started_at=datetime.now(),
+            )
+        previous = self._active_run()
+        self._local.run = record
+        profiler = None
+        if profile and self._profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as exc:
+            record.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            record.total_ms = (time.perf_counter() - start) * 1000
+            if profiler is not None:
+                profiler.disable()
+                self._profile_lock.release()
+                buffer = io.StringIO()
+                pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(top)
+                record.profile = buffer.getvalue()
+            self._local.run = previous
+            with self._lock:
+                self._runs.append(record)
+            self._log({
+                "event": "run",
+                "run_id": record.run_id,
+                "label": record.label,
+                "total_ms": round(record.total_ms, 1),
+                "stages": {k: round(v, 1) for k, v in record.stages.items()},
+                "cache": record.cache,
+                "profiled": record.profile is not None,
+                "error": record.error,
+            })
+
+    def expected_progress(self, stages: List[str]) -> Callable[[str], int]:
+        """
+        Progress percentage after each stage, weighted by the last durations.
+
+        Stages without history count as the average known stage, so the
+        first run falls back to equal steps.
+        """
+        with self._lock:
+            known = {name: self._stats[name].last_ms for name in stages if name in self._stats}
+        default = sum(known.values()) / len(known) if known else 1.0
+        weights = [max(known.get(name, default), 1.0) for name in stages]
+        total = sum(weights)
+        done: Dict[str, int] = {}
+        cumulative = 0.0
+        for name, weight in zip(stages, weights):
+            cumulative += weight
+            done[name] = min(99, int(round(100 * cumulative / total)))
+        return lambda name: done.get(name, 0)
+
+    def last_run(self) -> Optional[PipelineRun]:
+        with self._lock:
+            return self._runs[-1] if self._runs else None
+
+    def stage_table(self) -> pd.DataFrame:
+        """Aggregated stage statistics, slowest mean first."""
+        with self._lock:
+            rows = [
+                {
+                    "stage": name,
+                    "laatste ms": stats.last_ms,
+                    "gem. ms": stats.mean_ms,
+                    "max ms": stats.max_ms,
+                    "aantal": stats.count,
+                }
+                for name, stats in self._stats.items()
+            ]
+        table = pd.DataFrame(rows, columns=["stage", "laatste ms", "gem. ms", "max ms", "aantal"])
+        return table.sort_values("gem. ms", ascending=False, ignore_index=True)
+
+    def cache_table(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [{"cache": name, "hits": c["hit"], "misses": c["miss"]} for name, c in self._cache.items()]
+        return pd.DataFrame(rows, columns=["cache", "hits", "misses"])
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._cache.clear()
+            self._runs.clear()
+
+
+_profilers: Dict[Optional[Path], PipelineProfiler] = {}
+_profilers_lock = threading.Lock()
+
+
+def get_profiler(log_path: Optional[Union[str, Path]] = None) -> PipelineProfiler:
+    """Process-wide profiler per JSON log file."""
+    key = Path(log_path).resolve() if log_path else None
+    with _profilers_lock:
+        if key not in _profilers:
+            _profilers[key] = PipelineProfiler(key)
+        return _profilers[key]
@@ -0,0 +1,376 @@
+"""
+Persistente bezettingsindex van de kanban rekken.
+
+Houdt per rek en slot bij welke case er staat, in een lokale SQLite
+database (WAL mode) zodat alle sessies en processen dezelfde bezetting
+zien. In het geheugen staat per (rek, maatklasse) een min-heap met vrije
+slots en een dict case -> slot, zodat "waar zet ik deze case" en "waar
+staat case X" O(log n) zijn. Elke plaatsing, verplaatsing of vrijgave is
+één rij in een journal; `refresh()` past enkel de nieuwe journal-regels toe
+in plaats van het volledige rekbeeld opnieuw op te bouwen.
+"""
+
+import heapq
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+Slot = Tuple[str, int]
+
+DEFAULT_SIZE_CLASS = "standaard"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    rack TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    size_class TEXT NOT NULL,
+    PRIMARY KEY (rack, slot)
+);
+CREATE TABLE IF NOT EXISTS occupancy (
+    case_label TEXT PRIMARY KEY,
+    rack TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    UNIQUE (rack, slot)
+);
+CREATE TABLE IF NOT EXISTS moves (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    case_label TEXT NOT NULL,
+    rack TEXT,
+    slot INTEGER,
+    ts REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def size_classes(
+    case_type: pd.Series,
+    classes: Optional[Mapping[str, str]] = None,
+) -> pd.Series:
+    """
+    Rack size class per case.
+
+    Looks up the exact case_type in `classes` (config `KANBAN_SIZE_CLASSES`),
+    then its prefix letter, then DEFAULT_SIZE_CLASS.
+    """
+    table = {str(k).strip().upper(): v for k, v in (classes or {}).items()}
+    codes, uniques = pd.factorize(case_type.astype("string").str.strip().str.upper())
+    mapped = [table.get(code) or table.get(code[:1]) or DEFAULT_SIZE_CLASS for code in uniques]
+    values = pd.Series([*mapped, DEFAULT_SIZE_CLASS], dtype="string").to_numpy()
+    # factorize geeft -1 voor ontbrekende case_types: laatste waarde = default
+    return pd.Series(values[codes], index=case_type.index, dtype="string")
+
+
+class RackIndex:
+    """
+    Occupancy of the kanban racks, keyed on (rack, slot) and on case label.
+
+    Free slots live in one heap per (rack, size class) with lazy deletion:
+    occupied entries are skipped when they surface. A UNIQUE constraint on
+    (rack, slot) makes concurrent placements from different sessions safe;
+    the loser gets the next free slot.
+    """
+
+    def __init__(self, db_path: Union[str, Path], compact_every: int = 5000):
+        self.db_path = Path(db_path)
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._racks: List[str] = []
+        self._slots: Dict[Slot, str] = {}
+        self._case_slot: Dict[str, Slot] = {}
+        self._slot_case: Dict[Slot, str] = {}
+        self._free: Dict[Tuple[str, str], List[int]] = {}
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        self.refresh()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Korte connecties per operatie: sqlite3 connecties zijn niet thread-safe
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    # -- in-memory structuren -------------------------------------------------
+
+    def _reload(self, conn: sqlite3.Connection) -> None:
+        """Full load of slots and occupancy (startup, or after a compaction we missed)."""
+        self._slots = {
+            (rack, slot): size_class
+            for rack, slot, size_class in conn.execute("SELECT rack, slot, size_class FROM slots")
+        }
+        self._racks = sorted({rack for rack, _ in self._slots})
+        self._case_slot = {
+            case_label: (rack, slot)
+            for case_label, rack, slot in conn.execute("SELECT case_label, rack, slot FROM occupancy")
+        }
+        self._slot_case = {slot: case_label for case_label, slot in self._case_slot.items()}
+        self._free = {}
+        for (rack, slot), size_class in self._slots.items():
+            if (rack, slot) not in self._slot_case:
+                self._free.setdefault((rack, size_class), []).append(slot)
+        for heap in self._free.values():
+            heapq.heapify(heap)
+        self._seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM moves").fetchone()[0]
+
+    def _apply(self, case_label: str, target: Optional[Slot]) -> None:
+        previous = self._case_slot.pop(case_label, None)
+        if previous is not None and self._slot_case.get(previous) == case_label:
+            del self._slot_case[previous]
+            heapq.heappush(self._free.setdefault((previous[0], self._slots[previous]), []), previous[1])
+        if target is not None:
+            self._case_slot[case_label] = target
+            self._slot_case[target] = case_label
+
+    def refresh(self) -> None:
+        """Apply journal entries written by other sessions or processes since the last call."""
+        with self._lock, self._connect() as conn:
+            self._refresh(conn)
+
+    def _refresh(self, conn: sqlite3.Connection) -> None:
+        # Eén leestransactie: een compactie in een ander proces mag niet
+        # tussen compacted_seq, de volledige load en de moves vallen.
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'compacted_seq'").fetchone()
+            slot_count = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+            if self._seq < (int(row[0]) if row else 0) or slot_count != len(self._slots):
+                self._reload(conn)
+            else:
+                for seq, case_label, rack, slot in conn.execute(
+                    "SELECT seq, case_label, rack, slot FROM moves WHERE seq > ? ORDER BY seq", (self._seq,)
+                ).fetchall():
+                    self._apply(case_label, None if rack is None else (rack, slot))
+                    self._seq = seq
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # -- opvragingen ----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._case_slot)
+
+    def locate(self, case_label: str) -> Optional[Slot]:
+        """(rack, slot) of a case, or None when it is not in a rack."""
+        return self._case_slot.get(str(case_label).strip())
+
+    def placed_cases(self) -> List[str]:
+        """Case labels that currently have a slot."""
+        return list(self._case_slot)
+
+    def occupant(self, rack: str, slot: int) -> Optional[str]:
+        return self._slot_case.get((rack, int(slot)))
+
+    def _first_free(self, rack: str, size_class: str) -> Optional[int]:
+        heap = self._free.get((rack, size_class))
+        while heap and (rack, heap[0]) in self._slot_case:
+            # Lazy deletion: bezette slots pas verwijderen als ze bovenkomen
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def suggest(self, size_class: str = DEFAULT_SIZE_CLASS, racks: Optional[Sequence[str]] = None) -> Optional[Slot]:
+        """Lowest free slot of `size_class`, in the first rack (of `racks`) that has one."""
+        with self._lock:
+            for rack in racks or self._racks:
+                slot = self._first_free(rack, size_class)
+                if slot is not None:
+                    return rack, slot
+            return None
+
+    # -- wijzigingen ----------------------------------------------------------
+
+    def _write(self, conn: sqlite3.Connection, case_label: str, target: Optional[Slot]) -> None:
+        conn.execute("DELETE FROM occupancy WHERE case_label = ?", (case_label,))
+        if target is not None:
+            conn.execute(
+                "INSERT INTO occupancy (case_label, rack, slot) VALUES (?, ?, ?)",
+                (case_label, target[0], target[1]),
+            )
+        conn.execute(
+            "INSERT INTO moves (case_label, rack, slot, ts) VALUES (?, ?, ?, ?)",
+            (case_label, None if target is None else target[0], None if target is None else target[1], time.time()),
+        )
+
+    def _commit(self, changes: Sequence[Tuple[str, Optional[Slot]]]) -> None:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for case_label, target in changes:
+                    self._write(conn, case_label, target)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            # Eigen en andermans wijzigingen via hetzelfde pad toepassen
+            self._refresh(conn)
+            if self._seq and self._seq % self.compact_every < len(changes):
+                self._compact(conn)
+
+    def define_racks(self, layout: Mapping[str, Mapping[str, int]]) -> int:
+        """
+        Add the slots of `layout` ({rack: {size_class: slot count}}) that do not exist yet.
+
+        Slots are numbered from 1 per rack, size classes in the given order.
+        Existing slots and their occupancy are left untouched.
+
+        Returns:
+            Number of slots added
+        """
+        rows = []
+        for rack, classes in layout.items():
+            number = 0
+            for size_class, count in classes.items():
+                for _ in range(int(count)):
+                    number += 1
+                    rows.append((str(rack), number, str(size_class)))
+        with self._lock, self._connect() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+            conn.executemany("INSERT OR IGNORE INTO slots (rack, slot, size_class) VALUES (?, ?, ?)", rows)
+            added = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0] - before
+            self._refresh(conn)
+            return added
+
+    def place(
+        self,
+        case_label: str,
+        size_class: str = DEFAULT_SIZE_CLASS,
+        rack: Optional[str] = None,
+        slot: Optional[int] = None,
+    ) -> Slot:
+        """
+        Put a case in a rack, or move it when it already has a slot.
+
+        Without `slot` the lowest free slot of `size_class` is taken (in
+        `rack` when given).
+
+        Raises:
+            ValueError: When the requested slot is unknown or taken, or no
+                slot of that size class is free
+        """
+        case_label = str(case_label).strip()
+        with self._lock:
+            for _ in range(5):
+                self.refresh()
+                if slot is not None:
+                    target = (str(rack), int(slot))
+                    if target not in self._slots:
+                        raise ValueError(f"Onbekend slot {target[0]}/{target[1]}")
+                    if self._slot_case.get(target, case_label) != case_label:
+                        raise ValueError(f"Slot {target[0]}/{target[1]} is bezet door {self._slot_case[target]}")
+                else:
+                    target = self.suggest(size_class, [rack] if rack else None)
+                    if target is None:
+                        raise ValueError(f"Geen vrij slot voor maatklasse {size_class}")
+                if self._case_slot.get(case_label) == target:
+                    return target
+                try:
+                    self._commit([(case_label, target)])
+                    return target
+                except sqlite3.IntegrityError:
+                    # Slot net ingenomen door een andere sessie: opnieuw met verse bezetting
+                    continue
+            raise ValueError(f"Geen vrij slot gevonden voor {case_label}")
+
+    def release(self, case_labels: Iterable[str]) -> int:
+        """
+        Free the slots of these cases (e.g. packed or shipped).
+
+        Returns:
+            Number of slots freed
+        """
+        with self._lock:
+            self.refresh()
+            placed = [(label, None) for label in {str(c).strip() for c in case_labels} if label in self._case_slot]
+            if placed:
+                self._commit(placed)
+            return len(placed)
+
+    def release_packed(self, packed_index) -> int:
+        """
+        Free the slots of cases the packed index (`PackedCaseIndex`) holds.
+
+        Bedoeld na een vernieuwde packed index (watcher, batch), niet per render.
+
+        Returns:
+            Number of slots freed
+        """
+        with self._lock:
+            self.refresh()
+            placed = pd.Series(self.placed_cases(), dtype="string")
+            if placed.empty:
+                return 0
+            return self.release(placed[packed_index.contains(placed)])
+
+    def _compact(self, conn: sqlite3.Connection) -> None:
+        """Drop journal entries; occupancy already holds the current state."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            max_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM moves").fetchone()[0]
+            conn.execute("DELETE FROM moves WHERE seq < ?", (max_seq,))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('compacted_seq', ?)", (str(max_seq - 1),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # -- weergave -------------------------------------------------------------
+
+    def occupancy_frame(self) -> pd.DataFrame:
+        """One row per slot: rack, slot, size_class and case_label (NA when free)."""
+        with self._lock:
+            rows = [
+                (rack, slot, size_class, self._slot_case.get((rack, slot)))
+                for (rack, slot), size_class in sorted(self._slots.items())
+            ]
+        frame = pd.DataFrame(rows, columns=["rack", "slot", "size_class", "case_label"])
+        frame["case_label"] = frame["case_label"].astype("string")
+        return frame
+
+    def free_counts(self) -> pd.DataFrame:
+        """Free and total slots per rack and size class."""
+        frame = self.occupancy_frame()
+        if frame.empty:
+            return pd.DataFrame(columns=["rack", "size_class", "free", "total"])
+        return (
+            frame.assign(free=frame["case_label"].isna())
+            .groupby(["rack", "size_class"], sort=True)
+            .agg(free=("free", "sum"), total=("slot", "size"))
+            .reset_index()
+        )
+
+
+_indexes: Dict[Path, RackIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_rack_index(
+    db_path: Union[str, Path],
+    layout: Optional[Mapping[str, Mapping[str, int]]] = None,
+) -> RackIndex:
+    """Process-wide rack index per database path; `layout` slots are added on first use."""
+    key = Path(db_path).resolve()
+    with _indexes_lock:
+        if key not in _indexes:
+            index = RackIndex(key)
+            if layout:
+                index.define_racks(layout)
+            _indexes[key] = index
+        return _indexes[key]
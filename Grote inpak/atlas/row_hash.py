@@ -0,0 +1,156 @@
+"""
+Row-hash change detection voor de database sync.
+
+Per rij wordt een content hash berekend, gekoppeld aan de natural key
+(Packing Number/Case voor PILS, item voor ERP, item × site voor stock).
+De hashes van de laatste geslaagde sync worden lokaal bewaard, zodat een
+volgende sync alleen nieuwe, gewijzigde en verwijderde rijen verstuurt.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+
+import pandas as pd
+
+_KEY_SEPARATOR = "\x1f"
+# Ontbrekend keydeel: apart van "" zodat een delete op NULL matcht
+_KEY_NA = "\x00"
+
+
+@dataclass
+class FrameDelta:
+    """Changes of one table against the last synced state."""
+
+    table: str
+    keys: Sequence[str]
+    upserts: pd.DataFrame
+    deletes: pd.DataFrame
+    hashes: pd.Series
+    inserted: int = 0
+    updated: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return self.upserts.empty and self.deletes.empty
+
+
+def row_keys(frame: pd.DataFrame, keys: Sequence[str]) -> pd.Series:
+    """
+    Natural key per row.
+
+    The raw values are kept (no stripping) so deletes match the rows as
+    they were written to the database; missing parts are encoded apart
+    from empty strings so they turn back into NULL in `FrameDelta.deletes`.
+    """
+    parts = [frame[k].astype("string").fillna(_KEY_NA) for k in keys]
+    key = parts[0]
+    for part in parts[1:]:
+        key = key + _KEY_SEPARATOR + part
+    return key
+
+
+def row_hashes(frame: pd.DataFrame, keys: Sequence[str]) -> pd.Series:
+    """
+    Content hash per row, indexed by natural key.
+
+    Duplicate keys keep the last row, matching the upsert semantics.
+    """
+    frame = frame.loc[:, sorted(frame.columns, key=str)]
+    hashes = pd.Series(
+        pd.util.hash_pandas_object(frame, index=False).to_numpy(),
+        index=pd.Index(row_keys(frame, keys).to_numpy(dtype=object)),
+        dtype="uint64",
+    )
+    return hashes[~hashes.index.duplicated(keep="last")]
+
+
+class HashLedger:
+    """Last-synced row hashes per table, stored next to the cache."""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory: Dict[str, pd.Series] = {}
+
+    def _path(self, table: str) -> Path:
+        return self.directory / f"{table}.hashes.pkl"
+
+    def load(self, table: str) -> pd.Series:
+        with self._lock:
+            if table not in self._memory:
+                path = self._path(table)
+                try:
+                    self._memory[table] = pd.read_pickle(path) if path.exists() else pd.Series(dtype="uint64")
+                except Exception:
+                    # Corrupte ledger: volgende sync stuurt alles opnieuw
+                    self._memory[table] = pd.Series(dtype="uint64")
+            return self._memory[table]
+
+    def diff(self, table: str, frame: pd.DataFrame, keys: Sequence[str]) -> FrameDelta:
+        """
+        Compare `frame` against the last synced hashes of `table`.
+
+        Returns:
+            FrameDelta with the rows to upsert and the keys to delete
+        """
+        previous = self.load(table)
+        current = row_hashes(frame, keys)
+
+        frame_keys = pd.Index(row_keys(frame, keys).to_numpy(dtype=object))
+        last_row = ~frame_keys.duplicated(keep="last")
+        known = frame_keys.isin(previous.index)
+        old_hash = previous.reindex(frame_keys).to_numpy()
+        new_hash = current.reindex(frame_keys).to_numpy()
+        changed = known & (old_hash != new_hash)
+
+        upsert_mask = last_row & (~known | changed)
+        deleted_keys = previous.index.difference(current.index)
+        deletes = frame.iloc[0:0][list(keys)]
+        if len(deleted_keys):
+            split = pd.Series(deleted_keys, dtype="string").str.split(_KEY_SEPARATOR, expand=True, regex=False)
+            split.columns = list(keys)
+            deletes = split.where(split.ne(_KEY_NA))
+
+        return FrameDelta(
+            table=table,
+            keys=list(keys),
+            upserts=frame.loc[upsert_mask],
+            deletes=deletes,
+            hashes=current,
+            inserted=int((last_row & ~known).sum()),
+            updated=int((last_row & changed).sum()),
+        )
+
+    def commit(self, delta: FrameDelta) -> None:
+        """Store the hashes of a delta once it has been synced successfully."""
+        with self._lock:
+            path = self._path(delta.table)
+            tmp = path.with_suffix(".tmp")
+            delta.hashes.to_pickle(tmp)
+            os.replace(tmp, path)
+            self._memory[delta.table] = delta.hashes
+
+    def reset(self, table: Optional[str] = None) -> None:
+        """Forget synced hashes (e.g. after the target database was rebuilt)."""
+        with self._lock:
+            tables = [table] if table else [p.name.split(".")[0] for p in self.directory.glob("*.hashes.pkl")]
+            for name in tables:
+                self._memory.pop(name, None)
+                self._path(name).unlink(missing_ok=True)
+
+
+_ledgers: Dict[Path, HashLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_hash_ledger(directory: Union[str, Path]) -> HashLedger:
+    """Process-wide ledger per directory."""
+    key = Path(directory).resolve()
+    with _ledgers_lock:
+        if key not in _ledgers:
+            _ledgers[key] = HashLedger(key)
+        return _ledgers[key]
@@ -0,0 +1,122 @@
+"""
+Compacte dtypes voor de Atlas frames.
+
+Alles wordt ingelezen met `dtype=str`; deze schema-laag zet bekende
+kolommen om naar categoricals, nullable booleans, `Int32` en `datetime64`
+zodat de frames kleiner zijn en groupbys in de tabs sneller lopen. Enkel
+de gebouwde frames (overview, transport, stock) worden omgezet: de inputs
+van `build_overview` blijven tekst, want die vult en overschrijft waarden
+die geen bestaande categorie zijn.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = (
+    "productielocatie", "status", "case_type", "stock_location", "locatie",
+    "Division", "Case Type", "Stock Location", "site", "Location",
+)
+BOOLEAN_COLUMNS = ("in_willebroek", "priority")
+INT_COLUMNS = ("stapel", "term_werkdagen", "dagen_te_laat", "dagen_in_willebroek")
+DATETIME_COLUMNS = ("arrival_date", "deadline")
+
+# Kolommen die nooit categorical worden (sleutels, vrije tekst)
+_NEVER_CATEGORY = {"case_label", "item_number", "comment", "Case", "Item number", "Serial  number"}
+
+_TRUE_VALUES = {"true", "1", "ja", "yes", "y", "x"}
+_FALSE_VALUES = {"false", "0", "nee", "no", "n", ""}
+
+
+def _to_boolean(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype("boolean").fillna(False)
+    text = values.astype("string").str.strip().str.lower()
+    result = pd.Series(pd.NA, index=values.index, dtype="boolean")
+    result[text.isin(_TRUE_VALUES).fillna(False).to_numpy()] = True
+    result[text.isin(_FALSE_VALUES).fillna(False).to_numpy()] = False
+    # Vlaggen: onbekend telt als False, zodat `== True` filters blijven werken
+    return result.fillna(False)
+
+
+def _to_int32(values: pd.Series) -> Optional[pd.Series]:
+    numbers = pd.to_numeric(values, errors="coerce")
+    valid = numbers.dropna()
+    if len(valid) < values.notna().sum():
+        return None
+    if not np.all(np.mod(valid, 1) == 0):
+        return None
+    if len(valid) and (valid.max() > np.iinfo(np.int32).max or valid.min() < np.iinfo(np.int32).min):
+        return None
+    return numbers.astype("Int32")
+
+
+def _to_datetime(values: pd.Series) -> Optional[pd.Series]:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    text = values.astype("string").str.strip()
+    non_null = text.dropna()
+    if non_null.empty:
+        return pd.to_datetime(text, errors="coerce")
+    fmt = "%Y%m%d" if non_null.str.fullmatch(r"\d{8}").all() else None
+    parsed = pd.to_datetime(text, errors="coerce", format=fmt)
+    # Alleen omzetten als (bijna) alles parseert: anders geen data verliezen
+    if parsed.notna().sum() < 0.9 * len(non_null):
+        return None
+    return parsed
+
+
+def compact_dtypes(df: pd.DataFrame, extra_categories: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Convert known columns to compact dtypes.
+
+    Only the columns in the lists above (plus `extra_categories`) are
+    converted; other columns keep their dtype.
+
+    Returns:
+        New DataFrame; the input is left untouched
+    """
+    if df is None or df.empty:
+        return df
+    result = df.copy()
+    categories = set(CATEGORY_COLUMNS) | set(extra_categories)
+
+    for col in result.columns:
+        values = result[col]
+        name = str(col)
+        if name in BOOLEAN_COLUMNS:
+            result[col] = _to_boolean(values)
+        elif name in DATETIME_COLUMNS:
+            converted = _to_datetime(values)
+            if converted is not None:
+                result[col] = converted
+        elif name in INT_COLUMNS:
+            converted = _to_int32(values)
+            if converted is not None:
+                result[col] = converted
+        elif name not in categories or name in _NEVER_CATEGORY or isinstance(values.dtype, pd.CategoricalDtype):
+            continue
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            result[col] = values.astype("category")
+    return result
+
+
+def memory_report(frames: Dict[str, Optional[pd.DataFrame]]) -> pd.DataFrame:
+    """
+    Deep memory usage per frame.
+
+    Returns:
+        DataFrame with frame, rijen, kolommen and MB columns
+    """
+    rows = []
+    for name, frame in frames.items():
+        if frame is None:
+            continue
+        rows.append({
+            "frame": name,
+            "rijen": len(frame),
+            "kolommen": len(frame.columns),
+            "MB": frame.memory_usage(deep=True).sum() / 1024 / 1024,
+        })
+    return pd.DataFrame(rows, columns=["frame", "rijen", "kolommen", "MB"])
@@ -0,0 +1,145 @@
+"""
+Process-wide, geversioneerde dataset gedeeld door alle Streamlit sessies.
+
+De zware pipeline (laden, valideren, stock, build_overview) draait één keer
+per set inputbestanden; alle sessies lezen dezelfde frames. Sessies houden
+zelf alleen hun kleine overlays bij (filters, status, priorities, comments).
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    One immutable build of the pipeline.
+
+    Frames are shared between sessions and must be treated as read-only:
+    copy before modifying (see `apply_overlays`).
+    """
+
+    version: str
+    key: str
+    frames: Mapping[str, pd.DataFrame]
+    built_at: datetime
+    extras: Mapping[str, Any] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        frame = self.frames.get(name)
+        return frame if frame is not None else pd.DataFrame()
+
+
+class DatasetRegistry:
+    """Keeps the latest datasets and makes sure each input key is built once."""
+
+    def __init__(self, keep: int = 4):
+        self.keep = keep
+        self._datasets: "OrderedDict[str, Dataset]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._counter = itertools.count(1)
+
+    def latest(self, prefix: str = "") -> Optional[Dataset]:
+        """Most recently published dataset whose key starts with `prefix`."""
+        with self._lock:
+            return next(
+                (d for d in reversed(self._datasets.values()) if d.key.startswith(prefix)),
+                None,
+            )
+
+    def get(self, version: str) -> Optional[Dataset]:
+        with self._lock:
+            return next((d for d in self._datasets.values() if d.version == version), None)
+
+    def publish(self, key: str, frames: Dict[str, pd.DataFrame], extras: Optional[dict] = None) -> Dataset:
+        """Register a new dataset version; older versions beyond `keep` are released."""
+        dataset = Dataset(
+            version=f"v{next(self._counter)}-{key.rpartition(':')[2][:8]}",
+            key=key,
+            frames=MappingProxyType(dict(frames)),
+            built_at=datetime.now(),
+            extras=MappingProxyType(dict(extras or {})),
+        )
+        with self._lock:
+            self._datasets.pop(key, None)
+            self._datasets[key] = dataset
+            while len(self._datasets) > self.keep:
+                self._datasets.popitem(last=False)
+        return dataset
+
+    def get_or_build(
+        self,
+        key: str,
+        build: Callable[[], Tuple[Dict[str, pd.DataFrame], dict]],
+        force: bool = False,
+    ) -> Tuple[Dataset, bool]:
+        """
+        Return the dataset for `key`, building it if needed.
+
+        Concurrent sessions asking for the same key wait for a single build.
+
+        Returns:
+            Tuple of (dataset, built) where built is True when this call ran the pipeline
+        """
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                existing = self._datasets.get(key)
+            if existing is not None and not force:
+                return existing, False
+            frames, extras = build()
+            return self.publish(key, frames, extras), True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datasets.clear()
+
+
+def apply_overlays(
+    overview: pd.DataFrame,
+    status_map: Optional[dict] = None,
+    priorities: Optional[dict] = None,
+    comments: Optional[dict] = None,
+) -> pd.DataFrame:
+    """
+    Session view of the shared overview with the user's state applied.
+
+    Returns:
+        Copy of `overview` with `status`, `priority` and `comment` columns
+    """
+    view = overview.copy()
+    if "case_label" not in view.columns:
+        return view
+    labels = view["case_label"]
+    for column, mapping, default in (
+        ("status", status_map, ""),
+        ("priority", priorities, False),
+        ("comment", comments, ""),
+    ):
+        base = view[column] if column in view.columns else pd.Series(default, index=view.index)
+        if isinstance(base.dtype, pd.CategoricalDtype):
+            # Bewerkbare sessie-kolommen als gewone waarden (nieuwe statussen toelaten)
+            base = base.astype(object)
+        if mapping:
+            mapped = labels.map(mapping)
+            base = mapped.where(mapped.notna(), base)
+        view[column] = base.fillna(default)
+    view["priority"] = view["priority"].astype(bool)
+    return view
+
+
+_registry = DatasetRegistry()
+
+
+def get_dataset_registry() -> DatasetRegistry:
+    """The process-wide registry (shared by all sessions)."""
+    return _registry
@@ -0,0 +1,186 @@
+"""
+Geversioneerde snapshots van de pipeline output.
+
+De batch pipeline (`python -m atlas.batch`) schrijft overview, transport,
+backlog en de inputframes als ongecomprimeerde Arrow IPC bestanden plus een
+`meta.json` met metrics. De Streamlit app memory-mapt de laatste snapshot
+voor dezelfde inputbestanden in plaats van de pipeline zelf te draaien.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+_LATEST = "LATEST"
+_META = "meta.json"
+# Verhogen wanneer de inhoud van de frames wijzigt: oude snapshots worden niet meer gevonden
+SNAPSHOT_FORMAT = 2
+
+
+def project_path(repo_dir: Union[str, Path], name: str) -> Path:
+    """
+    `repo_dir / name`, matched case-insensitively against the existing entries.
+
+    De projectmappen wisselen van hoofdletters tussen machines (`stock files`
+    vs `Stock Files`); op Linux en macOS maakt dat verschil. Zonder match
+    wordt het gevraagde pad ongewijzigd teruggegeven.
+    """
+    path = Path(repo_dir) / name
+    if path.exists():
+        return path
+    try:
+        for entry in path.parent.iterdir():
+            if entry.name.casefold() == path.name.casefold():
+                return entry
+    except OSError:
+        pass
+    return path
+
+
+def project_input_files(repo_dir: Union[str, Path], pils_csv: Union[str, Path]) -> List[Path]:
+    """PILS export, ERP link workbook and stock workbooks of the project folder."""
+    paths = [Path(pils_csv), project_path(repo_dir, "ERP link.xlsx")]
+    stock_dir = project_path(repo_dir, "stock files")
+    if stock_dir.exists():
+        paths += sorted(p for p in stock_dir.iterdir() if p.is_file())
+    return paths
+
+
+def file_fingerprint(paths: Iterable[Path]) -> str:
+    """Cheap content key from name, size and mtime of each file."""
+    digest = hashlib.sha1(f"v{SNAPSHOT_FORMAT}".encode("utf-8"))
+    for path in paths:
+        stat = path.stat()
+        digest.update(f"{path.name}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _json_default(value):
+    # numpy scalars (metrics) als gewone getallen bewaren
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def _arrow_table(frame: pd.DataFrame):
+    import pyarrow as pa
+
+    frame = frame.reset_index(drop=True)
+    frame.columns = [str(c) for c in frame.columns]
+    try:
+        return pa.Table.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Gemengde object-kolommen (bv. tekst en getallen) als tekst bewaren
+        mixed = frame.select_dtypes(include="object").columns
+        frame[mixed] = frame[mixed].astype("string")
+        return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+class SnapshotStore:
+    """
+    Directory of snapshot versions with an atomically updated `LATEST` pointer.
+
+    Each version is written to a temporary directory and renamed into place,
+    so readers never see a half-written snapshot.
+    """
+
+    def __init__(self, directory: Union[str, Path], keep: int = 5):
+        self.directory = Path(directory)
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def versions(self) -> List[str]:
+        """Complete snapshot versions, oldest first."""
+        if not self.directory.exists():
+            return []
+        return sorted(
+            p.name for p in self.directory.iterdir()
+            if p.is_dir() and not p.name.startswith(".") and (p / _META).exists()
+        )
+
+    def write(self, key: str, frames: Dict[str, pd.DataFrame], meta: Optional[dict] = None) -> str:
+        """
+        Write a new snapshot for input `key` and make it the latest.
+
+        Returns:
+            The snapshot version
+        """
+        from pyarrow import feather
+
+        version = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{key.rpartition(':')[2][:8]}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.directory / f".{version}.tmp"
+        tmp_dir.mkdir()
+        try:
+            for name, frame in frames.items():
+                if frame is not None:
+                    # Ongecomprimeerd zodat de app het bestand kan memory-mappen
+                    feather.write_feather(_arrow_table(frame), tmp_dir / f"{name}.arrow", compression="uncompressed")
+            (tmp_dir / _META).write_text(
+                json.dumps({
+                    **(meta or {}),
+                    "version": version,
+                    "key": key,
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "frames": sorted(n for n, f in frames.items() if f is not None),
+                }, default=_json_default, indent=2),
+                encoding="utf-8",
+            )
+            os.replace(tmp_dir, self.directory / version)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            pointer = self.directory / f".{_LATEST}.tmp"
+            pointer.write_text(version, encoding="utf-8")
+            os.replace(pointer, self.directory / _LATEST)
+            for old in self.versions()[:-self.keep]:
+                shutil.rmtree(self.directory / old, ignore_errors=True)
+        return version
+
+    def latest_version(self) -> Optional[str]:
+        try:
+            version = (self.directory / _LATEST).read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        return version if (self.directory / version / _META).exists() else None
+
+    def meta(self, version: str) -> dict:
+        return json.loads((self.directory / version / _META).read_text(encoding="utf-8"))
+
+    def find(self, key: str) -> Optional[str]:
+        """Newest version built from input `key`, if any."""
+        latest = self.latest_version()
+        candidates = ([latest] if latest else []) + self.versions()[::-1]
+        for version in candidates:
+            try:
+                if self.meta(version).get("key") == key:
+                    return version
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def load(self, version: Optional[str] = None) -> Optional[Tuple[Dict[str, pd.DataFrame], dict]]:
+        """
+        Memory-map the frames of `version` (default: latest).
+
+        Returns:
+            Tuple of (frames, meta), or None when no snapshot exists
+        """
+        from pyarrow import feather
+
+        version = version or self.latest_version()
+        if version is None:
+            return None
+        meta = self.meta(version)
+        frames = {
+            name: feather.read_table(self.directory / version / f"{name}.arrow", memory_map=True).to_pandas()
+            for name in meta.get("frames", [])
+        }
+        return frames, meta
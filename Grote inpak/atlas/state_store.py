@@ -0,0 +1,264 @@
+"""
+Journaled persistent state voor comments, status en priorities.
+
+Elke wijziging wordt als regel aan een append-only journal toegevoegd in een
+lokale SQLite database (WAL mode). Meerdere sessies en processen kunnen
+tegelijk schrijven zonder elkaars edits te overschrijven, en `load()` leest
+alleen de journal-regels die sinds de vorige load zijn bijgekomen.
+Periodiek wordt het journal gecompacteerd in een snapshot-tabel.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+STATE_FIELDS = ("comments", "status_map", "priorities")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    field TEXT NOT NULL,
+    case_label TEXT NOT NULL,
+    value TEXT,
+    ts REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshot (
+    field TEXT NOT NULL,
+    case_label TEXT NOT NULL,
+    value TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (field, case_label)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class StateStore:
+    """
+    Concurrency-safe store voor per-case state, keyed op `case_label`.
+
+    Een waarde `None` in `apply_changes` verwijdert de entry (tombstone in
+    het journal). Alle schrijfacties gebeuren in één `BEGIN IMMEDIATE`
+    transactie, dus een save is atomair en wordt nooit half weggeschreven.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        legacy_file: Optional[Union[str, Path]] = None,
+        compact_every: int = 500,
+    ):
+        self.db_path = Path(db_path)
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._maps: Dict[str, Dict[str, Any]] = {field: {} for field in STATE_FIELDS}
+        self._seq = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+        if legacy_file is not None:
+            self._import_legacy(Path(legacy_file))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Korte connecties per operatie: sqlite3 connecties zijn niet thread-safe
+        # en Streamlit draait elke sessie in een eigen thread.
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def _import_legacy(self, legacy_file: Path) -> None:
+        """Eenmalige migratie van het oude JSON state-bestand."""
+        if not legacy_file.exists():
+            return
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'legacy_imported'").fetchone()
+            if row is not None:
+                return
+        try:
+            legacy = json.loads(legacy_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            legacy = {}
+
+        changes = {
+            field: dict(legacy.get(field) or {})
+            for field in STATE_FIELDS
+            if isinstance(legacy.get(field), dict)
+        }
+        self.apply_changes(changes, _meta={"legacy_imported": str(legacy_file)})
+
+    def apply_changes(
+        self,
+        changes: Dict[str, Dict[str, Any]],
+        _meta: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        Append changes to the journal in a single atomic transaction.
+
+        Args:
+            changes: {field: {case_label: value}}; value None deletes the entry
+
+        Returns:
+            Number of journal entries written
+        """
+        now = time.time()
+        rows = [
+            (field, str(case_label), None if value is None else json.dumps(value), now)
+            for field, entries in changes.items()
+            if field in STATE_FIELDS
+            for case_label, value in entries.items()
+        ]
+        if not rows and not _meta:
+            return 0
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO journal (field, case_label, value, ts) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                for key, value in (_meta or {}).items():
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM journal WHERE seq > ?", (self._compacted_seq(conn),)
+            ).fetchone()[0]
+
+        if pending >= self.compact_every:
+            self.compact()
+        return len(rows)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the current state, reading only journal entries not seen before.
+
+        Returns:
+            Dict with copies of the `comments`, `status_map` and `priorities` maps
+        """
+        with self._lock, self._connect() as conn:
+            # Eén leestransactie: een compact() in een ander proces mag niet
+            # tussen compacted_seq, snapshot en journal vallen.
+            conn.execute("BEGIN")
+            try:
+                compacted = self._compacted_seq(conn)
+                if self._seq < compacted:
+                    # Entries die we nog niet gezien hebben zijn al gecompacteerd:
+                    # opnieuw starten vanaf de snapshot.
+                    maps: Dict[str, Dict[str, Any]] = {field: {} for field in STATE_FIELDS}
+                    for field, case_label, value in conn.execute(
+                        "SELECT field, case_label, value FROM snapshot"
+                    ):
+                        maps.setdefault(field, {})[case_label] = json.loads(value)
+                    self._maps = maps
+                    self._seq = compacted
+
+                journal = conn.execute(
+                    "SELECT seq, field, case_label, value FROM journal WHERE seq > ? ORDER BY seq",
+                    (self._seq,),
+                ).fetchall()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            for seq, field, case_label, value in journal:
+                target = self._maps.setdefault(field, {})
+                if value is None:
+                    target.pop(case_label, None)
+                else:
+                    target[case_label] = json.loads(value)
+                self._seq = seq
+
+            return {field: dict(values) for field, values in self._maps.items()}
+
+    def compact(self) -> None:
+        """Fold the journal into the snapshot table and drop folded entries."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                max_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM journal").fetchone()[0]
+                # Laatste journal-regel per (field, case_label) wint
+                latest = conn.execute(
+                    """
+                    SELECT j.field, j.case_label, j.value, j.seq
+                    FROM journal j
+                    JOIN (
+                        SELECT field, case_label, MAX(seq) AS seq
+                        FROM journal WHERE seq <= ? GROUP BY field, case_label
+                    ) last ON last.seq = j.seq
+                    """,
+                    (max_seq,),
+                ).fetchall()
+                conn.executemany(
+                    "DELETE FROM snapshot WHERE field = ? AND case_label = ?",
+                    [(field, case_label) for field, case_label, value, _ in latest if value is None],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO snapshot (field, case_label, value, seq) VALUES (?, ?, ?, ?)",
+                    [row for row in latest if row[2] is not None],
+                )
+                conn.execute("DELETE FROM journal WHERE seq <= ?", (max_seq,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('compacted_seq', ?)",
+                    (str(max_seq),),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _compacted_seq(conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'compacted_seq'").fetchone()
+        return int(row[0]) if row else 0
+
+
+def diff_state(
+    current: Dict[str, Any], updated: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Compute the journal entries needed to go from `current` to `updated`.
+
+    Returns:
+        {case_label: value} with None for removed entries
+    """
+    changes = {key: value for key, value in updated.items() if current.get(key) != value}
+    changes.update({key: None for key in current if key not in updated})
+    return changes
+
+
+_stores: Dict[Path, StateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(
+    db_path: Union[str, Path],
+    legacy_file: Optional[Union[str, Path]] = None,
+) -> StateStore:
+    """Process-wide StateStore per database pad (gedeeld door alle sessies)."""
+    key = Path(db_path).resolve()
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = StateStore(key, legacy_file=legacy_file)
+        return _stores[key]
@@ -0,0 +1,280 @@
+"""
+Historiek van de site stock als delta's met periodieke checkpoints.
+
+Elke nieuwe parse van de drie stock files wordt bewaard als de (item, site)
+hoeveelheden die wijzigden tegenover de vorige snapshot; om de
+`checkpoint_every` snapshots volgt een volledige checkpoint. Een toestand
+op een willekeurige datum is de laatste checkpoint plus de delta's erna,
+in één vectorstap. Per-item tijdreeksen komen uit de in geheugen geladen
+log, zonder oude Excel files opnieuw te lezen.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .stock_index import STOCK_SITES, StockIndex
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_EVERY = 12
+_MANIFEST = "manifest.json"
+_LOCK = ".lock.sqlite"
+_LOG_COLUMNS = ("seq", "item", "site", "quantity")
+
+
+def stock_files_key(stock_dir: Union[str, Path]) -> Tuple[str, Optional[datetime]]:
+    """
+    Content key (name, size, mtime of every stock workbook) and arrival time.
+
+    Returns:
+        Tuple of (key, newest modification time or None when there are no files)
+    """
+    stock_dir = Path(stock_dir)
+    files = sorted(p for p in stock_dir.glob("*.xls*") if p.is_file()) if stock_dir.exists() else []
+    stats = [(p.name, p.stat()) for p in files]
+    key = "|".join(f"{name}:{stat.st_size}:{stat.st_mtime_ns}" for name, stat in stats)
+    taken_at = datetime.fromtimestamp(max(stat.st_mtime for _, stat in stats)) if stats else None
+    return key, taken_at
+
+
+def _cells(stock: Union[StockIndex, pd.DataFrame]) -> pd.Series:
+    """Non-zero stock per (item, site) of a stock index or raw `df_stock`."""
+    index = stock if isinstance(stock, StockIndex) else StockIndex(stock)
+    table = pd.DataFrame(index.quantities, index=index.items, columns=index.sites)
+    cells = table.stack()
+    cells.index = cells.index.set_names(["item", "site"])
+    return cells[cells.ne(0)].astype(float)
+
+
+class StockHistory:
+    """
+    Stock snapshots stored as per-item deltas with periodic full checkpoints.
+
+    Each snapshot is an Arrow file with (item, site, quantity) rows: all
+    non-zero cells for a checkpoint, only the changed cells (0 for stock
+    that disappeared) for a delta. `manifest.json` lists the snapshots in
+    order and is replaced atomically. The app and the batch pipeline can
+    record into the same directory: the read-modify-write of the manifest
+    runs under a cross-process lock, and the cached log and state are
+    reloaded whenever the manifest moved past the seq they belong to.
+    """
+
+    def __init__(self, directory: Union[str, Path], checkpoint_every: int = CHECKPOINT_EVERY):
+        self.directory = Path(directory)
+        self.checkpoint_every = checkpoint_every
+        self._lock = threading.Lock()
+        self._log: Optional[pd.DataFrame] = None
+        self._log_seq = 0
+        self._by_item: Optional[Dict[str, np.ndarray]] = None
+        self._state: Optional[pd.Series] = None
+        self._state_seq = 0
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Cross-process lock around a manifest update (SQLite write lock, ook op Windows)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.directory / _LOCK, timeout=60, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield
+        finally:
+            conn.execute("ROLLBACK")
+            conn.close()
+
+    def _manifest(self) -> dict:
+        try:
+            return json.loads((self.directory / _MANIFEST).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"snapshots": []}
+
+    def _write_manifest(self, manifest: dict) -> None:
+        tmp = self.directory / f".{_MANIFEST}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp, self.directory / _MANIFEST)
+
+    def snapshots(self) -> pd.DataFrame:
+        """One row per recorded snapshot (seq, taken_at, kind, cells, source)."""
+        entries = self._manifest()["snapshots"]
+        frame = pd.DataFrame(entries, columns=["seq", "taken_at", "kind", "file", "cells", "source"])
+        frame["taken_at"] = pd.to_datetime(frame["taken_at"])
+        return frame
+
+    def __len__(self) -> int:
+        return len(self._manifest()["snapshots"])
+
+    def _load_log(self, entries: List[dict]) -> pd.DataFrame:
+        """All snapshot rows of `entries` in memory, ordered by seq (reloaded when another process wrote)."""
+        last_seq = entries[-1]["seq"] if entries else 0
+        if self._log is None or self._log_seq != last_seq:
+            from pyarrow import feather
+
+            frames = []
+            for entry in entries:
+                path = self.directory / entry["file"]
+                try:
+                    rows = feather.read_feather(path)
+                except (OSError, ValueError):
+                    logger.warning("Stock snapshot %s ontbreekt of is onleesbaar", entry["file"])
+                    continue
+                frames.append(rows.assign(seq=entry["seq"]))
+            self._log = (
+                pd.concat(frames, ignore_index=True)[list(_LOG_COLUMNS)] if frames
+                else pd.DataFrame({"seq": pd.Series(dtype="int64"), "item": pd.Series(dtype="string"),
+                                   "site": pd.Series(dtype="string"), "quantity": pd.Series(dtype=float)})
+            )
+            self._log_seq = last_seq
+            self._by_item = None
+        return self._log
+
+    def _replay(self, entries: List[dict], until: int) -> pd.Series:
+        """Non-zero (item, site) quantities after snapshot `until`."""
+        log = self._load_log(self._manifest()["snapshots"])
+        fulls = [e["seq"] for e in entries if e["kind"] == "full" and e["seq"] <= until]
+        if not fulls:
+            return pd.Series(dtype=float, index=pd.MultiIndex.from_tuples([], names=["item", "site"]))
+        rows = log.loc[log["seq"].between(fulls[-1], until)]
+        # Checkpoint + delta's: per cel telt de laatste waarde
+        latest = rows.drop_duplicates(["item", "site"], keep="last").set_index(["item", "site"])["quantity"]
+        return latest[latest.ne(0)].sort_index()
+
+    def record(
+        self,
+        stock: Union[StockIndex, pd.DataFrame],
+        taken_at: Optional[datetime] = None,
+        source: str = "",
+    ) -> Optional[dict]:
+        """
+        Store a parse of the stock files as a delta (or checkpoint).
+
+        Nothing is written when `source` matches the previous snapshot or
+        when no quantity changed.
+
+        Returns:
+            The manifest entry of the new snapshot, or None
+        """
+        from pyarrow import feather
+
+        with self._lock, self._exclusive():
+            manifest = self._manifest()
+            entries = manifest["snapshots"]
+            if source and entries and entries[-1].get("source") == source:
+                return None
+            current = _cells(stock)
+            last_seq = entries[-1]["seq"] if entries else 0
+            if self._state is None or self._state_seq != last_seq:
+                # Eerste keer, of een ander proces schreef intussen: vergelijken met de echte laatste toestand
+                self._state = self._replay(entries, last_seq) if entries else None
+                self._state_seq = last_seq
+
+            since_full = next((i for i, e in enumerate(reversed(entries)) if e["kind"] == "full"), None)
+            full = self._state is None or since_full is None or since_full + 1 >= self.checkpoint_every
+            if full:
+                rows = current
+            else:
+                previous = self._state
+                union = previous.index.union(current.index)
+                new = current.reindex(union, fill_value=0.0)
+                old = previous.reindex(union, fill_value=0.0)
+                rows = new[new.ne(old)]
+                if rows.empty:
+                    return None
+
+            seq = entries[-1]["seq"] + 1 if entries else 1
+            kind = "full" if full else "delta"
+            taken_at = taken_at or datetime.now()
+            frame = rows.rename("quantity").reset_index()
+            frame["item"] = frame["item"].astype("string")
+            frame["site"] = frame["site"].astype("string")
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            name = f"stock-{seq:06d}-{kind}.arrow"
+            tmp = self.directory / f".{name}.tmp"
+            feather.write_feather(frame, tmp, compression="zstd")
+            os.replace(tmp, self.directory / name)
+
+            entry = {
+                "seq": seq,
+                "taken_at": taken_at.isoformat(timespec="seconds"),
+                "kind": kind,
+                "file": name,
+                "cells": len(frame),
+                "source": source,
+            }
+            entries.append(entry)
+            self._write_manifest(manifest)
+
+            if self._log is not None and self._log_seq == last_seq:
+                self._log = pd.concat([self._log, frame.assign(seq=seq)[list(_LOG_COLUMNS)]], ignore_index=True)
+                self._log_seq = seq
+                self._by_item = None
+            self._state = current
+            self._state_seq = seq
+            logger.info("Stock snapshot %d (%s) bewaard: %d cellen", seq, kind, len(frame))
+            return entry
+
+    def state_at(self, when: Union[str, datetime, pd.Timestamp, None] = None) -> pd.DataFrame:
+        """
+        Item x site stock as it was at `when` (latest snapshot when None).
+
+        Returns:
+            DataFrame indexed by item with one column per site; empty before
+            the first snapshot
+        """
+        with self._lock:
+            entries = self._manifest()["snapshots"]
+            if when is not None:
+                cutoff = pd.Timestamp(when)
+                entries = [e for e in entries if pd.Timestamp(e["taken_at"]) <= cutoff]
+            if not entries:
+                return pd.DataFrame(columns=list(STOCK_SITES))
+            state = self._replay(entries, entries[-1]["seq"])
+        table = state.unstack("site", fill_value=0.0)
+        sites = [*STOCK_SITES, *sorted(c for c in table.columns if c not in STOCK_SITES)]
+        return table.reindex(columns=sites, fill_value=0.0)
+
+    def series(self, item: str, sites: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Stock time series of one item: one row per snapshot, one column per site.
+        """
+        key = str(item).strip().upper()
+        with self._lock:
+            entries = self._manifest()["snapshots"]
+            log = self._load_log(entries)
+            if self._by_item is None:
+                self._by_item = log.groupby("item", sort=False).indices
+            rows = log.iloc[self._by_item.get(key, np.array([], dtype=np.int64))]
+        sites = list(sites or STOCK_SITES)
+        seqs = pd.Index([e["seq"] for e in entries], name="seq")
+        fulls = [e["seq"] for e in entries if e["kind"] == "full"]
+        table = pd.DataFrame(np.nan, index=seqs, columns=sites)
+        # Afwezig in een checkpoint = geen stock; afwezig in een delta = ongewijzigd
+        table.loc[fulls] = 0.0
+        for site, values in rows.groupby("site", observed=True):
+            if site in table.columns:
+                table.loc[values["seq"].to_numpy(), site] = values["quantity"].to_numpy()
+        table = table.ffill().fillna(0.0)
+        table.index = pd.DatetimeIndex([pd.Timestamp(e["taken_at"]) for e in entries], name="taken_at")
+        return table
+
+
+_histories: Dict[Path, StockHistory] = {}
+_histories_lock = threading.Lock()
+
+
+def get_stock_history(directory: Union[str, Path]) -> StockHistory:
+    """Process-wide stock history per directory."""
+    key = Path(directory).resolve()
+    with _histories_lock:
+        if key not in _histories:
+            _histories[key] = StockHistory(key)
+        return _histories[key]
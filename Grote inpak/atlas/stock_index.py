@@ -0,0 +1,214 @@
+"""
+Voorberekende stock index per item en site, gedeeld door de tabs.
+
+`df_stock` wordt één keer per dataset versie omgezet naar genormaliseerde
+item keys ('T304740007     ' -> 'T304740007') met een hoeveelheid per site
+(Genk, Willebroek, Wilrijk) in één numpy matrix, plus een uitsplitsing per
+stocklocatie. Opzoekingen zijn een hash lookup op de item index en joins
+zijn één `get_indexer` + `take`, zonder opnieuw over `df_stock` te filteren.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .frames import STOCK_KEY_CANDIDATES, normalize_key, pick_column
+
+STOCK_SITES = ("Genk", "Willebroek", "Wilrijk")
+QUANTITY_CANDIDATES = ("Inventory", "inventory", "quantity", "qty", "voorraad", "stock")
+LOCATION_CANDIDATES = ("bin_code", "Bin Code", "stock_location", "Stock Location", "Location Code")
+
+
+def normalize_site(values: pd.Series) -> pd.Series:
+    """Map site names onto `STOCK_SITES` ('STOCK GENK' -> 'Genk'); others are stripped."""
+    values = values.astype("string").str.strip()
+    lowered = values.str.lower()
+    for site in STOCK_SITES:
+        values = values.mask(lowered.str.contains(site.lower(), regex=False, na=False), site)
+    return values.fillna("Onbekend")
+
+
+def _long_format(df_stock: pd.DataFrame) -> pd.DataFrame:
+    """(item, site, location, quantity) rows from a long or per-site wide stock frame."""
+    item_column = pick_column(df_stock, STOCK_KEY_CANDIDATES[0])
+    if item_column is None:
+        raise KeyError(f"Geen itemkolom gevonden in stock: {list(STOCK_KEY_CANDIDATES[0])}")
+    site_column = pick_column(df_stock, STOCK_KEY_CANDIDATES[1])
+    location_column = pick_column(df_stock, LOCATION_CANDIDATES)
+    if location_column == site_column:
+        location_column = None
+
+    def location() -> pd.Series:
+        if location_column is None:
+            return pd.Series(pd.NA, index=df_stock.index, dtype="string")
+        return df_stock[location_column].astype("string").str.strip()
+
+    quantity_column = pick_column(df_stock, QUANTITY_CANDIDATES)
+    if site_column is not None and quantity_column is not None:
+        return pd.DataFrame({
+            "item": normalize_key(df_stock[item_column]),
+            "site": normalize_site(df_stock[site_column]),
+            "location": location(),
+            "quantity": pd.to_numeric(df_stock[quantity_column], errors="coerce").fillna(0.0),
+        })
+
+    # Breed formaat: één hoeveelheidskolom per site (bv. 'stock_genk')
+    wide = {
+        site: column
+        for site in STOCK_SITES
+        for column in df_stock.columns
+        if site.lower() in str(column).lower() and pd.api.types.is_numeric_dtype(df_stock[column])
+    }
+    if not wide:
+        raise KeyError("Geen site- en hoeveelheidskolommen gevonden in stock")
+    items = normalize_key(df_stock[item_column])
+    return pd.concat(
+        [
+            pd.DataFrame({
+                "item": items,
+                "site": site,
+                "location": location(),
+                "quantity": pd.to_numeric(df_stock[column], errors="coerce").fillna(0.0),
+            })
+            for site, column in wide.items()
+        ],
+        ignore_index=True,
+    )
+
+
+class StockIndex:
+    """
+    Immutable item x site stock quantities with O(1) lookups.
+
+    `quantities[i, j]` is the stock of `items[i]` at `sites[j]`; the item
+    index is a hash index on the normalized item numbers.
+    """
+
+    def __init__(self, df_stock: pd.DataFrame):
+        if df_stock is None or df_stock.empty:
+            rows = pd.DataFrame({"item": pd.Series(dtype="string"), "site": pd.Series(dtype="string"),
+                                 "location": pd.Series(dtype="string"), "quantity": pd.Series(dtype=float)})
+        else:
+            rows = _long_format(df_stock)
+        rows = rows.loc[rows["item"].notna() & rows["item"].ne("")]
+
+        item_codes, items = pd.factorize(rows["item"])
+        site_codes, found_sites = pd.factorize(rows["site"])
+        # Vaste volgorde: de drie sites eerst, onbekende sites erachter
+        extra = [s for s in found_sites if s not in STOCK_SITES]
+        self.sites = pd.Index([*STOCK_SITES, *sorted(extra)])
+        site_positions = self.sites.get_indexer(found_sites)
+
+        self.items = pd.Index(items.astype(object), name="item")
+        self.quantities = np.zeros((len(self.items), len(self.sites)))
+        np.add.at(self.quantities, (item_codes, site_positions[site_codes]), rows["quantity"].to_numpy(dtype=float))
+        self.totals = self.quantities.sum(axis=1)
+
+        located = rows.loc[rows["location"].notna() & rows["quantity"].ne(0)]
+        self._locations = (
+            located.groupby(["item", "site", "location"], sort=True, observed=True)["quantity"].sum()
+            if not located.empty else pd.Series(dtype=float)
+        )
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, item: str) -> bool:
+        return str(item).strip().upper() in self.items
+
+    def _position(self, item: str) -> int:
+        key = str(item).strip().upper()
+        return self.items.get_loc(key) if key in self.items else -1
+
+    def lookup(self, item: str) -> Dict[str, float]:
+        """Stock per site of one item (zeros when unknown)."""
+        position = self._position(item)
+        if position < 0:
+            return {site: 0.0 for site in self.sites}
+        return dict(zip(self.sites, self.quantities[position].tolist()))
+
+    def quantity(self, item: str, site: Optional[str] = None) -> float:
+        """Stock of one item at `site`, or over all sites."""
+        position = self._position(item)
+        if position < 0:
+            return 0.0
+        if site is None:
+            return float(self.totals[position])
+        return float(self.quantities[position, self.sites.get_loc(site)])
+
+    def locations(self, item: str) -> pd.DataFrame:
+        """Stock locations of one item with their quantity per site."""
+        try:
+            return self._locations.loc[str(item).strip().upper()].reset_index()
+        except KeyError:
+            return pd.DataFrame(columns=["site", "location", "quantity"])
+
+    def positions(self, items: Iterable) -> np.ndarray:
+        """Row of each item in `quantities`, -1 for unknown items."""
+        return self.items.get_indexer(normalize_key(pd.Series(items, dtype="string")).to_numpy(dtype=object))
+
+    def join(
+        self,
+        frame: pd.DataFrame,
+        column: str = "item_number",
+        sites: Optional[Sequence[str]] = None,
+        prefix: str = "stock_",
+    ) -> pd.DataFrame:
+        """
+        Add per-site and total stock columns to `frame`, matched on `column`.
+
+        Returns:
+            Copy of `frame` with `{prefix}{site}` and `{prefix}total` columns
+        """
+        sites = list(sites or STOCK_SITES)
+        positions = self.positions(frame[column]) if column in frame.columns else np.full(len(frame), -1)
+        known = positions >= 0
+        joined = frame.copy()
+        for site in sites:
+            values = np.zeros(len(frame))
+            values[known] = self.quantities[positions[known], self.sites.get_loc(site)]
+            joined[f"{prefix}{site.lower()}"] = values
+        totals = np.zeros(len(frame))
+        totals[known] = self.totals[positions[known]]
+        joined[f"{prefix}total"] = totals
+        return joined
+
+    def in_stock(self, items: Iterable, site: Optional[str] = None, minimum: float = 1.0) -> np.ndarray:
+        """Vectorized check: is at least `minimum` in stock (at `site` or anywhere)?"""
+        positions = self.positions(items)
+        known = positions >= 0
+        available = np.zeros(len(positions))
+        if site is None:
+            available[known] = self.totals[positions[known]]
+        else:
+            available[known] = self.quantities[positions[known], self.sites.get_loc(site)]
+        return available >= minimum
+
+    def frame(self) -> pd.DataFrame:
+        """Item x site quantities as a DataFrame (with a `total` column)."""
+        table = pd.DataFrame(self.quantities, index=self.items, columns=self.sites)
+        table["total"] = self.totals
+        return table
+
+
+_indexes: "OrderedDict[str, StockIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_stock_index(version: str, df_stock: pd.DataFrame, keep: int = 4) -> StockIndex:
+    """Process-wide stock index of a dataset version (latest `keep` versions)."""
+    with _indexes_lock:
+        index = _indexes.get(version)
+        if index is not None:
+            _indexes.move_to_end(version)
+            return index
+    index = StockIndex(df_stock)
+    with _indexes_lock:
+        index = _indexes.setdefault(version, index)
+        _indexes.move_to_end(version)
+        while len(_indexes) > keep:
+            _indexes.popitem(last=False)
+        return index
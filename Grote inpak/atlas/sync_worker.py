@@ -0,0 +1,436 @@
+"""
+Achtergrond-worker voor de database sync.
+
+Sync jobs komen in een begrensde queue en worden door één daemon thread
+uitgevoerd, met retry en exponentiële backoff. De status (laatste fout,
+laatste succesvolle sync) is process-wide zichtbaar voor alle sessies.
+Voor een eigen database target is er een gepoolde, gebatchte upsert-sink.
+"""
+
+import hashlib
+import logging
+import queue
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from .frames import natural_key_columns
+from .row_hash import HashLedger, get_hash_ledger
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SyncStatus:
+    """Snapshot of the sync worker state, safe to read from any session."""
+
+    state: str = "idle"  # idle | queued | running | retrying | ok | failed
+    current_job: Optional[str] = None
+    queued: int = 0
+    dropped: int = 0
+    attempts: int = 0
+    last_success: Optional[datetime] = None
+    last_result: Optional[str] = None
+    last_error: Optional[str] = None
+    last_error_at: Optional[datetime] = None
+
+
+class ConnectionPool:
+    """Minimal DB-API connection pool; connections are created lazily."""
+
+    def __init__(self, connect: Callable[[], Any], size: int = 2):
+        self._connect = connect
+        self._idle: "queue.LifoQueue" = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                # Verbinding na een fout niet hergebruiken
+                try:
+                    conn.rollback()
+                    conn.close()
+                except Exception:
+                    pass
+                raise
+            self._idle.put_nowait(conn)
+        finally:
+            self._slots.release()
+
+
+def connect_from_url(url: str) -> Callable[[], Any]:
+    """
+    Connection factory for `sqlite:///path` or `postgresql://...` URLs.
+
+    psycopg2 is only imported when a Postgres URL is used.
+    """
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        return lambda: sqlite3.connect(path, timeout=30, check_same_thread=False)
+    if url.startswith(("postgresql://", "postgres://")):
+        import psycopg2
+
+        return lambda: psycopg2.connect(url)
+    raise ValueError(f"Onbekende database URL: {url}")
+
+
+def _quote(identifier: str) -> str:
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+class UpsertSink:
+    """
+    Batched upserts and deletes of DataFrames keyed by natural keys.
+
+    With the `format` paramstyle (psycopg2) batches go through
+    `psycopg2.extras.execute_values` / `execute_batch`: psycopg2's
+    `executemany` sends one statement per row.
+    """
+
+    def __init__(self, pool: ConnectionPool, paramstyle: str = "qmark", batch_size: int = 1000):
+        self.pool = pool
+        self.paramstyle = paramstyle
+        self.placeholder = "?" if paramstyle == "qmark" else "%s"
+        self.batch_size = batch_size
+        self._known_columns: dict = {}
+
+    def _ensure_table(self, cursor: Any, table: str, columns: Sequence[str], keys: Sequence[str]) -> None:
+        known = self._known_columns.get(table)
+        if known is None:
+            cols = ", ".join(f"{_quote(c)} TEXT" for c in columns)
+            pk = ", ".join(_quote(k) for k in keys)
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({cols}, PRIMARY KEY ({pk}))")
+            known = set()
+            try:
+                cursor.execute(f"SELECT * FROM {_quote(table)} WHERE 1 = 0")
+                known = {d[0] for d in cursor.description}
+            except Exception:
+                known = set(columns)
+        for col in columns:
+            if col not in known:
+                cursor.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(col)} TEXT")
+                known.add(col)
+        self._known_columns[table] = known
+
+    @staticmethod
+    def _rows(frame: pd.DataFrame) -> List[tuple]:
+        values = frame.astype(object).where(frame.notna(), None)
+        return [tuple(None if v is None else str(v) for v in row) for row in values.itertuples(index=False)]
+
+    def _execute_batch(self, cursor: Any, sql: str, rows: List[tuple]) -> None:
+        if self.paramstyle == "format":
+            from psycopg2.extras import execute_batch
+
+            execute_batch(cursor, sql, rows, page_size=self.batch_size)
+            return
+        for start in range(0, len(rows), self.batch_size):
+            cursor.executemany(sql, rows[start:start + self.batch_size])
+
+    def upsert(self, table: str, frame: pd.DataFrame, keys: Sequence[str]) -> int:
+        """Insert or update `frame` rows in `table`, in batches of `batch_size`."""
+        if frame.empty:
+            return 0
+        frame = frame.drop_duplicates(subset=list(keys), keep="last")
+        columns = [str(c) for c in frame.columns]
+        updates = [c for c in columns if c not in keys]
+        # execute_values vult één VALUES-lijst per batch in
+        values = "%s" if self.paramstyle == "format" else f"({', '.join([self.placeholder] * len(columns))})"
+        sql = (
+            f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in columns)}) "
+            f"VALUES {values} "
+            f"ON CONFLICT ({', '.join(_quote(k) for k in keys)}) "
+        )
+        if updates:
+            sql += "DO UPDATE SET " + ", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in updates)
+        else:
+            sql += "DO NOTHING"
+
+        rows = self._rows(frame)
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            self._ensure_table(cursor, table, columns, keys)
+            if self.paramstyle == "format":
+                from psycopg2.extras import execute_values
+
+                execute_values(cursor, sql, rows, page_size=self.batch_size)
+            else:
+                for start in range(0, len(rows), self.batch_size):
+                    cursor.executemany(sql, rows[start:start + self.batch_size])
+        return len(rows)
+
+    def delete(self, table: str, keys_frame: pd.DataFrame) -> int:
+        """Delete the rows identified by the key columns in `keys_frame`."""
+        if keys_frame.empty:
+            return 0
+        keys = [str(c) for c in keys_frame.columns]
+        # `= NULL` matcht nooit: per patroon van lege keydelen een eigen WHERE met IS NULL
+        by_pattern: dict = {}
+        for row in self._rows(keys_frame):
+            pattern = tuple(value is None for value in row)
+            by_pattern.setdefault(pattern, []).append(tuple(v for v in row if v is not None))
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            for pattern, rows in by_pattern.items():
+                where = " AND ".join(
+                    f"{_quote(k)} IS NULL" if missing else f"{_quote(k)} = {self.placeholder}"
+                    for k, missing in zip(keys, pattern)
+                )
+                sql = f"DELETE FROM {_quote(table)} WHERE {where}"
+                if all(pattern):
+                    cursor.execute(sql)
+                    continue
+                self._execute_batch(cursor, sql, rows)
+        return len(keys_frame)
+
+
+SYNC_TABLES = {
+    "pils": "grote_inpak_pils",
+    "erp": "grote_inpak_erp",
+    "stock": "grote_inpak_stock",
+}
+
+
+def frames_sync_job(
+    sink: UpsertSink,
+    frames: dict,
+    ledger: Optional[HashLedger] = None,
+) -> Callable[[], str]:
+    """
+    Build a job that upserts the PILS, ERP and stock frames by natural key.
+
+    With a ledger only inserted, updated and deleted rows are sent; the
+    ledger is updated per table after that table synced successfully, so
+    a failed run is fully retried on the next attempt.
+
+    Args:
+        sink: Target sink
+        frames: {'pils': df_pils, 'erp': df_erp, 'stock': df_stock}
+        ledger: Last-synced row hashes (None = always send full frames)
+
+    Returns:
+        Job returning a short summary of what was sent
+    """
+    def run() -> str:
+        summary = []
+        for kind, frame in frames.items():
+            if frame is None or frame.empty:
+                continue
+            table = SYNC_TABLES[kind]
+            keys = natural_key_columns(frame, kind)
+            if ledger is None:
+                summary.append(f"{kind}: {sink.upsert(table, frame, keys)} rijen")
+                continue
+            delta = ledger.diff(table, frame, keys)
+            if not delta.is_empty:
+                sink.upsert(table, delta.upserts, keys)
+                sink.delete(table, delta.deletes)
+            ledger.commit(delta)
+            summary.append(f"{kind}: +{delta.inserted} ~{delta.updated} -{len(delta.deletes)}")
+        return ", ".join(summary)
+
+    return run
+
+
+_sinks: dict = {}
+_sinks_lock = threading.Lock()
+
+
+def get_upsert_sink(url: str) -> UpsertSink:
+    """Process-wide sink (and connection pool) per database URL."""
+    with _sinks_lock:
+        if url not in _sinks:
+            paramstyle = "qmark" if url.startswith("sqlite:///") else "format"
+            _sinks[url] = UpsertSink(ConnectionPool(connect_from_url(url)), paramstyle=paramstyle)
+        return _sinks[url]
+
+
+def database_sync_job(
+    df_pils: pd.DataFrame,
+    df_erp: pd.DataFrame,
+    df_stock: pd.DataFrame,
+    url: Optional[str],
+    ledger_root: Union[str, Path],
+    fallback: Callable[[pd.DataFrame, pd.DataFrame, pd.DataFrame], Any],
+) -> Callable[[], Any]:
+    """
+    Sync job for the configured target.
+
+    Uses batched upserts over a pooled connection when `url` is set, with a
+    hash ledger per target under `ledger_root` so only changed rows are
+    sent. Otherwise `fallback` (the existing `sync_to_database`) is called
+    with the three full frames: its write semantics are not known here, so
+    it never gets a partial frame.
+    """
+    if not url:
+        return lambda: fallback(df_pils, df_erp, df_stock)
+    target_id = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+    return frames_sync_job(
+        get_upsert_sink(url),
+        {"pils": df_pils, "erp": df_erp, "stock": df_stock},
+        ledger=get_hash_ledger(Path(ledger_root) / target_id)
+    )
+
+
+@dataclass
+class _Job:
+    name: str
+    run: Callable[[], Any]
+
+
+class SyncWorker:
+    """
+    Single background thread draining a bounded queue of sync jobs.
+
+    When the queue is full the oldest job is dropped: every job carries a
+    complete dataset, so a newer job supersedes an older one. Pending jobs
+    with the same name are coalesced and only the newest one runs; a job
+    waiting for a retry is abandoned as soon as a newer job with its name
+    is queued.
+    """
+
+    def __init__(self, max_queue: int = 4, max_retries: int = 5, backoff_base: float = 2.0, backoff_max: float = 120.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._queue: "queue.Queue[_Job]" = queue.Queue(maxsize=max_queue)
+        self._status = SyncStatus()
+        self._status_lock = threading.Lock()
+        self._submitted = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="atlas-sync", daemon=True)
+        self._thread.start()
+
+    def _set_status(self, **changes: Any) -> None:
+        with self._status_lock:
+            self._status = replace(self._status, queued=self._queue.qsize(), **changes)
+
+    def status(self) -> SyncStatus:
+        with self._status_lock:
+            return replace(self._status, queued=self._queue.qsize())
+
+    def submit(self, name: str, run: Callable[[], Any]) -> None:
+        """Queue a job without blocking the caller."""
+        job = _Job(name, run)
+        while True:
+            try:
+                self._queue.put_nowait(job)
+                break
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    with self._status_lock:
+                        self._status = replace(self._status, dropped=self._status.dropped + 1)
+                except queue.Empty:
+                    pass
+        self._submitted.set()
+        if self.status().state in ("idle", "ok", "failed"):
+            self._set_status(state="queued")
+
+    def _next_job(self) -> _Job:
+        job = self._queue.get()
+        pending = [job]
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        latest = {}
+        for item in pending:
+            latest[item.name] = item
+        for item in pending:
+            self._queue.task_done()
+        # Eerste job uitvoeren, overige (unieke) terug in de queue
+        first, *rest = latest.values()
+        for item in rest:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                break
+        return first
+
+    def _superseded(self, name: str) -> bool:
+        with self._queue.mutex:
+            return any(item.name == name for item in self._queue.queue)
+
+    def _backoff(self, name: str, delay: float) -> bool:
+        """
+        Wait `delay` seconds before a retry, or less when a newer job arrives.
+
+        Returns:
+            True when a newer job with the same name is queued (skip the retry)
+        """
+        deadline = time.monotonic() + delay
+        while True:
+            self._submitted.clear()
+            if self._superseded(name):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._submitted.wait(remaining)
+
+    def _loop(self) -> None:
+        while True:
+            job = self._next_job()
+            attempt = 0
+            while True:
+                attempt += 1
+                self._set_status(state="running", current_job=job.name, attempts=attempt)
+                try:
+                    result = job.run()
+                except Exception as exc:
+                    logger.exception("Database sync '%s' mislukt (poging %d)", job.name, attempt)
+                    self._set_status(
+                        last_error=f"{job.name}: {exc}",
+                        last_error_at=datetime.now(),
+                    )
+                    if attempt > self.max_retries:
+                        self._set_status(state="failed", current_job=None)
+                        break
+                    self._set_status(state="retrying")
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                    if self._backoff(job.name, delay * random.uniform(0.8, 1.2)):
+                        # Nieuwere data in de queue: die vervangt deze retry
+                        logger.info("Database sync '%s': retry overgeslagen, nieuwere job in de queue", job.name)
+                        self._set_status(state="queued", current_job=None)
+                        break
+                    continue
+                self._set_status(
+                    state="ok",
+                    current_job=None,
+                    last_success=datetime.now(),
+                    last_result=result if isinstance(result, str) else None,
+                    last_error=None,
+                    last_error_at=None,
+                )
+                break
+
+
+_worker: Optional[SyncWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_sync_worker() -> SyncWorker:
+    """Process-wide sync worker (one thread shared by all sessions)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = SyncWorker()
+        return _worker
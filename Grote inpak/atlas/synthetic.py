@@ -0,0 +1,247 @@
+"""
+Synthetische inputbestanden voor benchmarks.
+
+Genereert een PILS CSV, een ERP link workbook en de drie site stock
+workbooks in hetzelfde formaat als de projectbestanden, op een veelvoud
+van het huidige volume. Case types verwijzen naar ERP kistnummers en ERP
+codes komen voor in de stock, zodat de joins in `build_overview` even
+veel werk doen als op echte data. `generate_frames` levert dezelfde data
+in geheugen, met een overview en transport in het formaat van de gebouwde
+frames, zodat de Atlas stages ook zonder `build_overview` meetbaar zijn.
+"""
+
+import string
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Volume (rijen) op schaal 1x. De PILS export in de repo is een ingekorte
+# sample van 35 rijen; een volledige export telt enkele duizenden cases.
+BASE_VOLUME = {"pils": 4000, "erp": 215, "stock": 9900}
+
+STOCK_SITES = ("Genk", "Willebroek", "Wilrijk")
+
+PILS_COLUMNS = (
+    "Packing Number", "Case", "Case Type", "Division", "Item number", "Serial  number",
+    "Stock Location", "20000000+t01.pccrdt", "substr(digits(T02.AT_FORES04),3,8)",
+    "substr(digits(T02.AT_FORES04),11,6)",
+)
+
+STOCK_COLUMNS = (
+    "No.", "Consumption Item No.", "Inventory", "Description", "Length (Base) mm",
+    "Width (Base) mm", "Thickness (Base)", "Description 2", "Qty. on Purch. Order",
+    "Qty. on Sales Order", "Qty. on Prod. Order", "Qty. on Component Lines", "Type",
+    "Substitutes Exist", "Stockkeeping Unit Exists", "Assembly BOM", "Production BOM No.",
+    "Routing No.", "Base Unit of Measure", "Cost is Adjusted", "Unit Cost", "Unit Price",
+    "Strength grade", "Vendor No.", "Assembly Policy", "Default Deferral Template",
+    "Last Price Variant Specific", "Artikeltype", "kopmaten",
+    "Created from BOM Calculation Template", "Safety Stock Quantity", "Maximum Inventory",
+    "Price Factor Type",
+)
+
+_DIVISIONS = np.array(["AIF", "AII", "AIB", "CTS"])
+_LOCATIONS = np.array(["PAC3PL", "PAC3PL", "PAC3PL", "T00267", "WLB001"])
+_PRODUCTION_SITES = np.array(["WILRIJK", "GENK", "BouwPakket"])
+_PRODUCTION_WEIGHTS = np.array([0.72, 0.24, 0.04])
+_UNITS = np.array(["STUKS/LB", "STUKS/BLD", "M3", "STUKS"])
+
+
+def _case_labels(count: int, rng: np.random.Generator) -> np.ndarray:
+    """Unique labels like `AC36F`: two letters, two digits, one letter."""
+    letters = np.array(list(string.ascii_uppercase))
+    codes = rng.choice(26 * 26 * 100 * 26, size=count, replace=False)
+    first, rest = np.divmod(codes, 26 * 100 * 26)
+    second, rest = np.divmod(rest, 100 * 26)
+    digits, last = np.divmod(rest, 26)
+    return np.char.add(
+        np.char.add(np.char.add(letters[first], letters[second]), np.char.zfill(digits.astype(str), 2)),
+        letters[last],
+    )
+
+
+def generate_erp(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """ERP link rows: kistnummer (K/C/V + number), ERP code, productielocatie, stapel."""
+    prefixes = rng.choice(np.array(["K", "C", "V"]), size=rows, p=[0.6, 0.3, 0.1])
+    numbers = np.arange(1, rows + 1)
+    kistnummer = [f"{p}{n:03d}" for p, n in zip(prefixes, numbers)]
+    stapel = np.where(rng.random(rows) < 0.1, rng.integers(1, 9, rows).astype(str), None)
+    return pd.DataFrame({
+        "kistnummer": kistnummer,
+        "ERP code": [f"GP{n:06d}" for n in rng.choice(np.arange(1, 10 * rows + 1), rows, replace=False)],
+        "productielocatie": rng.choice(_PRODUCTION_SITES, rows, p=_PRODUCTION_WEIGHTS),
+        "stapel": stapel,
+    })
+
+
+def generate_pils(rows: int, erp: pd.DataFrame, rng: np.random.Generator, today: pd.Timestamp) -> pd.DataFrame:
+    """PILS rows whose case types are drawn from the ERP kistnummers."""
+    arrival = today - pd.to_timedelta(rng.integers(0, 40, rows), unit="D")
+    forecast = arrival + pd.to_timedelta(rng.integers(0, 3, rows), unit="D")
+    has_serial = rng.random(rows) < 0.9
+    return pd.DataFrame({
+        "Packing Number": rng.integers(100000, 200000, rows).astype(str),
+        "Case": _case_labels(rows, rng),
+        "Case Type": rng.choice(erp["kistnummer"].to_numpy(), rows),
+        "Division": rng.choice(_DIVISIONS, rows),
+        "Item number": [f"T{n:09d}" for n in rng.integers(0, 10**9, rows)],
+        "Serial  number": np.where(has_serial, [f"APF{n:06d}" for n in rng.integers(0, 10**6, rows)], ""),
+        "Stock Location": rng.choice(_LOCATIONS, rows),
+        "20000000+t01.pccrdt": arrival.strftime("%Y%m%d"),
+        "substr(digits(T02.AT_FORES04),3,8)": forecast.strftime("%Y%m%d"),
+        "substr(digits(T02.AT_FORES04),11,6)": [f"{n:06d}" for n in rng.integers(0, 235959, rows)],
+    }, columns=list(PILS_COLUMNS))
+
+
+def generate_stock(rows: int, erp: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    """Stock workbook rows; every ERP code is present, the rest are filler items."""
+    codes = erp["ERP code"].to_numpy()
+    filler = max(rows - len(codes), 0)
+    items = np.concatenate([codes, (100000 + np.arange(filler)).astype(str)])
+    rng.shuffle(items)
+    n = len(items)
+    frame = pd.DataFrame({col: pd.Series([None] * n, dtype=object) for col in STOCK_COLUMNS})
+    frame["No."] = items
+    frame["Inventory"] = np.where(rng.random(n) < 0.3, rng.integers(1, 200, n), 0)
+    frame["Description"] = [f"SYNTH ITEM {i}" for i in items]
+    frame["Length (Base) mm"] = rng.choice([0, 800, 1200, 2400], n)
+    frame["Width (Base) mm"] = rng.choice([0, 100, 800, 1000], n)
+    frame["Thickness (Base)"] = rng.choice([0, 22, 75, 248], n)
+    for col in ("Qty. on Purch. Order", "Qty. on Sales Order", "Qty. on Prod. Order", "Qty. on Component Lines",
+                "Substitutes Exist", "Stockkeeping Unit Exists", "Assembly BOM", "Unit Price",
+                "Safety Stock Quantity", "Maximum Inventory"):
+        frame[col] = 0
+    frame["Type"] = "Inventory"
+    frame["Base Unit of Measure"] = rng.choice(_UNITS, n)
+    frame["Cost is Adjusted"] = 1
+    frame["Unit Cost"] = rng.random(n).round(4) * 250
+    frame["Assembly Policy"] = "Assemble-to-Stock"
+    frame["Last Price Variant Specific"] = "No"
+    return frame
+
+
+def _write_pils_csv(frame: pd.DataFrame, path: Path) -> None:
+    """Write in the PILS export layout: ';' separated, quoted and space padded."""
+    widths = {"Packing Number": 9, "Item number": 15, "Serial  number": 10, "Stock Location": 7,
+              "20000000+t01.pccrdt": 11}
+    quoted = set(PILS_COLUMNS) - {"Packing Number", "20000000+t01.pccrdt"}
+    cells = []
+    for col in PILS_COLUMNS:
+        values = frame[col].astype(str).str.ljust(widths.get(col, 0))
+        cells.append('"' + values + '"' if col in quoted else values)
+    lines = cells[0].str.cat(cells[1:], sep=";")
+    header = ";".join(f'"{c}"' for c in PILS_COLUMNS) + " "
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(header + "\n" + "\n".join(lines) + "\n", encoding="latin-1")
+
+
+def _write_xlsx(frame: pd.DataFrame, path: Path) -> None:
+    """Stream rows with xlsxwriter; several times faster than `to_excel` for large sheets."""
+    import xlsxwriter
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook = xlsxwriter.Workbook(str(path), {"constant_memory": True})
+    sheet = workbook.add_worksheet()
+    sheet.write_row(0, 0, list(frame.columns))
+    # Lege cellen als None (xlsxwriter slaat die over), niet als NaN
+    frame = frame.astype(object).where(frame.notna(), None)
+    for row_number, row in enumerate(frame.itertuples(index=False, name=None), start=1):
+        sheet.write_row(row_number, 0, row)
+    workbook.close()
+
+
+def generate_dataset(
+    out_dir: Union[str, Path],
+    scale: float = 1,
+    seed: int = 0,
+    today: Optional[pd.Timestamp] = None,
+    overwrite: bool = False,
+) -> Dict[str, Path]:
+    """
+    Write a synthetic project layout at `scale` times the current volume.
+
+    The layout mirrors the project folder (`PILS file/`, `ERP link.xlsx`,
+    `stock files/`). Existing output is reused unless `overwrite` is set,
+    since the larger scales take a while to write.
+
+    Returns:
+        Dict with the paths of the pils, erp and stock_dir outputs
+    """
+    out_dir = Path(out_dir)
+    paths = {
+        "pils": out_dir / "PILS file" / "_FOR_PILS.CSV_.CSV",
+        "erp": out_dir / "ERP link.xlsx",
+        "stock_dir": out_dir / "stock files",
+    }
+    marker = out_dir / ".complete"
+    if marker.exists() and not overwrite:
+        return paths
+
+    rng = np.random.default_rng(seed)
+    today = (today or pd.Timestamp.today()).normalize()
+    erp = generate_erp(max(int(BASE_VOLUME["erp"] * scale), 1), rng)
+    pils = generate_pils(max(int(BASE_VOLUME["pils"] * scale), 1), erp, rng, today)
+
+    _write_pils_csv(pils, paths["pils"])
+    _write_xlsx(erp, paths["erp"])
+    for site in STOCK_SITES:
+        stock = generate_stock(int(BASE_VOLUME["stock"] * scale), erp, rng)
+        _write_xlsx(stock, paths["stock_dir"] / f"Stock {site}.xlsx")
+    marker.write_text(f"scale={scale} seed={seed} today={today.date()}\n", encoding="utf-8")
+    return paths
+
+
+def generate_overview(pils: pd.DataFrame, erp: pd.DataFrame) -> pd.DataFrame:
+    """
+    Overview rows in the layout `build_overview` produces, derived from PILS and ERP.
+
+    Session columns (status, priority, comment) are at their defaults, like
+    in the shared dataset.
+    """
+    kisten = erp.drop_duplicates("kistnummer").set_index("kistnummer")
+    locatie = pils["Stock Location"].astype(str)
+    return pd.DataFrame({
+        "case_label": pils["Case"].astype(str),
+        "case_type": pils["Case Type"].astype(str),
+        "item_number": pils["Item number"].astype(str),
+        "serial_number": pils["Serial  number"].astype(str),
+        "division": pils["Division"].astype(str),
+        "productielocatie": pils["Case Type"].map(kisten["productielocatie"]).fillna("").astype(str),
+        "stapel": pils["Case Type"].map(kisten["stapel"]),
+        "locatie": locatie,
+        "stock_location": locatie,
+        "in_willebroek": locatie.eq("PAC3PL"),
+        "arrival_date": pd.to_datetime(pils["20000000+t01.pccrdt"], format="%Y%m%d"),
+        "status": "",
+        "priority": False,
+        "comment": "",
+    })
+
+
+def generate_frames(
+    scale: float = 1,
+    seed: int = 0,
+    today: Optional[pd.Timestamp] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    In-memory overview, transport and long-format stock at `scale` times the current volume.
+
+    Returns:
+        Dict with overview, transport and df_stock frames
+    """
+    rng = np.random.default_rng(seed)
+    today = (today or pd.Timestamp.today()).normalize()
+    erp = generate_erp(max(int(BASE_VOLUME["erp"] * scale), 1), rng)
+    pils = generate_pils(max(int(BASE_VOLUME["pils"] * scale), 1), erp, rng, today)
+    overview = generate_overview(pils, erp)
+    transport = overview.loc[overview["productielocatie"].eq("GENK"), ["case_label", "case_type", "productielocatie"]]
+    stock = pd.concat(
+        [
+            generate_stock(int(BASE_VOLUME["stock"] * scale), erp, rng)[["No.", "Inventory"]].assign(site=site)
+            for site in STOCK_SITES
+        ],
+        ignore_index=True,
+    )
+    return {"overview": overview, "transport": transport.reset_index(drop=True), "df_stock": stock}
+
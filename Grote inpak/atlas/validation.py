@@ -0,0 +1,244 @@
+"""
+Gevectoriseerde validatie van PILS en ERP, gecachet samen met het frame.
+
+De regels zijn kolomgewijs: elke kolom wordt één keer genormaliseerd en
+elke regel is één vectoroperatie (geen Python per rij). Eén doorloop levert
+errors en warnings in het formaat van `DataValidator.validate_dataframe`,
+zodat `generate_validation_report` ze ongewijzigd kan tonen.
+
+Het gevalideerde en opgeschoonde frame wordt met zijn rapport onder
+dezelfde sleutel gecachet (geheugen en schijf); een cache hit slaat lezen,
+valideren en opschonen volledig over.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from .frames import pick_column
+
+# Verhogen wanneer regels of opschoning wijzigen: oude cache entries vervallen
+VALIDATION_VERSION = 2
+
+# (naam, kolomkandidaten, check, ernst, boodschap)
+PILS_RULES: Tuple[Tuple[str, Tuple[str, ...], Any, str, str], ...] = (
+    ("missing_case", ("Case", "case_label"), "required", "warning", "Rijen zonder case label"),
+    ("duplicate_case", ("Case", "case_label"), "unique", "warning", "Dubbele case labels"),
+    ("missing_case_type", ("Case Type", "case_type"), "required", "warning", "Rijen zonder case type"),
+    ("invalid_case_type", ("Case Type", "case_type"), ("pattern", r"^[A-Za-z]\s*\d+$"), "warning",
+     "Case types die niet het formaat letter + nummer hebben"),
+    ("missing_item_number", ("Item number", "item_number"), "required", "warning", "Rijen zonder item number"),
+    ("invalid_arrival_date", ("20000000+t01.pccrdt", "arrival_date"), ("date", "%Y%m%d"), "warning",
+     "Ongeldige arrival dates"),
+)
+ERP_RULES: Tuple[Tuple[str, Tuple[str, ...], Any, str, str], ...] = (
+    ("missing_kistnummer", ("kistnummer",), "required", "warning", "Rijen zonder kistnummer"),
+    ("duplicate_kistnummer", ("kistnummer",), "unique", "warning", "Dubbele kistnummers"),
+    ("missing_erp_code", ("ERP code", "erp_code"), "required", "warning", "Rijen zonder ERP code"),
+    ("missing_productielocatie", ("productielocatie",), "required", "warning", "Rijen zonder productielocatie"),
+    ("invalid_stapel", ("stapel",), "integer", "warning", "Stapel waarden die geen geheel getal zijn"),
+)
+RULES = {"pils": PILS_RULES, "erp": ERP_RULES}
+
+# Kolommen zonder welke het frame onbruikbaar is (enige errors; rijregels geven warnings)
+REQUIRED_COLUMNS = {
+    "pils": (("Case", "case_label"), ("Case Type", "case_type")),
+    "erp": (("kistnummer",),),
+}
+
+ValidationResult = Tuple[bool, Dict[str, dict], Dict[str, dict]]
+
+
+def _violations(values: pd.Series, blank: pd.Series, check: Any) -> pd.Series:
+    if check == "required":
+        return blank
+    if check == "unique":
+        return values.duplicated(keep=False) & ~blank
+    if check == "integer":
+        return ~blank & pd.to_numeric(values, errors="coerce").isna()
+    kind, argument = check
+    if kind == "pattern":
+        return ~blank & ~values.str.match(argument).fillna(False)
+    if kind == "date":
+        return ~blank & pd.to_datetime(values, format=argument, errors="coerce").isna()
+    raise ValueError(f"Onbekende validatieregel: {check!r}")
+
+
+def validate_frame(df: pd.DataFrame, kind: str, sample: int = 10) -> ValidationResult:
+    """
+    Validate a PILS or ERP frame in one column-wise pass.
+
+    Returns:
+        Tuple of (valid, errors, warnings); errors and warnings map a rule
+        name to {'message', 'column', 'count', 'rows'} with the first
+        `sample` offending row indices
+    """
+    errors: Dict[str, dict] = {}
+    warnings: Dict[str, dict] = {}
+    for candidates in REQUIRED_COLUMNS.get(kind, ()):
+        if pick_column(df, candidates) is None:
+            errors[f"missing_column_{candidates[0]}"] = {
+                "message": f"Kolom {candidates[0]} ontbreekt",
+                "column": candidates[0],
+                "count": len(df),
+                "rows": [],
+            }
+
+    normalized: Dict[str, Tuple[pd.Series, pd.Series]] = {}
+    for name, candidates, check, severity, message in RULES.get(kind, ()):
+        column = pick_column(df, candidates)
+        if column is None:
+            continue
+        if column not in normalized:
+            # Elke kolom één keer normaliseren, gedeeld door alle regels
+            values = df[column].astype("string").str.strip()
+            normalized[column] = (values, values.isna() | values.eq(""))
+        values, blank = normalized[column]
+        mask = _violations(values, blank, check).fillna(False).to_numpy(dtype=bool)
+        count = int(mask.sum())
+        if count:
+            (errors if severity == "error" else warnings)[name] = {
+                "message": f"{message}: {count}",
+                "column": column,
+                "count": count,
+                "rows": df.index[mask][:sample].tolist(),
+            }
+    return not errors, errors, warnings
+
+
+class ValidatedFrameCache:
+    """
+    Cleaned frames and their validation report, keyed on input content.
+
+    Entries live in memory (latest `keep`) and as pickles in `directory`,
+    so a restart of the app also skips validation for unchanged inputs.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None, keep: int = 8):
+        self.directory = Path(directory) if directory else None
+        self.keep = keep
+        self._entries: "OrderedDict[str, Tuple[pd.DataFrame, ValidationResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(kind: str, source_key: str) -> str:
+        raw = f"{kind}|{source_key}|v{VALIDATION_VERSION}"
+        return f"{kind}_{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]}"
+
+    def get(self, kind: str, source_key: str) -> Optional[Tuple[pd.DataFrame, ValidationResult]]:
+        digest = self._digest(kind, source_key)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                return entry
+        if self.directory is None:
+            return None
+        path = self.directory / f"{digest}.pkl"
+        try:
+            with path.open("rb") as handle:
+                entry = pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        self._remember(digest, entry)
+        return entry
+
+    def put(self, kind: str, source_key: str, frame: pd.DataFrame, result: ValidationResult) -> None:
+        digest = self._digest(kind, source_key)
+        entry = (frame, result)
+        self._remember(digest, entry)
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Enkel de laatste versie per soort bewaren
+        for stale in self.directory.glob(f"{kind}_*.pkl"):
+            if stale.stem != digest:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+        tmp = self.directory / f".{digest}.tmp"
+        with tmp.open("wb") as handle:
+            pickle.dump(entry, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.directory / f"{digest}.pkl")
+
+    def clear(self) -> None:
+        """Drop all entries, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+        if self.directory is None:
+            return
+        for path in self.directory.glob("*.pkl"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _remember(self, digest: str, entry: Tuple[pd.DataFrame, ValidationResult]) -> None:
+        with self._lock:
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.keep:
+                self._entries.popitem(last=False)
+
+    def load(
+        self,
+        kind: str,
+        source_key: str,
+        read: Callable[[], pd.DataFrame],
+        clean: Callable[[pd.DataFrame], pd.DataFrame],
+    ) -> Tuple[pd.DataFrame, ValidationResult, bool]:
+        """
+        Cleaned frame and validation result for one input.
+
+        On a miss the frame is read, validated on the raw values, cleaned
+        and stored; on a hit none of that runs.
+
+        Returns:
+            Tuple of (frame, (valid, errors, warnings), hit)
+        """
+        cached = self.get(kind, source_key)
+        if cached is not None:
+            # Kopie: de pipeline mag het frame aanpassen zonder de cache te raken
+            return cached[0].copy(), cached[1], True
+        raw = read()
+        result = validate_frame(raw, kind)
+        frame = clean(raw)
+        self.put(kind, source_key, frame, result)
+        return frame.copy(), result, False
+
+
+def file_source_key(path: Union[str, Path]) -> str:
+    """Cheap content key of an input file (name, size, mtime)."""
+    stat = Path(path).stat()
+    return f"{Path(path).name}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def bytes_source_key(data: bytes) -> str:
+    """Content key of an uploaded file."""
+    return hashlib.sha1(data).hexdigest()
+
+
+_caches: Dict[Path, ValidatedFrameCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_validated_cache(directory: Union[str, Path]) -> ValidatedFrameCache:
+    """Process-wide validated-frame cache per directory."""
+    key = Path(directory).resolve()
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ValidatedFrameCache(key)
+        return _caches[key]
+
+
+def validation_messages(result: ValidationResult) -> Sequence[str]:
+    """Flat list of error and warning messages (for logging)."""
+    _, errors, warnings = result
+    return [entry["message"] for entry in (*errors.values(), *warnings.values())]
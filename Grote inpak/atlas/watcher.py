@@ -0,0 +1,174 @@
+"""
+Watcher op de inputbestanden met automatische achtergrond-refresh.
+
+Pollt de PILS map, het ERP link workbook, de stock bestanden en de
+forecast/packed/PO XML mappen. Zodra een wijziging "gesetteld" is (grootte en mtime
+een tijd onveranderd, zodat half gekopieerde bestanden niet gelezen worden)
+wordt de refresh callback in een achtergrondthread uitgevoerd met de namen
+van de gewijzigde groepen. Polling in plaats van OS events: werkt ook op
+netwerkschijven en vraagt geen extra dependency.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Snapshot = Dict[str, Tuple[Tuple[str, int, int], ...]]
+
+
+@dataclass(frozen=True)
+class WatcherStatus:
+    """State of the input watcher, safe to read from any session."""
+
+    running: bool = False
+    refreshing: bool = False
+    pending: FrozenSet[str] = frozenset()
+    last_change: Optional[datetime] = None
+    last_refresh: Optional[datetime] = None
+    last_groups: FrozenSet[str] = frozenset()
+    last_result: Optional[str] = None
+    last_error: Optional[str] = None
+    last_error_at: Optional[datetime] = None
+
+
+def _scan(paths: Sequence[Path]) -> Tuple[Tuple[str, int, int], ...]:
+    """(path, size, mtime_ns) of every file under `paths`; missing paths are skipped."""
+    entries = []
+    for path in paths:
+        try:
+            if path.is_dir():
+                files = [p for p in path.iterdir() if p.is_file() and not p.name.startswith(("~$", "."))]
+            elif path.exists():
+                files = [path]
+            else:
+                continue
+            for file in files:
+                stat = file.stat()
+                entries.append((str(file), stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            # Bestand verdwijnt of is gelockt tijdens het kopiëren: volgende poll
+            continue
+    return tuple(sorted(entries))
+
+
+class InputWatcher:
+    """
+    Polling watcher over named groups of input paths.
+
+    Refreshes run one at a time on the watcher thread; changes that arrive
+    during a refresh are picked up by the next poll. A failed refresh is
+    retried after `retry_seconds` or as soon as the inputs change again.
+    """
+
+    def __init__(
+        self,
+        groups: Mapping[str, Sequence[Path]],
+        on_settled: Callable[[FrozenSet[str]], Any],
+        poll_seconds: float = 5.0,
+        settle_seconds: float = 10.0,
+        retry_seconds: float = 300.0,
+    ):
+        self.groups = {name: [Path(p) for p in paths] for name, paths in groups.items()}
+        self.on_settled = on_settled
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.retry_seconds = retry_seconds
+        self._status = WatcherStatus()
+        self._status_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _set_status(self, **changes: Any) -> None:
+        with self._status_lock:
+            self._status = replace(self._status, **changes)
+
+    def status(self) -> WatcherStatus:
+        with self._status_lock:
+            return self._status
+
+    def scan(self) -> Snapshot:
+        return {name: _scan(paths) for name, paths in self.groups.items()}
+
+    def start(self) -> "InputWatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="atlas-watcher", daemon=True)
+            self._thread.start()
+            self._set_status(running=True)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._set_status(running=False)
+
+    def _loop(self) -> None:
+        # Startsituatie geldt als verwerkt: de app bouwt die zelf bij het eerste bezoek
+        processed = self.scan()
+        observed, observed_at = processed, time.monotonic()
+        failed_at: Optional[float] = None
+
+        while not self._stop.wait(self.poll_seconds):
+            current = self.scan()
+            now = time.monotonic()
+            if current != observed:
+                observed, observed_at = current, now
+                failed_at = None
+                self._set_status(last_change=datetime.now())
+
+            changed = frozenset(name for name in current if current[name] != processed.get(name))
+            self._set_status(pending=changed)
+            if not changed or now - observed_at < self.settle_seconds:
+                continue
+            if failed_at is not None and now - failed_at < self.retry_seconds:
+                continue
+
+            self._set_status(refreshing=True)
+            try:
+                result = self.on_settled(changed)
+            except Exception as exc:
+                logger.exception("Automatische refresh mislukt (%s)", ", ".join(sorted(changed)))
+                failed_at = now
+                self._set_status(
+                    refreshing=False,
+                    last_error=f"{type(exc).__name__}: {exc}",
+                    last_error_at=datetime.now(),
+                )
+                continue
+            processed = current
+            self._set_status(
+                refreshing=False,
+                pending=frozenset(),
+                last_refresh=datetime.now(),
+                last_groups=changed,
+                last_result=None if result is None else str(result),
+            )
+
+
+_watcher: Optional[InputWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def get_input_watcher(
+    groups: Mapping[str, Sequence[Path]],
+    on_settled: Callable[[FrozenSet[str]], Any],
+    **options: float,
+) -> InputWatcher:
+    """
+    Process-wide watcher, started on first use.
+
+    The callback is replaced on every call, so a Streamlit rerun that
+    redefines it does not start a second watcher.
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = InputWatcher(groups, on_settled, **options).start()
+        else:
+            _watcher.on_settled = on_settled
+        return _watcher
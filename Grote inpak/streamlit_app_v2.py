@@ -9,12 +9,18 @@ import sys
 from pathlib import Path
 from typing import Optional, Tuple
 import io
+import hashlib
+import importlib
+import logging
+from datetime import date
 
 # Setup paths
 APP_DIR = Path(__file__).resolve().parent
 REPO_DIR = APP_DIR.parent
 if str(REPO_DIR) not in sys.path:
     sys.path.insert(0, str(REPO_DIR))
+if str(APP_DIR) not in sys.path:
+    sys.path.append(str(APP_DIR))
 
 # Import configuration
 from config import AppConfig
@@ -27,26 +33,58 @@ from utils import (
     MetricsCalculator
 )
 
-# Import components
-from components import (
-    render_executive_dashboard,
-    render_transport_tab,
-    render_forecast_tab,
-    render_packed_tab,
-    render_stock_analysis_tab,
-    render_kanban_tab
-)
+# Tab renderers (components) en scripts.build_overview worden pas bij
+# eerste gebruik geïmporteerd; zie lazy_component() en de pipeline functies.
 
-# Import original functions (tijdelijk tot volledig gerefactord)
-from scripts.build_overview import (
-    build_overview,
-    find_pils_csv,
-    read_stock_files,
-    read_erp,
-    read_pils,
-    sync_to_database,
+# Import Atlas pipeline modules
+from atlas import (
+    EXPORT_FORMATS,
+    LookupIndex,
+    PAGE_SIZES,
+    TruckSpec,
+    apply_overlays,
+    backlog_counts,
+    build_frames,
+    bytes_source_key,
+    compute_backlog,
+    database_sync_job,
+    diff_state,
+    export_bytes,
+    file_fingerprint,
+    file_source_key,
+    filter_key,
+    get_dataset_registry,
+    get_export_cache,
+    get_forecast_store,
+    get_input_watcher,
+    get_lookup_service,
+    get_metrics_memo,
+    get_packed_index,
+    get_po_inbox,
+    get_profiler,
+    get_rack_index,
+    get_sort_index,
+    get_state_store,
+    get_stock_index,
+    get_sync_worker,
+    get_validated_cache,
+    invalidate_packed_index,
+    join_purchase_orders,
+    memory_report,
+    packed_archive_loader,
+    paginate,
+    plan_loads,
+    project_input_files,
+    project_path,
+    run_batch,
+    size_classes,
+    snapshot_store,
+    stock_files_key,
+    stock_history
 )
 
+logger = logging.getLogger(__name__)
+
 # Initialize configuration
 config = AppConfig.get_config()
 
@@ -60,6 +98,16 @@ st.set_page_config(
 # Initialize managers
 state_manager = StateManager(config.STATE_FILE)
 cache_manager = CacheManager(config.REPO_DIR / "cache")
+validated_cache = get_validated_cache(config.REPO_DIR / "cache" / "validated")
+state_store = get_state_store(
+    Path(config.STATE_FILE).with_suffix(".sqlite"),
+    legacy_file=config.STATE_FILE
+)
+sync_worker = get_sync_worker()
+datasets = get_dataset_registry()
+profiler = get_profiler(config.REPO_DIR / "cache" / "logs" / "pipeline_timings.jsonl")
+exports = get_export_cache()
+snapshots = snapshot_store(config)
 
 # Initialize session state
 state_manager.init_session_state()
@@ -80,23 +128,17 @@ def load_and_validate_data(
     
     try:
         if use_project_files:
+            from scripts.build_overview import find_pils_csv, read_erp, read_pils
+            
             # Load from project files
             pils_path = find_pils_csv(config.REPO_DIR)
-            erp_path = config.REPO_DIR / "ERP link.xlsx"
-            
-            # Use caching for faster loads
-            cache_key_pils = f"pils_{pils_path.stat().st_mtime}"
-            cache_key_erp = f"erp_{erp_path.stat().st_mtime}"
+            erp_path = project_path(config.REPO_DIR, "ERP link.xlsx")
             
-            df_pils = cache_manager.get_cached_dataframe(cache_key_pils)
-            if df_pils is None:
-                df_pils = read_pils(pils_path)
-                cache_manager.cache_dataframe(df_pils, cache_key_pils)
-            
-            df_erp = cache_manager.get_cached_dataframe(cache_key_erp)
-            if df_erp is None:
-                df_erp = read_erp(erp_path)
-                cache_manager.cache_dataframe(df_erp, cache_key_erp)
+            # Opgeschoond frame + validatierapport per inhoud; een hit slaat alles over
+            sources = {
+                "pils": (file_source_key(pils_path), lambda: read_pils(pils_path)),
+                "erp": (file_source_key(erp_path), lambda: read_erp(erp_path))
+            }
         
         else:
             # Load from uploads
@@ -106,26 +148,36 @@ def load_and_validate_data(
                 raise ValueError("Geen ERP Excel geüpload")
             
             # Read uploads
-            pils_upload.seek(0)
-            df_pils = pd.read_csv(pils_upload, sep=None, engine="python", dtype=str)
+            def read_pils_upload():
+                pils_upload.seek(0)
+                return pd.read_csv(pils_upload, sep=None, engine="python", dtype=str)
             
-            erp_upload.seek(0)
-            df_erp = pd.read_excel(erp_upload, dtype=str)
+            def read_erp_upload():
+                erp_upload.seek(0)
+                return pd.read_excel(erp_upload, dtype=str)
+            
+            sources = {
+                "pils": (bytes_source_key(pils_upload.getvalue()), read_pils_upload),
+                "erp": (bytes_source_key(erp_upload.getvalue()), read_erp_upload)
+            }
             
             # Create temp paths for compatibility
             pils_path = Path("uploaded_pils.csv")
             erp_path = Path("uploaded_erp.xlsx")
         
-        # Validate data
-        pils_valid, pils_errors, pils_warnings = DataValidator.validate_dataframe(df_pils, 'pils')
-        erp_valid, erp_errors, erp_warnings = DataValidator.validate_dataframe(df_erp, 'erp')
-        
-        validation_results['pils'] = (pils_valid, pils_errors, pils_warnings)
-        validation_results['erp'] = (erp_valid, erp_errors, erp_warnings)
-        
-        # Clean data
-        df_pils = DataValidator.clean_dataframe(df_pils, 'pils')
-        df_erp = DataValidator.clean_dataframe(df_erp, 'erp')
+        # Validate (gevectoriseerd) en clean; gecachet per inhoud
+        frames = {}
+        for kind, (source_key, read) in sources.items():
+            frames[kind], validation_results[kind], hit = validated_cache.load(
+                kind,
+                source_key,
+                read,
+                lambda df, kind=kind: DataValidator.clean_dataframe(df, kind)
+            )
+            profiler.cache_event(kind, hit)
+        df_pils, df_erp = frames["pils"], frames["erp"]
+        pils_warnings = validation_results["pils"][2]
+        erp_warnings = validation_results["erp"][2]
         
         # Show validation warnings if any
         if pils_warnings or erp_warnings:
@@ -149,6 +201,619 @@ def load_and_validate_data(
         raise
 
 
+def persist_state_changes(**updated: dict) -> None:
+    """
+    Journal only the entries that differ from this session's maps.
+    
+    Edits from other sessions are kept: after writing, the session maps are
+    refreshed from the shared state store.
+    """
+    changes = {
+        field: diff_state(state_manager.get(field, {}) or {}, values)
+        for field, values in updated.items()
+    }
+    state_store.apply_changes(changes)
+    state_manager.update(state_store.load())
+
+
+def input_fingerprint(
+    use_project_files: bool,
+    pils_upload: Optional[io.BytesIO],
+    erp_upload: Optional[io.BytesIO]
+) -> str:
+    """
+    Key identifying the current input files.
+    
+    The shared dataset is built once per key and reused by every session.
+    Project files and uploads use separate prefixes, so an upload never
+    replaces the project dataset other sessions are looking at.
+    """
+    if use_project_files:
+        # Zelfde sleutel als de batch pipeline, zodat snapshots herkend worden
+        from scripts.build_overview import find_pils_csv
+        return "project:" + file_fingerprint(project_input_files(config.REPO_DIR, find_pils_csv(config.REPO_DIR)))
+    if not pils_upload:
+        raise ValueError("Geen PILS CSV geüpload")
+    if not erp_upload:
+        raise ValueError("Geen ERP Excel geüpload")
+    digest = hashlib.sha1()
+    digest.update(pils_upload.getvalue())
+    digest.update(erp_upload.getvalue())
+    return "upload:" + digest.hexdigest()
+
+
+def current_dataset(use_project_files: bool):
+    """Dataset for this session: the newest project build, or the session's own upload build."""
+    if use_project_files:
+        return datasets.latest("project:")
+    return datasets.get(state_manager.get("dataset_version", ""))
+
+
+def run_pipeline(
+    use_project_files: bool,
+    pils_upload: Optional[io.BytesIO],
+    erp_upload: Optional[io.BytesIO],
+    progress_bar,
+    status_text
+) -> Tuple[dict, dict]:
+    """
+    Run the full load/validate/build pipeline once for the shared dataset.
+    
+    Returns:
+        Tuple of (frames, extras) for `DatasetRegistry.publish`
+    """
+    from scripts.build_overview import build_overview, read_stock_files
+    
+    # Voortgang gewogen naar de gemeten duur van de vorige run
+    progress = profiler.expected_progress(
+        ["load_and_validate_data", "read_stock_files", "build_overview"]
+    )
+    
+    # Load data
+    status_text.text("📁 Laden van bestanden...")
+    with profiler.stage("load_and_validate_data"):
+        df_pils, df_erp, pils_path, erp_path, validation_results = load_and_validate_data(
+            use_project_files,
+            pils_upload,
+            erp_upload
+        )
+    progress_bar.progress(progress("load_and_validate_data"))
+    
+    # Load stock
+    status_text.text("📦 Verwerken van stock data...")
+    stock_dir = project_path(config.REPO_DIR, "stock files")
+    with profiler.stage("read_stock_files"):
+        df_stock = read_stock_files(stock_dir, df_erp, use_cache=True)
+    progress_bar.progress(progress("read_stock_files"))
+    
+    # Nieuwe stock files als delta in de historiek (niets als ze ongewijzigd zijn)
+    with profiler.stage("record_stock_history"):
+        try:
+            source, taken_at = stock_files_key(stock_dir)
+            stock_history(config).record(df_stock, taken_at, source)
+        except Exception:
+            logger.exception("Stock historiek niet bijgewerkt")
+    
+    # Build overview (incrementeel) en compacte dtypes voor de gedeelde frames
+    status_text.text("🔄 Bouwen van overzicht...")
+    frames, raw_mb = build_frames(
+        df_pils,
+        df_erp,
+        df_stock,
+        build_overview,
+        profiler,
+        verify=getattr(config, "VERIFY_INCREMENTAL_OVERVIEW", False)
+    )
+    progress_bar.progress(progress("build_overview"))
+    
+    # Sync to database (background, status in sidebar)
+    sync_worker.submit("database", build_sync_job(df_pils, df_erp, frames["df_stock"]))
+    
+    extras = {
+        "validation_results": validation_results,
+        "memory_report": memory_report(frames),
+        "raw_memory_mb": raw_mb
+    }
+    return frames, extras
+
+
+def build_sync_job(df_pils: pd.DataFrame, df_erp: pd.DataFrame, df_stock: pd.DataFrame):
+    """
+    Sync job for the background worker.
+    
+    Uses batched upserts over a pooled connection when `SYNC_DATABASE_URL`
+    is configured, otherwise the existing `sync_to_database`. The upsert
+    path only ships rows whose content hash changed since the last sync.
+    """
+    from scripts.build_overview import sync_to_database
+    job = database_sync_job(
+        df_pils,
+        df_erp,
+        df_stock,
+        getattr(config, "SYNC_DATABASE_URL", None),
+        config.REPO_DIR / "cache" / "sync_hashes",
+        sync_to_database
+    )
+    
+    def timed_job():
+        with profiler.stage("sync_to_database"):
+            return job()
+    return timed_job
+
+
+def load_snapshot(dataset_key: str) -> Optional[Tuple[dict, dict]]:
+    """
+    Frames and extras from the batch snapshot for these inputs, if one exists.
+    
+    The Arrow files are memory-mapped, so this replaces the full pipeline
+    with a sub-second load (see `python -m atlas.batch`).
+    """
+    version = snapshots.find(dataset_key)
+    profiler.cache_event("snapshot", version is not None)
+    if version is None:
+        return None
+    with profiler.stage("load_snapshot"):
+        frames, meta = snapshots.load(version)
+    extras = {
+        "snapshot_version": version,
+        "metrics": meta.get("metrics"),
+        "backlog_date": meta.get("backlog_date"),
+        "memory_report": memory_report(frames),
+        "raw_memory_mb": meta.get("raw_memory_mb")
+    }
+    return frames, extras
+
+
+def refresh_in_background(changed: frozenset) -> str:
+    """
+    Watcher callback: rebuild what the changed inputs feed and swap it in.
+    
+    Runs on the watcher thread. The project dataset is rebuilt by the
+    headless batch pipeline (incremental build_overview) and published in
+    the shared registry, so sessions pick it up on their next rerun. The
+    database sync goes through the sync worker (queue, retries, status);
+    it is submitted after every swap, also when the snapshot already
+    existed, so a failed earlier sync is retried.
+    """
+    results = []
+    if "packed" in changed:
+        invalidate_packed_index(project_path(config.REPO_DIR, "packed files"))
+        try:
+            # Gepackte cases geven hun rekslot vrij (enkel de verschillen)
+            freed = get_rack_occupancy().release_packed(get_packed_case_index())
+            results.append(f"packed index ({freed} rekslots vrij)")
+        except Exception:
+            # Volgende render probeert de packed index opnieuw te laden
+            logger.exception("Packed archief niet beschikbaar")
+            results.append("packed index (niet geladen)")
+    if changed & {"pils", "erp", "stock"}:
+        dataset_key = input_fingerprint(True, None, None)
+        
+        def build_dataset():
+            run_batch(config, snapshots, profiler, sync=False)
+            snapshot = load_snapshot(dataset_key)
+            if snapshot is None:
+                raise RuntimeError("Inputbestanden gewijzigd tijdens de refresh")
+            return snapshot
+        
+        dataset, _ = datasets.get_or_build(dataset_key, build_dataset)
+        publish_lookup(dataset)
+        sync_worker.submit("database", build_sync_job(dataset["df_pils"], dataset["df_erp"], dataset["df_stock"]))
+        results.append(f"dataset {dataset.version}")
+    if "forecast" in changed:
+        # Nieuwe exports alvast inlezen, zodat de forecast tab enkel aggregaten leest
+        forecast = get_forecast_store(project_path(config.REPO_DIR, "forecast files")).load()
+        results.append(f"forecast ({len(forecast.cases)} cases)")
+    if "po" in changed:
+        results.append(f"PO inbox ({len(purchase_orders())} regels)")
+    return ", ".join(results)
+
+
+def purchase_orders() -> pd.DataFrame:
+    """Typed PO lines from the XML inbox (parsed once per file content)."""
+    return get_po_inbox(project_path(config.REPO_DIR, "XML bestanden"), config.REPO_DIR / "cache" / "po_inbox").load()
+
+
+def start_input_watcher():
+    """Process-wide watcher over the project input folders (see WATCH_INPUTS)."""
+    if not getattr(config, "WATCH_INPUTS", True):
+        return None
+    # Vaste map i.p.v. find_pils_csv: anders laadt elke rerun scripts.build_overview
+    return get_input_watcher(
+        {
+            "pils": [project_path(config.REPO_DIR, "PILS file")],
+            "erp": [project_path(config.REPO_DIR, "ERP link.xlsx")],
+            "stock": [project_path(config.REPO_DIR, "stock files")],
+            "forecast": [project_path(config.REPO_DIR, "forecast files")],
+            "packed": [project_path(config.REPO_DIR, "packed files")],
+            "po": [project_path(config.REPO_DIR, "XML bestanden")]
+        },
+        refresh_in_background,
+        poll_seconds=getattr(config, "WATCH_POLL_SECONDS", 5),
+        settle_seconds=getattr(config, "WATCH_SETTLE_SECONDS", 10)
+    )
+
+
+def render_watcher_status() -> None:
+    """Sidebar panel with the automatic refresh status."""
+    if input_watcher is None:
+        return
+    status = input_watcher.status()
+    with st.expander("👀 Automatische refresh", expanded=status.refreshing or bool(status.last_error)):
+        if status.refreshing:
+            st.write(f"🔄 Bezig met vernieuwen ({', '.join(sorted(status.pending))})...")
+        elif status.pending:
+            st.write(f"🕒 Wijziging in {', '.join(sorted(status.pending))}, wacht tot bestanden klaar zijn")
+        else:
+            st.write("✅ Inputbestanden worden bewaakt")
+        if status.last_refresh:
+            st.caption(f"Laatste refresh: {status.last_refresh.strftime(config.DATETIME_FORMAT)} ({status.last_result})")
+        if status.last_error:
+            st.error(f"Laatste fout ({status.last_error_at.strftime(config.DATETIME_FORMAT)}): {status.last_error}")
+
+
+def render_sync_status() -> None:
+    """Sidebar panel with the background database sync status."""
+    st.subheader("🔄 Database Sync")
+    status = sync_worker.status()
+    labels = {
+        "idle": "⚪ Nog niet gestart",
+        "queued": "🕒 In wachtrij",
+        "running": "🔄 Bezig...",
+        "retrying": "🔁 Opnieuw proberen",
+        "ok": "✅ Gesynchroniseerd",
+        "failed": "❌ Mislukt",
+    }
+    st.write(labels.get(status.state, status.state))
+    if status.last_success:
+        st.caption(f"Laatste sync: {status.last_success.strftime(config.DATETIME_FORMAT)}")
+    if status.last_result:
+        st.caption(f"Verstuurd: {status.last_result}")
+    if status.queued:
+        st.caption(f"{status.queued} job(s) in wachtrij")
+    if status.last_error and status.state in ("retrying", "failed"):
+        st.error(f"Laatste fout ({status.last_error_at.strftime(config.DATETIME_FORMAT)}): {status.last_error}")
+    elif status.last_error:
+        with st.expander("Laatste fout", expanded=False):
+            st.caption(f"{status.last_error_at.strftime(config.DATETIME_FORMAT)}: {status.last_error}")
+
+
+def render_memory_report(dataset) -> None:
+    """Sidebar panel with the memory footprint of the shared dataset."""
+    report = dataset.extras.get("memory_report")
+    if report is None or report.empty:
+        return
+    with st.expander("🧠 Geheugen", expanded=False):
+        st.dataframe(
+            report,
+            hide_index=True,
+            use_container_width=True,
+            column_config={"MB": st.column_config.NumberColumn("MB", format="%.1f")}
+        )
+        st.caption(f"Totaal: {report['MB'].sum():.1f} MB")
+        raw_mb = dataset.extras.get("raw_memory_mb")
+        compact_mb = report.loc[report["frame"].isin(["overview", "transport", "df_stock"]), "MB"].sum()
+        if raw_mb and compact_mb:
+            st.caption(f"Overview/transport/stock: {raw_mb:.1f} → {compact_mb:.1f} MB ({raw_mb / compact_mb:.1f}x kleiner)")
+
+
+def render_load_plan(transport: pd.DataFrame, overview: pd.DataFrame) -> None:
+    """Truck-load planning for the cases in the transport frame."""
+    st.subheader("🚛 Laadplanning")
+    if transport.empty or "case_label" not in transport.columns:
+        st.info("Geen cases voor transport")
+        return
+    # Priority en arrival_date uit de sessie-overview (met overlays)
+    extra = [c for c in ("priority", "arrival_date", "productielocatie") if c in overview.columns and c not in transport.columns]
+    cases = transport.merge(
+        overview[["case_label", *extra]].drop_duplicates("case_label"),
+        on="case_label",
+        how="left"
+    )
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        locations = sorted(cases["productielocatie"].dropna().unique().tolist()) if "productielocatie" in cases.columns else []
+        sel_locations = st.multiselect("Locatie", locations, key="load_plan_locations")
+    with col2:
+        priority_only = st.checkbox("Alleen priority", key="load_plan_priority")
+    with col3:
+        improve = st.checkbox("Optimaliseren", value=True, key="load_plan_improve")
+    if sel_locations:
+        cases = cases.loc[cases["productielocatie"].isin(sel_locations)]
+    if priority_only and "priority" in cases.columns:
+        cases = cases.loc[cases["priority"].fillna(False).astype(bool)]
+    
+    with profiler.stage("load_plan"):
+        plan = plan_loads(
+            cases,
+            truck=TruckSpec.from_config(config),
+            dimensions=getattr(config, "CASE_DIMENSIONS", None),
+            improve=improve,
+            extra_holidays=getattr(config, "EXTRA_HOLIDAYS", ()),
+            excluded_holidays=getattr(config, "WORKED_HOLIDAYS", ())
+        )
+    state_manager.set("load_plan", plan)
+    
+    st.caption(f"{len(plan.assignments)} cases in {plan.truck_count} vrachtwagens ({plan.elapsed_ms:.0f} ms)")
+    st.dataframe(
+        plan.trucks,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "truck": st.column_config.NumberColumn("Truck", format="%d"),
+            "area_m2": st.column_config.NumberColumn("m²", format="%.1f"),
+            "weight_kg": st.column_config.NumberColumn("kg", format="%.0f"),
+            "earliest_deadline": st.column_config.DateColumn("Eerste deadline", format="DD/MM/YYYY"),
+            "fill_area_pct": st.column_config.ProgressColumn("Vloer", format="%.0f%%", min_value=0, max_value=100),
+            "fill_weight_pct": st.column_config.ProgressColumn("Gewicht", format="%.0f%%", min_value=0, max_value=100)
+        }
+    )
+    if not plan.trucks.empty:
+        sel_truck = st.selectbox("Truck", plan.trucks["truck"].tolist(), key="load_plan_truck")
+        columns = [c for c in ("load_order", "case_label", "case_type", "priority", "deadline", "area_m2", "weight_kg") if c in plan.assignments.columns]
+        st.dataframe(
+            plan.assignments.loc[plan.assignments["truck"] == sel_truck, columns],
+            hide_index=True,
+            use_container_width=True,
+            column_config={"deadline": st.column_config.DateColumn("Deadline", format="DD/MM/YYYY")}
+        )
+    if not plan.unplaced.empty:
+        st.warning(f"{len(plan.unplaced)} case(s) passen niet in een lege vrachtwagen: {', '.join(plan.unplaced['case_label'].astype(str).head(10))}")
+
+
+def render_pager(name: str, frame: pd.DataFrame, columns, default_sort=None, ascending: bool = True, sort_index=None):
+    """
+    Sort and page controls for a table.
+
+    Sorting happens server-side; only the returned page (with `columns`)
+    is sent to the browser.
+    """
+    columns = list(columns)
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        options = [None, *columns]
+        sort_by = st.selectbox(
+            "Sorteer op",
+            options,
+            index=options.index(default_sort) if default_sort in options else 0,
+            format_func=lambda c: "Standaard" if c is None else c,
+            key=f"{name}_sort"
+        )
+    with col2:
+        descending = st.toggle("Aflopend", value=not ascending, key=f"{name}_descending")
+    with col3:
+        page_size = st.selectbox("Per pagina", PAGE_SIZES, index=1, key=f"{name}_page_size")
+    with col4:
+        pages = max(1, -(-len(frame) // page_size))
+        # Na een filterwijziging kan de vorige pagina niet meer bestaan
+        if st.session_state.get(f"{name}_page", 1) > pages:
+            st.session_state[f"{name}_page"] = pages
+        number = st.number_input("Pagina", min_value=1, max_value=pages, step=1, key=f"{name}_page")
+    page = paginate(frame, columns, sort_by, not descending, number, page_size, sort_index)
+    st.caption(f"Rijen {page.start + 1 if page.total else 0}–{page.stop} van {page.total} (pagina {page.number}/{page.pages})")
+    return page
+
+
+def render_export(name: str, frame, key: str, label: str) -> None:
+    """
+    Download button whose file is only built on request.
+
+    The export is memoized per (`key`, format): `key` combines the dataset
+    version with the filter state, so reruns and other sessions with the
+    same view reuse the bytes instead of rebuilding them.
+    """
+    fmt = st.selectbox("Formaat", list(EXPORT_FORMATS), key=f"export_format_{name}", label_visibility="collapsed")
+    cache_key = (name, key, fmt)
+    data = exports.get(cache_key)
+    if data is None and st.button("📦 Export voorbereiden", key=f"export_prepare_{name}"):
+        with profiler.stage(f"export:{name}"):
+            data = exports.put(cache_key, export_bytes(frame() if callable(frame) else frame, fmt, sheet_name=name.capitalize()))
+    if data is not None:
+        extension, mime = EXPORT_FORMATS[fmt]
+        st.download_button(
+            label=label,
+            data=data,
+            file_name=f"{name.capitalize()}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+            mime=mime,
+            key=f"export_download_{name}"
+        )
+
+
+def lazy_component(name: str, module: str = "components"):
+    """Import a tab renderer from `components` on first use, timed per call."""
+    with profiler.stage("import_components"):
+        renderer = getattr(importlib.import_module(module), name)
+    
+    def timed_renderer(*args, **kwargs):
+        with profiler.stage(f"tab:{name.removeprefix('render_').removesuffix('_tab')}"):
+            return renderer(*args, **kwargs)
+    return timed_renderer
+
+
+def render_timings() -> None:
+    """Sidebar panel with stage durations, cache hits and the optional profile."""
+    with st.expander("⏱️ Timings", expanded=False):
+        last_run = profiler.last_run()
+        if last_run is not None:
+            st.caption(
+                f"Laatste verwerking ({last_run.label}): {last_run.total_ms / 1000:.1f} s "
+                f"om {last_run.started_at.strftime(config.DATETIME_FORMAT)}"
+            )
+        stages = profiler.stage_table()
+        if stages.empty:
+            st.caption("Nog geen metingen")
+        else:
+            st.dataframe(
+                stages,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    col: st.column_config.NumberColumn(col, format="%.0f")
+                    for col in ("laatste ms", "gem. ms", "max ms")
+                }
+            )
+        caches = profiler.cache_table()
+        if not caches.empty:
+            st.dataframe(caches, hide_index=True, use_container_width=True)
+        st.checkbox(
+            "Profileer volgende verwerking (cProfile)",
+            key="profile_next_run",
+            help="Legt één verwerking vast met cProfile; vertraagt die run"
+        )
+        if last_run is not None and last_run.profile:
+            st.download_button(
+                "📥 Download profiel",
+                data=last_run.profile,
+                file_name=f"profile_{last_run.run_id}.txt",
+                mime="text/plain"
+            )
+            st.code(last_run.profile[:4000], language="text")
+
+
+def overview_with_overlays(overview: pd.DataFrame) -> pd.DataFrame:
+    """Session copy of the shared overview with this user's status/priority/comments."""
+    return apply_overlays(
+        overview,
+        status_map=state_manager.get("status_map", {}),
+        priorities=state_manager.get("priorities", {}),
+        comments=state_manager.get("comments", {})
+    )
+
+
+def get_packed_case_index():
+    """Shared packed-case index, re-read only when the packed exports change."""
+    def legacy_archive() -> pd.DataFrame:
+        from scripts.build_overview import load_packed_archive
+        return load_packed_archive()
+    
+    return get_packed_index(
+        project_path(config.REPO_DIR, "packed files"),
+        packed_archive_loader(
+            project_path(config.REPO_DIR, "packed files"),
+            config.REPO_DIR / "cache" / "packed_archive",
+            seed=legacy_archive
+        )
+    )
+
+
+def get_rack_occupancy():
+    """Shared rack occupancy index; slots come from KANBAN_RACKS."""
+    return get_rack_index(config.REPO_DIR / "cache" / "rack_index.sqlite", getattr(config, "KANBAN_RACKS", None))
+
+
+def shared_stock_index(dataset):
+    """
+    Item x site stock index of a dataset version, built once and shared.
+
+    Published as `stock_index` so the transport, forecast and stock tabs
+    look items up instead of filtering `df_stock` again.
+    """
+    try:
+        stock_index = get_stock_index(dataset.version, dataset["df_stock"])
+    except KeyError:
+        # Onbekend stockformaat: tabs vallen terug op df_stock
+        return None
+    state_manager.set("stock_index", stock_index)
+    return stock_index
+
+
+def render_stock_lookup(stock_index) -> None:
+    """Stock per site and per location of one item, straight from the stock index."""
+    with st.expander("🔎 Stock per item", expanded=False):
+        item = st.text_input("Item number", key="stock_lookup_item").strip().upper()
+        if not item:
+            st.caption(f"{len(stock_index)} items in de stock index")
+            return
+        if item not in stock_index:
+            st.info(f"{item} komt in geen enkele stock file voor")
+            return
+        cols = st.columns(len(stock_index.sites))
+        for col, (site, quantity) in zip(cols, stock_index.lookup(item).items()):
+            col.metric(site, f"{quantity:,.0f}")
+        locations = stock_index.locations(item)
+        if not locations.empty:
+            st.dataframe(locations, hide_index=True, use_container_width=True)
+        # Verloop uit de stock historiek (geen oude Excel files nodig)
+        history = stock_history(config).series(item)
+        if len(history) > 1:
+            st.line_chart(history)
+
+
+def render_forecast_summary(forecast) -> None:
+    """Weekly forecast demand per case type, straight from the forecast store aggregates."""
+    with st.expander("📈 Wekelijkse vraag (forecast)", expanded=False):
+        st.caption(f"{len(forecast.cases):,} cases uit {len(forecast.files)} exports")
+        if forecast.weekly.empty:
+            return
+        per_type = forecast.weekly.pivot_table(
+            index="week", columns="case_type", values="cases", aggfunc="sum", observed=True, fill_value=0
+        )
+        st.bar_chart(per_type)
+
+
+def render_rack_lookup(racks, overview: pd.DataFrame) -> None:
+    """Where is case X / where do I put case X, straight from the occupancy index."""
+    with st.expander("🔎 Rekbezetting", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            find = st.text_input("Waar staat case", key="rack_find").strip().upper()
+            if find:
+                location = racks.locate(find)
+                if location:
+                    st.success(f"{find}: rek {location[0]}, slot {location[1]}")
+                else:
+                    st.info(f"{find} staat in geen enkel rek")
+        with col2:
+            new_case = st.text_input("Case plaatsen", key="rack_place").strip().upper()
+            if new_case:
+                match = overview.loc[overview["case_label"].astype(str).str.upper() == new_case, "case_type"]
+                size_class = size_classes(
+                    match.head(1) if len(match) else pd.Series([""]),
+                    getattr(config, "KANBAN_SIZE_CLASSES", None)
+                ).iloc[0]
+                suggestion = racks.locate(new_case) or racks.suggest(size_class)
+                if suggestion is None:
+                    st.warning(f"Geen vrij slot voor maatklasse {size_class}")
+                else:
+                    st.caption(f"Maatklasse {size_class}: rek {suggestion[0]}, slot {suggestion[1]}")
+                    if st.button("📥 Plaatsen", key="rack_place_button"):
+                        try:
+                            rack, slot = racks.place(new_case, size_class)
+                            st.success(f"{new_case} geplaatst in rek {rack}, slot {slot}")
+                        except ValueError as exc:
+                            st.error(str(exc))
+        st.dataframe(racks.free_counts(), hide_index=True, use_container_width=True)
+
+
+def start_lookup_service():
+    """Process-wide case lookup service for the handheld scanners (see LOOKUP_SERVICE_PORT)."""
+    port = getattr(config, "LOOKUP_SERVICE_PORT", None)
+    if not port:
+        return None
+    try:
+        return get_lookup_service(getattr(config, "LOOKUP_SERVICE_HOST", "127.0.0.1"), port, state_store.load)
+    except OSError:
+        # Poort bezet, bv. door een los draaiende `python -m atlas.lookup_service`
+        return None
+
+
+def publish_lookup(dataset) -> None:
+    """Swap the lookup service to a new project dataset version (uploads stay private)."""
+    if lookup_service is None or not dataset.key.startswith("project:") or lookup_service.version == dataset.version:
+        return
+    lookup_service.publish(LookupIndex.build(
+        dataset.version,
+        dataset["overview"],
+        extra_holidays=getattr(config, "EXTRA_HOLIDAYS", ()),
+        excluded_holidays=getattr(config, "WORKED_HOLIDAYS", ())
+    ))
+
+
+input_watcher = start_input_watcher()
+lookup_service = start_lookup_service()
+
+
 def main():
     """Main application function."""
     
@@ -194,15 +859,24 @@ def main():
         
         if st.button("🗑️ Clear Cache"):
             cache_manager.clear_all_cache()
+            validated_cache.clear()
+            datasets.clear()
             st.success("Cache geleegd!")
             st.rerun()
         
-        # Email Sync Status
-        try:
-            from components.email_sync_component import render_email_sync_status
-            render_email_sync_status()
-        except Exception as e:
-            st.warning(f"Email sync niet beschikbaar: {e}")
+        render_sync_status()
+        render_watcher_status()
+        render_timings()
+        
+        # Email Sync Status: pas importeren als de gebruiker erom vraagt
+        with st.expander("📧 Email sync", expanded=False):
+            if st.checkbox("Status laden", key="show_email_sync"):
+                try:
+                    lazy_component(
+                        "render_email_sync_status", "components.email_sync_component"
+                    )()
+                except Exception as e:
+                    st.warning(f"Email sync niet beschikbaar: {e}")
         
         st.divider()
         
@@ -211,6 +885,7 @@ def main():
         st.info(f"""
         **Versie:** 2.0.0
         **State:** v{state_manager.VERSION}
+        **Dataset:** {state_manager.get("dataset_version", "-")}
         **Config:** {config.PAGE_TITLE}
         """)
     
@@ -228,7 +903,7 @@ def main():
             st.success(f"✅ **Data geladen** - Laatste update: {last_refresh.strftime(config.DATETIME_FORMAT)}")
         
         # Auto-refresh suggestion
-        if state_manager.should_refresh(max_age_minutes=60):
+        if input_watcher is None and state_manager.should_refresh(max_age_minutes=60):
             st.info("💡 Data is meer dan een uur oud. Overweeg te vernieuwen.")
     
     # Process button
@@ -239,89 +914,46 @@ def main():
         if state_manager.is_data_loaded():
             if st.button("🔄 Vernieuwen", use_container_width=True):
                 state_manager.clear_data()
+                st.session_state["force_rebuild"] = True
                 st.rerun()
     
-    # Process data
-    if process or not state_manager.is_data_loaded():
+    # Process data; Verwerken/Vernieuwen bouwen opnieuw i.p.v. de gedeelde dataset te hergebruiken
+    force = process or st.session_state.pop("force_rebuild", False)
+    if force or not state_manager.is_data_loaded() or current_dataset(use_project_files) is None:
         try:
             # Progress tracking
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            # Load data
-            status_text.text("📁 Laden van bestanden...")
-            progress_bar.progress(20)
-            
-            df_pils, df_erp, pils_path, erp_path, validation_results = load_and_validate_data(
-                use_project_files,
-                uploaded_pils,
-                uploaded_erp
-            )
-            
-            # Load stock
-            status_text.text("📦 Verwerken van stock data...")
-            progress_bar.progress(40)
-            
-            stock_dir = config.REPO_DIR / "Stock Files"
-            df_stock = read_stock_files(stock_dir, df_erp, use_cache=True)
-            
-            # Load persistent state
-            status_text.text("💾 Laden van opgeslagen data...")
-            progress_bar.progress(60)
-            
-            persistent = state_manager.load_persistent_state()
-            comments_persist = persistent.get("comments", {})
-            status_persist = persistent.get("status_map", {})
-            priorities_persist = persistent.get("priorities", {})
-            
-            # Build overview
-            status_text.text("🔄 Bouwen van overzicht...")
-            progress_bar.progress(80)
-            
-            overview, transport = build_overview(
-                df_pils,
-                df_erp,
-                df_stock=df_stock,
-                comments_map=state_manager.get("comments", comments_persist)
-            )
-            
-            # Add status column
-            if "status" not in overview.columns:
-                overview.loc[:, "status"] = overview["case_label"].map(status_persist).fillna("")
-            
-            # Store in session state
-            state_manager.update({
-                "overview": overview,
-                "transport": transport,
-                "df_pils": df_pils,
-                "df_erp": df_erp,
-                "df_stock": df_stock,
-                "comments": comments_persist,
-                "status_map": status_persist,
-                "priorities": priorities_persist
-            })
+            # Eén gedeelde build per set inputbestanden; andere sessies hergebruiken die
+            profile_run = st.session_state.pop("profile_next_run", False)
+            with profiler.run("project" if use_project_files else "upload", profile=profile_run) as pipeline_run:
+                dataset_key = input_fingerprint(use_project_files, uploaded_pils, uploaded_erp)
+                
+                def build_dataset():
+                    # Voorberekende batch snapshot voor dezelfde inputs: enkel inladen
+                    snapshot = load_snapshot(dataset_key) if use_project_files and not force else None
+                    return snapshot or run_pipeline(use_project_files, uploaded_pils, uploaded_erp, progress_bar, status_text)
+                
+                dataset, built = datasets.get_or_build(dataset_key, build_dataset, force=force)
+                profiler.cache_event("dataset", not built)
+                
+                # Sessie bewaart alleen de versie en de kleine overlays
+                state_manager.set("dataset_version", dataset.version)
+                with profiler.stage("load_persistent_state"):
+                    state_manager.update(state_store.load())
             
             # Mark as loaded
             state_manager.mark_data_loaded()
             
-            # Sync to database (background)
-            try:
-                sync_to_database(df_pils, df_erp, df_stock)
-            except Exception:
-                pass
-            
             # Complete
-            progress_bar.progress(100)
-            status_text.text("✅ Data succesvol geladen!")
-            
-            # Clear progress
-            import time
-            time.sleep(0.5)
             progress_bar.empty()
             status_text.empty()
+            st.toast(f"✅ Data succesvol geladen in {pipeline_run.total_ms / 1000:.1f} s")
             
             # Show validation report if there were issues
-            if validation_results:
+            validation_results = dataset.extras.get("validation_results")
+            if built and validation_results:
                 report = DataValidator.generate_validation_report(validation_results)
                 with st.expander("📋 Validatie Rapport", expanded=False):
                     st.text(report)
@@ -335,21 +967,54 @@ def main():
     
     # Display data if loaded
     if state_manager.is_data_loaded():
-        overview = state_manager.get("overview")
-        transport = state_manager.get("transport")
-        
-        if overview is None or transport is None:
+        dataset = current_dataset(use_project_files)
+        if dataset is None:
             st.error("Data niet correct geladen. Probeer opnieuw.")
             return
         
-        # KPIs
-        metrics = MetricsCalculator.calculate_executive_metrics(overview, transport)
+        # Door de watcher op de achtergrond vernieuwde dataset
+        if dataset.version != state_manager.get("dataset_version"):
+            state_manager.set("dataset_version", dataset.version)
+            st.toast(f"🔄 Nieuwe data automatisch geladen ({dataset.built_at.strftime(config.DATETIME_FORMAT)})")
+        publish_lookup(dataset)
+        
+        with st.sidebar:
+            render_memory_report(dataset)
+        
+        # Gedeelde (read-only) frames; edits van andere planners meenemen
+        overview = dataset["overview"]
+        transport = dataset["transport"]
+        with profiler.stage("load_persistent_state"):
+            state_manager.update(state_store.load())
+        
+        # KPIs: één keer per dataset versie; edits werken de tellers incrementeel bij
+        metrics_memo = get_metrics_memo()
+        today = date.today()
+        # Snapshot KPIs enkel gebruiken als de batch vandaag draaide (backlog_overdue)
+        snapshot_metrics = (
+            dataset.extras.get("metrics")
+            if dataset.extras.get("backlog_date") == today.isoformat() else None
+        )
+        metrics = metrics_memo.metrics(
+            dataset.version,
+            lambda: snapshot_metrics or MetricsCalculator.calculate_executive_metrics(overview, transport),
+            as_of=today
+        )
+        counters = metrics_memo.overlay_counts(
+            dataset.version,
+            overview,
+            {field: state_manager.get(field, {}) for field in ("status_map", "priorities", "comments")}
+        )
         
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Totaal Cases", f"{metrics['total_cases']:,}")
         col2.metric("In Willebroek", f"{metrics['in_willebroek']:,}")
         col3.metric("Transport Nodig", f"{metrics['total_transport_needed']:,}")
         col4.metric("Overdue", f"{metrics['backlog_overdue']}")
+        st.caption(
+            f"⭐ {counters['priority_cases']:,} priority · 💬 {counters['with_comments']:,} met comments"
+            + "".join(f" · {status}: {count:,}" for status, count in sorted(counters["status_counts"].items()))
+        )
         
         # Tabs
         tab_names = [
@@ -363,425 +1028,390 @@ def main():
             "⏰ Backlog"
         ]
         
-        tabs = st.tabs(tab_names)
+        # Alleen de actieve tab wordt berekend (st.tabs rendert ze allemaal)
+        active_tab = st.radio(
+            "Tab",
+            tab_names,
+            horizontal=True,
+            key="active_tab",
+            label_visibility="collapsed"
+        )
         
-        with tabs[0]:
-            # Executive Dashboard
-            render_executive_dashboard(overview, transport)
+        if active_tab == tab_names[0]:
+            # Executive Dashboard (voorberekende, gedownsamplede reeksen per dataset versie)
+            state_manager.set("dashboard_aggregates", metrics_memo.aggregates(dataset.version, overview, transport))
+            state_manager.set("metrics", {**metrics, **counters})
+            lazy_component("render_executive_dashboard")(overview, transport)
         
-        with tabs[1]:
+        if active_tab == tab_names[1]:
             # Overview tab met uitgebreide functionaliteit
-            st.header("📋 Overzicht - PILS Data")
-            
-            # Maak een kopie van overview om warnings te voorkomen
-            overview = overview.copy()
-            
-            # Voeg priority kolom toe als die er nog niet is
-            if "priority" not in overview.columns:
-                priorities = state_manager.get("priorities", {})
-                overview.loc[:, "priority"] = overview["case_label"].map(priorities).fillna(False)
-            
-            # Voeg comment kolom toe als die er nog niet is
-            if "comment" not in overview.columns:
-                comments = state_manager.get("comments", {})
-                overview.loc[:, "comment"] = overview["case_label"].map(comments).fillna("")
-            
-            # Filters
-            with st.expander("🔍 Filters", expanded=True):
-                col1, col2, col3, col4, col5 = st.columns(5)
-                
-                with col1:
-                    locations = ["Alle"] + sorted(overview["productielocatie"].dropna().unique().tolist())
-                    sel_location = st.selectbox("Locatie", locations)
-                
-                with col2:
-                    statuses = ["Alle"] + sorted([s for s in overview.get("status", pd.Series()).dropna().unique() if s])
-                    sel_status = st.selectbox("Status", statuses)
-                
-                with col3:
-                    willebroek_filter = st.selectbox(
-                        "In Willebroek",
-                        ["Alle", "Ja", "Nee"]
-                    )
+            with profiler.stage("tab:overzicht"):
+                st.header("📋 Overzicht - PILS Data")
                 
-                with col4:
-                    priority_filter = st.selectbox(
-                        "⭐ Priority",
-                        ["Alle", "Priority Only", "Non-Priority"]
-                    )
+                # Sessie-kopie van de gedeelde overview met status/priority/comment overlays
+                overview = overview_with_overlays(overview)
+                # PO nummer en leverdatum uit de XML inbox, gekoppeld op case label
+                overview = join_purchase_orders(overview, purchase_orders())
                 
-                with col5:
-                    search = st.text_input("🔍 Zoeken", placeholder="Case, type, item...")
-            
-            # Apply filters - gebruik .loc om warnings te voorkomen
-            df_filtered = overview.copy()
-            
-            if sel_location != "Alle":
-                df_filtered = df_filtered.loc[df_filtered["productielocatie"] == sel_location].copy()
-            
-            if sel_status != "Alle":
-                df_filtered = df_filtered.loc[df_filtered["status"] == sel_status].copy()
-            
-            if willebroek_filter == "Ja":
-                df_filtered = df_filtered.loc[df_filtered["in_willebroek"] == True].copy()
-            elif willebroek_filter == "Nee":
-                df_filtered = df_filtered.loc[df_filtered["in_willebroek"] == False].copy()
-            
-            if priority_filter == "Priority Only":
-                df_filtered = df_filtered.loc[df_filtered["priority"] == True].copy()
-            elif priority_filter == "Non-Priority":
-                df_filtered = df_filtered.loc[df_filtered["priority"] == False].copy()
-            
-            if search:
-                search_cols = ["case_label", "case_type", "item_number", "stock_location", "comment"]
-                search_str = df_filtered[search_cols].astype(str).agg(" ".join, axis=1)
-                df_filtered = df_filtered.loc[search_str.str.contains(search, case=False, na=False)].copy()
-            
-            # Display metrics
-            col_m1, col_m2, col_m3 = st.columns(3)
-            col_m1.write(f"**{len(df_filtered)} cases** (van {len(overview)} totaal)")
-            priority_count = int(df_filtered["priority"].sum()) if "priority" in df_filtered.columns else 0
-            col_m2.write(f"**⭐ {priority_count} priority cases**")
-            with_comments = int((df_filtered["comment"] != "").sum()) if "comment" in df_filtered.columns else 0
-            col_m3.write(f"**💬 {with_comments} met comments**")
-            
-            # Styling voor priority cases
-            def highlight_priority(row):
-                """Highlight priority rows met gouden kleur."""
-                if row.get("priority", False):
-                    return ['background-color: #FFD700; color: #000000; font-weight: bold'] * len(row)
-                return [''] * len(row)
-            
-            # Selecteer kolommen om te tonen (reorganiseer voor betere weergave)
-            display_columns = ["priority", "case_label", "case_type", "arrival_date", "item_number", 
-                             "productielocatie", "in_willebroek", "status", "comment", "stock_location"]
-            display_columns = [col for col in display_columns if col in df_filtered.columns]
-            
-            # Editable dataframe met styling
-            st.markdown("""
-            <style>
-            /* Maak priority cases gouden */
-            [data-testid="stDataFrameResizable"] tbody tr:has(input[type="checkbox"]:checked) {
-                background-color: #FFD700 !important;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-            
-            edited_df = st.data_editor(
-                df_filtered[display_columns],
-                hide_index=True,
-                use_container_width=True,
-                num_rows="fixed",
-                disabled=["case_label", "case_type", "arrival_date", "item_number", "productielocatie"],
-                column_config={
-                    "priority": st.column_config.CheckboxColumn(
-                        "⭐",
-                        help="Markeer als priority case",
-                        default=False
-                    ),
-                    "in_willebroek": st.column_config.CheckboxColumn("In WB"),
-                    "comment": st.column_config.TextColumn(
-                        "💬 Comment",
-                        help="Voeg notities toe",
-                        max_chars=500
-                    ),
-                    "status": st.column_config.SelectboxColumn(
-                        "Status",
-                        options=config.VALID_STATUSES
-                    ),
-                    "arrival_date": st.column_config.DateColumn(
-                        "Arrival Date",
-                        format="DD/MM/YYYY"
-                    )
-                },
-                key="overview_editor"
-            )
-            
-            # Save changes
-            col_save1, col_save2, col_save3 = st.columns([1, 1, 3])
-            
-            with col_save1:
-                if st.button("💾 Opslaan", type="primary", use_container_width=True):
-                    # Update alle gewijzigde data
-                    current_comments = state_manager.get("comments", {})
-                    current_status = state_manager.get("status_map", {})
-                    current_priorities = state_manager.get("priorities", {})
+                # Filters
+                with st.expander("🔍 Filters", expanded=True):
+                    col1, col2, col3, col4, col5 = st.columns(5)
+                    
+                    with col1:
+                        locations = ["Alle"] + sorted(overview["productielocatie"].dropna().unique().tolist())
+                        sel_location = st.selectbox("Locatie", locations)
+                    
+                    with col2:
+                        statuses = ["Alle"] + sorted([s for s in overview.get("status", pd.Series()).dropna().unique() if s])
+                        sel_status = st.selectbox("Status", statuses)
                     
-                    for idx, row in edited_df.iterrows():
-                        case_label = row["case_label"]
+                    with col3:
+                        willebroek_filter = st.selectbox(
+                            "In Willebroek",
+                            ["Alle", "Ja", "Nee"]
+                        )
+                    
+                    with col4:
+                        priority_filter = st.selectbox(
+                            "⭐ Priority",
+                            ["Alle", "Priority Only", "Non-Priority"]
+                        )
+                    
+                    with col5:
+                        search = st.text_input("🔍 Zoeken", placeholder="Case, type, item...")
+                
+                # Apply filters - gebruik .loc om warnings te voorkomen
+                df_filtered = overview.copy()
+                
+                if sel_location != "Alle":
+                    df_filtered = df_filtered.loc[df_filtered["productielocatie"] == sel_location].copy()
+                
+                if sel_status != "Alle":
+                    df_filtered = df_filtered.loc[df_filtered["status"] == sel_status].copy()
+                
+                if willebroek_filter == "Ja":
+                    df_filtered = df_filtered.loc[df_filtered["in_willebroek"] == True].copy()
+                elif willebroek_filter == "Nee":
+                    df_filtered = df_filtered.loc[df_filtered["in_willebroek"] == False].copy()
+                
+                if priority_filter == "Priority Only":
+                    df_filtered = df_filtered.loc[df_filtered["priority"] == True].copy()
+                elif priority_filter == "Non-Priority":
+                    df_filtered = df_filtered.loc[df_filtered["priority"] == False].copy()
+                
+                if search:
+                    search_cols = ["case_label", "case_type", "item_number", "stock_location", "comment"]
+                    search_str = df_filtered[search_cols].astype(str).agg(" ".join, axis=1)
+                    df_filtered = df_filtered.loc[search_str.str.contains(search, case=False, na=False)].copy()
+                
+                # Display metrics
+                col_m1, col_m2, col_m3 = st.columns(3)
+                col_m1.write(f"**{len(df_filtered)} cases** (van {len(overview)} totaal)")
+                priority_count = int(df_filtered["priority"].sum()) if "priority" in df_filtered.columns else 0
+                col_m2.write(f"**⭐ {priority_count} priority cases**")
+                with_comments = int((df_filtered["comment"] != "").sum()) if "comment" in df_filtered.columns else 0
+                col_m3.write(f"**💬 {with_comments} met comments**")
+                
+                # Styling voor priority cases
+                def highlight_priority(row):
+                    """Highlight priority rows met gouden kleur."""
+                    if row.get("priority", False):
+                        return ['background-color: #FFD700; color: #000000; font-weight: bold'] * len(row)
+                    return [''] * len(row)
+                
+                # Selecteer kolommen om te tonen (reorganiseer voor betere weergave)
+                display_columns = ["priority", "case_label", "case_type", "arrival_date", "item_number", 
+                                 "po_number", "po_delivery_date", "productielocatie", "in_willebroek", "status", "comment", "stock_location"]
+                display_columns = [col for col in display_columns if col in df_filtered.columns]
+                
+                # Editable dataframe met styling
+                st.markdown("""
+                <style>
+                /* Maak priority cases gouden */
+                [data-testid="stDataFrameResizable"] tbody tr:has(input[type="checkbox"]:checked) {
+                    background-color: #FFD700 !important;
+                }
+                </style>
+                """, unsafe_allow_html=True)
+                
+                # Enkel de zichtbare pagina naar de browser; sorteren op de gedeelde
+                # overview via een sorteerindex per dataset versie (sessie-kolommen niet)
+                view_key = filter_key(
+                    dataset=dataset.version,
+                    location=sel_location,
+                    status=sel_status,
+                    willebroek=willebroek_filter,
+                    priority=priority_filter,
+                    search=search,
+                    overlays=[state_manager.get(f, {}) for f in ("status_map", "priorities", "comments")]
+                )
+                sort_index = get_sort_index(dataset.version, dataset["overview"])
+                sort_by = st.session_state.get("overview_sort")
+                page = render_pager(
+                    "overview",
+                    df_filtered,
+                    display_columns,
+                    sort_index=None if sort_by in ("priority", "status", "comment", "po_number", "po_delivery_date") else sort_index
+                )
+                
+                edited_df = st.data_editor(
+                    page.frame,
+                    hide_index=True,
+                    use_container_width=True,
+                    num_rows="fixed",
+                    disabled=["case_label", "case_type", "arrival_date", "item_number", "po_number", "po_delivery_date", "productielocatie"],
+                    column_config={
+                        "priority": st.column_config.CheckboxColumn(
+                            "⭐",
+                            help="Markeer als priority case",
+                            default=False
+                        ),
+                        "in_willebroek": st.column_config.CheckboxColumn("In WB"),
+                        "comment": st.column_config.TextColumn(
+                            "💬 Comment",
+                            help="Voeg notities toe",
+                            max_chars=500
+                        ),
+                        "status": st.column_config.SelectboxColumn(
+                            "Status",
+                            options=config.VALID_STATUSES
+                        ),
+                        "arrival_date": st.column_config.DateColumn(
+                            "Arrival Date",
+                            format="DD/MM/YYYY"
+                        ),
+                        "po_number": st.column_config.TextColumn("PO"),
+                        "po_delivery_date": st.column_config.DateColumn(
+                            "PO Levering",
+                            format="DD/MM/YYYY"
+                        )
+                    },
+                    # Nieuwe key per weergave: bewerkingen blijven bij hun rij
+                    key=f"overview_editor_{view_key}_{page.number}_{st.session_state.get('overview_sort')}_{st.session_state.get('overview_descending')}_{st.session_state.get('overview_page_size')}"
+                )
+                st.caption("💡 Sla wijzigingen op voor je naar een andere pagina gaat")
+                
+                # Save changes
+                col_save1, col_save2, col_save3 = st.columns([1, 1, 3])
+                
+                with col_save1:
+                    if st.button("💾 Opslaan", type="primary", use_container_width=True):
+                        # Update alle gewijzigde data
+                        current_comments = dict(state_manager.get("comments", {}))
+                        current_status = dict(state_manager.get("status_map", {}))
+                        current_priorities = dict(state_manager.get("priorities", {}))
                         
-                        # Update priority
-                        if "priority" in row:
-                            current_priorities[case_label] = bool(row["priority"])
+                        # Enkel gewijzigde rijen, teruggekoppeld via case_label
+                        editable = [c for c in ("priority", "comment", "status") if c in edited_df.columns]
+                        after = edited_df[editable].astype(object)
+                        before = page.frame[editable].astype(object)
+                        # NA tegenover NA is geen wijziging
+                        changed = ((after != before) & ~(after.isna() & before.isna())).any(axis=1)
                         
-                        # Update comment
-                        if "comment" in row and row["comment"]:
-                            current_comments[case_label] = str(row["comment"])
-                        elif case_label in current_comments:
-                            # Verwijder lege comments
-                            del current_comments[case_label]
+                        for idx, row in edited_df.loc[changed].iterrows():
+                            case_label = row["case_label"]
+                            
+                            # Update priority
+                            if "priority" in row:
+                                current_priorities[case_label] = bool(row["priority"])
+                            
+                            # Update comment
+                            if "comment" in row and row["comment"]:
+                                current_comments[case_label] = str(row["comment"])
+                            elif case_label in current_comments:
+                                # Verwijder lege comments
+                                del current_comments[case_label]
+                            
+                            # Update status
+                            if "status" in row and row["status"]:
+                                current_status[case_label] = row["status"]
                         
-                        # Update status
-                        if "status" in row and row["status"]:
-                            current_status[case_label] = row["status"]
-                    
-                    # Save to state
-                    state_manager.set("comments", current_comments)
-                    state_manager.set("status_map", current_status)
-                    state_manager.set("priorities", current_priorities)
-                    
-                    # Save to disk
-                    state_manager.save_persistent_state()
-                    st.success("✅ Alle wijzigingen opgeslagen!")
-                    st.rerun()
-            
-            with col_save2:
-                if st.button("🔄 Refresh", use_container_width=True):
-                    st.rerun()
-            
-            # Quick actions
-            with st.expander("⚡ Quick Actions", expanded=False):
-                col_qa1, col_qa2, col_qa3 = st.columns(3)
-                
-                with col_qa1:
-                    if st.button("⭐ Markeer gefilterde als priority"):
-                        current_priorities = state_manager.get("priorities", {})
-                        for case in df_filtered["case_label"]:
-                            current_priorities[case] = True
-                        state_manager.set("priorities", current_priorities)
-                        state_manager.save_persistent_state()
-                        st.success(f"✅ {len(df_filtered)} cases gemarkeerd als priority")
+                        # Save to disk (alleen gewijzigde entries) en state
+                        persist_state_changes(
+                            comments=current_comments,
+                            status_map=current_status,
+                            priorities=current_priorities
+                        )
+                        st.success("✅ Alle wijzigingen opgeslagen!")
                         st.rerun()
                 
-                with col_qa2:
-                    if st.button("📝 Clear alle priority markeringen"):
-                        state_manager.set("priorities", {})
-                        state_manager.save_persistent_state()
-                        st.success("✅ Alle priority markeringen verwijderd")
+                with col_save2:
+                    if st.button("🔄 Refresh", use_container_width=True):
                         st.rerun()
                 
-                with col_qa3:
-                    # Export gefilterde data
-                    buffer = io.BytesIO()
-                    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                        df_filtered.to_excel(writer, sheet_name='Overview', index=False)
-                    buffer.seek(0)
+                # Quick actions
+                with st.expander("⚡ Quick Actions", expanded=False):
+                    col_qa1, col_qa2, col_qa3 = st.columns(3)
                     
-                    st.download_button(
-                        label="📥 Download gefilterde data",
-                        data=buffer.getvalue(),
-                        file_name=f"Overview_filtered_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+                    with col_qa1:
+                        if st.button("⭐ Markeer gefilterde als priority"):
+                            current_priorities = dict(state_manager.get("priorities", {}))
+                            for case in df_filtered["case_label"]:
+                                current_priorities[case] = True
+                            persist_state_changes(priorities=current_priorities)
+                            st.success(f"✅ {len(df_filtered)} cases gemarkeerd als priority")
+                            st.rerun()
+                    
+                    with col_qa2:
+                        if st.button("📝 Clear alle priority markeringen"):
+                            # Verwijder ook markeringen die andere sessies intussen zetten
+                            state_manager.update(state_store.load())
+                            persist_state_changes(priorities={})
+                            st.success("✅ Alle priority markeringen verwijderd")
+                            st.rerun()
+                    
+                    with col_qa3:
+                        # Export gefilterde data, enkel op aanvraag gebouwd
+                        render_export(
+                            "overview",
+                            df_filtered,
+                            view_key,
+                            "📥 Download gefilterde data"
+                        )
+        
+        if active_tab in (tab_names[2], tab_names[3], tab_names[5]):
+            stock_index = shared_stock_index(dataset)
         
-        with tabs[2]:
+        if active_tab == tab_names[2]:
             # Transport tab
-            transport_data = state_manager.get("transport")
-            if transport_data is None:
-                transport_data = pd.DataFrame()
-            
-            stock_data = state_manager.get("df_stock")
-            if stock_data is None:
-                stock_data = pd.DataFrame()
-            
-            render_transport_tab(
-                transport=transport_data,
-                overview=overview,
-                df_stock=stock_data
+            lazy_component("render_transport_tab")(
+                transport=dataset["transport"],
+                overview=overview_with_overlays(overview),
+                df_stock=dataset["df_stock"]
             )
+            render_load_plan(dataset["transport"], overview_with_overlays(overview))
         
-        with tabs[3]:
-            # Forecast tab
-            erp_data = state_manager.get("df_erp")
-            if erp_data is None:
-                erp_data = pd.DataFrame()
-            
-            stock_data_forecast = state_manager.get("df_stock")
-            if stock_data_forecast is None:
-                stock_data_forecast = pd.DataFrame()
-            
-            render_forecast_tab(
-                overview=overview,
-                df_erp=erp_data,
-                df_stock=stock_data_forecast
+        if active_tab == tab_names[3]:
+            # Forecast tab: aggregaten uit de gedeelde, per bestandsversie gecachte forecast
+            try:
+                forecast = get_forecast_store(project_path(config.REPO_DIR, "forecast files")).load()
+            except Exception:
+                logger.exception("Forecast exports niet ingelezen")
+                forecast = None
+            if forecast is not None:
+                state_manager.set("forecast", forecast)
+                render_forecast_summary(forecast)
+            lazy_component("render_forecast_tab")(
+                overview=overview_with_overlays(overview),
+                df_erp=dataset["df_erp"],
+                df_stock=dataset["df_stock"]
             )
         
-        with tabs[4]:
-            # Packed tab
-            render_packed_tab(
+        if active_tab == tab_names[4]:
+            # Packed tab (deelt de packed index met de backlog)
+            try:
+                state_manager.set("packed_index", get_packed_case_index())
+            except Exception:
+                logger.exception("Packed archief niet beschikbaar")
+            lazy_component("render_packed_tab")(
                 repo_dir=config.REPO_DIR,
                 state_manager=state_manager
             )
         
-        with tabs[5]:
+        if active_tab == tab_names[5]:
             # Stock Analyse tab
-            render_stock_analysis_tab(repo_dir=config.REPO_DIR)
+            if stock_index is not None:
+                render_stock_lookup(stock_index)
+            lazy_component("render_stock_analysis_tab")(repo_dir=config.REPO_DIR)
         
-        with tabs[6]:
-            # Kanban rekken indeling
-            render_kanban_tab(repo_dir=config.REPO_DIR)
+        if active_tab == tab_names[6]:
+            # Kanban rekken indeling; bezetting uit de gedeelde rekindex
+            try:
+                # Slots van gepackte cases worden vrijgegeven bij een nieuwe packed index
+                racks = get_rack_occupancy()
+                racks.refresh()
+                state_manager.set("rack_index", racks)
+                render_rack_lookup(racks, overview)
+            except Exception as exc:
+                st.warning(f"Rekindex niet beschikbaar: {exc}")
+            lazy_component("render_kanban_tab")(repo_dir=config.REPO_DIR)
 
-        with tabs[7]:
+        if active_tab == tab_names[7]:
             # Backlog tab
-            st.header("⏰ Backlog")
-            st.write("Backlog op basis van arrival_date en verpakkingstermijn")
-            
-            df_bl = overview.copy()
-            # Alleen rijen met geldige arrival_date
-            if "arrival_date" in df_bl.columns:
-                df_bl = df_bl[pd.notna(df_bl["arrival_date"])].copy()
-            else:
-                df_bl = pd.DataFrame(columns=["case_label", "case_type", "arrival_date", "productielocatie"])
-            
-            # Bepaal termijn in werkdagen volgens specifieke regels
-            def _term_for(ct: str) -> int:
-                s = str(ct or "").strip().upper()
-                
-                if s.startswith("C"):
-                    number_str = s[1:].strip()
-                    try:
-                        number = int(number_str)
-                        if 100 <= number <= 998:
-                            return 1  # C kisten 100-998: 1 dag
-                        elif number == 999:
-                            return 10  # C kisten 999: 10 dagen
-                    except (ValueError, IndexError):
-                        pass
-                    return 0
-                
-                elif s.startswith("K"):
-                    number_str = s[1:].strip()
-                    try:
-                        number = int(number_str)
-                        if 1 <= number <= 99:
-                            return 10  # K kisten 1-99: 10 dagen
-                        elif 100 <= number <= 999:
-                            return 3   # K kisten 100-999: 3 dagen
-                    except (ValueError, IndexError):
-                        pass
-                    return 0
-                
-                return 0
-            
-            df_bl["term_werkdagen"] = df_bl["case_type"].map(_term_for).astype(int)
-            
-            # Helper: tel werkdagen op bij een datum
-            def _add_business_days(start: pd.Timestamp, days: int) -> pd.Timestamp:
-                d = pd.to_datetime(start, errors="coerce")
-                if pd.isna(d) or days <= 0:
-                    return d
-                count = 0
-                while count < days:
-                    d += pd.Timedelta(days=1)
-                    if d.weekday() < 5:  # ma-vr
-                        count += 1
-                return d
-            
-            df_bl["deadline"] = df_bl.apply(lambda r: _add_business_days(r.get("arrival_date"), int(r.get("term_werkdagen", 0))), axis=1)
-            today = pd.Timestamp.today().normalize()
-            df_bl["dagen_te_laat"] = (today - pd.to_datetime(df_bl["deadline"], errors="coerce")).dt.days
-            
-            # Bereken dagen in Willebroek (PAC3PL)
-            df_bl["dagen_in_willebroek"] = 0
-            if "locatie" in df_bl.columns:
-                # Als case in Willebroek staat, bereken dagen sinds arrival_date
-                mask_in_wlb = df_bl["locatie"].str.upper() == "PAC3PL"
-                df_bl.loc[mask_in_wlb, "dagen_in_willebroek"] = (
-                    today - pd.to_datetime(df_bl.loc[mask_in_wlb, "arrival_date"], errors="coerce")
-                ).dt.days
-            
-            df_bl = df_bl[df_bl["dagen_te_laat"] > 0].copy()
-            
-            # Sluit reeds gepackte cases uit adhv archief
-            try:
-                from scripts.build_overview import load_packed_archive
-                packed_hist = load_packed_archive()
-                if not packed_hist.empty and "case_label" in packed_hist.columns:
-                    already_packed = set(packed_hist["case_label"].astype(str).str.strip().tolist())
-                    df_bl = df_bl[~df_bl["case_label"].astype(str).str.strip().isin(already_packed)]
-            except Exception:
-                pass
-            
-            # UI: metrics
-            c1, c2, c3 = st.columns(3)
-            
-            k_cases_with_deadline = 0
-            c_cases_with_deadline = 0
-            
-            for _, row in df_bl.iterrows():
-                case_type = str(row.get("case_type", "")).strip().upper()
-                
-                if case_type.startswith("K"):
-                    number_str = case_type[1:].strip()
-                    try:
-                        number = int(number_str)
-                        if 1 <= number <= 99 or 100 <= number <= 999:
-                            k_cases_with_deadline += 1
-                    except (ValueError, IndexError):
-                        pass
-                elif case_type.startswith("C"):
-                    number_str = case_type[1:].strip()
-                    try:
-                        number = int(number_str)
-                        if 100 <= number <= 998 or number == 999:
-                            c_cases_with_deadline += 1
-                    except (ValueError, IndexError):
-                        pass
-            
-            with c1:
-                st.metric("Backlog K", k_cases_with_deadline)
-                st.caption("K1-99 (10d), K100-999 (3d)")
-            with c2:
-                st.metric("Backlog C", c_cases_with_deadline)
-                st.caption("C100-998 (1d), C999 (10d)")
-            with c3:
-                st.metric("Total Overdue", len(df_bl))
-            
-            # Zoekfunctie
-            search_bl = st.text_input("🔍 Zoek case_label of case_type", key="search_backlog")
-            
-            if search_bl:
-                df_bl = df_bl[
-                    df_bl["case_label"].astype(str).str.contains(search_bl, case=False, na=False) |
-                    df_bl["case_type"].astype(str).str.contains(search_bl, case=False, na=False)
-                ]
-            
-            # Sorteer op dagen te laat (meest urgent eerst)
-            df_bl = df_bl.sort_values("dagen_te_laat", ascending=False)
-            
-            # Toon tabel met dagen in Willebroek
-            display_cols = ["case_label", "case_type", "arrival_date", "deadline", "dagen_te_laat", "dagen_in_willebroek", "locatie", "productielocatie"]
-            display_cols = [c for c in display_cols if c in df_bl.columns]
-            
-            st.dataframe(
-                df_bl[display_cols],
-                use_container_width=True,
-                hide_index=True,
-                column_config={
-                    "case_label": st.column_config.TextColumn("Case Label", width="medium"),
-                    "case_type": st.column_config.TextColumn("Type", width="small"),
-                    "arrival_date": st.column_config.DateColumn("Arrival", format="DD/MM/YYYY"),
-                    "deadline": st.column_config.DateColumn("Deadline", format="DD/MM/YYYY"),
-                    "dagen_te_laat": st.column_config.NumberColumn("Dagen Te Laat", format="%d"),
-                    "dagen_in_willebroek": st.column_config.NumberColumn("Dagen in WLB", format="%d", help="Aantal dagen dat case in Willebroek (PAC3PL) staat"),
-                    "locatie": st.column_config.TextColumn("Locatie", width="small"),
-                    "productielocatie": st.column_config.TextColumn("Productie", width="small")
-                }
-            )
-            
-            # Download button
-            if not df_bl.empty:
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                    df_bl[display_cols].to_excel(writer, index=False, sheet_name='Backlog')
-                
-                st.download_button(
-                    label="📥 Download Backlog",
-                    data=buffer.getvalue(),
-                    file_name=f"Backlog_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            with profiler.stage("tab:backlog"):
+                st.header("⏰ Backlog")
+                st.write("Backlog op basis van arrival_date en verpakkingstermijn")
+                
+                # Termijnen, deadlines en dagen te laat in één gevectoriseerde stap;
+                # de backlog van een snapshot van vandaag is al berekend
+                if dataset.extras.get("backlog_date") == date.today().isoformat() and "backlog" in dataset.frames:
+                    df_bl = dataset["backlog"]
+                else:
+                    df_bl = compute_backlog(
+                        overview,
+                        extra_holidays=getattr(config, "EXTRA_HOLIDAYS", ()),
+                        excluded_holidays=getattr(config, "WORKED_HOLIDAYS", ())
+                    )
+                
+                # Sluit reeds gepackte cases uit adhv archief
+                packed_hash = None
+                try:
+                    packed = get_packed_case_index()
+                    df_bl = packed.exclude_packed(df_bl)
+                    packed_hash = packed.content_hash
+                except Exception:
+                    logger.exception("Packed archief niet beschikbaar; backlog zonder uitsluiting")
+                
+                # UI: metrics
+                c1, c2, c3 = st.columns(3)
+                
+                counts = backlog_counts(df_bl)
+                
+                with c1:
+                    st.metric("Backlog K", counts["K"])
+                    st.caption("K1-99 (10d), K100-999 (3d)")
+                with c2:
+                    st.metric("Backlog C", counts["C"])
+                    st.caption("C100-998 (1d), C999 (10d)")
+                with c3:
+                    st.metric("Total Overdue", counts["total"])
+                
+                # Zoekfunctie
+                search_bl = st.text_input("🔍 Zoek case_label of case_type", key="search_backlog")
+                
+                if search_bl:
+                    df_bl = df_bl[
+                        df_bl["case_label"].astype(str).str.contains(search_bl, case=False, na=False) |
+                        df_bl["case_type"].astype(str).str.contains(search_bl, case=False, na=False)
+                    ]
+                
+                # Toon tabel met dagen in Willebroek
+                display_cols = ["case_label", "case_type", "arrival_date", "deadline", "dagen_te_laat", "dagen_in_willebroek", "locatie", "productielocatie"]
+                display_cols = [c for c in display_cols if c in df_bl.columns]
+                
+                # Sorteren en pagineren server-side (standaard meest urgent eerst)
+                page_bl = render_pager("backlog", df_bl, display_cols, default_sort="dagen_te_laat", ascending=False)
+                
+                st.dataframe(
+                    page_bl.frame,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "case_label": st.column_config.TextColumn("Case Label", width="medium"),
+                        "case_type": st.column_config.TextColumn("Type", width="small"),
+                        "arrival_date": st.column_config.DateColumn("Arrival", format="DD/MM/YYYY"),
+                        "deadline": st.column_config.DateColumn("Deadline", format="DD/MM/YYYY"),
+                        "dagen_te_laat": st.column_config.NumberColumn("Dagen Te Laat", format="%d"),
+                        "dagen_in_willebroek": st.column_config.NumberColumn("Dagen in WLB", format="%d", help="Aantal dagen dat case in Willebroek (PAC3PL) staat"),
+                        "locatie": st.column_config.TextColumn("Locatie", width="small"),
+                        "productielocatie": st.column_config.TextColumn("Productie", width="small")
+                    }
                 )
-
+                
+                # Download, enkel op aanvraag gebouwd
+                if not df_bl.empty:
+                    render_export(
+                        "backlog",
+                        lambda: df_bl.sort_values("dagen_te_laat", ascending=False)[display_cols],
+                        filter_key(
+                            dataset=dataset.version,
+                            day=date.today(),
+                            packed=packed_hash,
+                            search=search_bl,
+                            columns=display_cols
+                        ),
+                        "📥 Download Backlog"
+                    )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,113 @@
+"""Incrementele overview build tegenover een volledige rebuild."""
+
+import pandas as pd
+import pytest
+
+from atlas.incremental import IncrementalOverview
+
+
+def build_overview(df_pils, df_erp, df_stock=None, comments_map=None):
+    """Toy build that depends on item and kist groups, like the real builder."""
+    comments_map = comments_map or {}
+    overview = pd.DataFrame({
+        "case_label": df_pils["Case"].str.strip(),
+        "case_type": df_pils["Case Type"].str.strip(),
+        "item_number": df_pils["Item number"].str.strip(),
+    }).reset_index(drop=True)
+    locations = df_erp.assign(kistnummer=df_erp["kistnummer"].str.strip()).drop_duplicates("kistnummer")
+    overview["productielocatie"] = overview["case_type"].map(locations.set_index("kistnummer")["productielocatie"])
+    stock = df_stock.groupby(df_stock["Item number"].str.strip())["Inventory"].sum()
+    # Stock per item toewijzen in PILS volgorde
+    overview["allocated"] = overview.groupby("item_number").cumcount() < overview["item_number"].map(stock).fillna(0)
+    overview["kist_count"] = overview.groupby("case_type")["case_label"].transform("size")
+    overview["comment"] = overview["case_label"].map(comments_map).fillna("")
+    transport = overview.loc[overview["productielocatie"] == "GENK", ["case_label", "case_type"]].reset_index(drop=True)
+    return overview, transport
+
+
+def pils(rows):
+    return pd.DataFrame(
+        [(f"{i:09d}", case, case_type, item) for i, (case, case_type, item) in enumerate(rows)],
+        columns=["Packing Number", "Case", "Case Type", "Item number"],
+    )
+
+
+def erp(locations):
+    return pd.DataFrame({"kistnummer": list(locations), "productielocatie": list(locations.values())})
+
+
+def stock(quantities):
+    return pd.DataFrame({
+        "Item number": pd.Series([f"{item}     " for item in quantities], dtype="string"),
+        "site": "Genk",
+        "Inventory": pd.Series(list(quantities.values()), dtype="int64"),
+    })
+
+
+def assert_same(builder, df_pils, df_erp, df_stock, comments=None):
+    overview, transport = builder.build(df_pils, df_erp, df_stock, comments)
+    full_overview, full_transport = build_overview(df_pils, df_erp, df_stock, comments)
+    pd.testing.assert_frame_equal(overview, full_overview)
+    pd.testing.assert_frame_equal(transport, full_transport)
+    return builder.last_stats
+
+
+def test_incremental_matches_full_rebuild_over_edit_sequence():
+    builder = IncrementalOverview(build_overview, probe_groups=3, max_changed_ratio=1.0)
+    rows = [(f"A{i}", f"K{i % 4}", f"T{i % 6}") for i in range(24)]
+    locations = {"K0": "GENK", "K1": "WILRIJK", "K2": "GENK", "K3": "WILRIJK"}
+    quantities = {"T0": 2, "T1": 1, "T2": 3, "T9": 0}
+
+    assert assert_same(builder, pils(rows), erp(locations), stock(quantities))["mode"] == "full"
+
+    steps = []
+    # A0 verhuist van T0 naar T9: A6 (ook T0) krijgt de vrijgekomen stock
+    rows = [("A0", "K0", "T9"), *rows[1:]]
+    steps.append((rows, locations, quantities, {}))
+    rows = [*rows, ("A24", "K1", "T1")]
+    steps.append((rows, locations, quantities, {}))
+    rows = [r for r in rows if r[0] != "A7"]
+    steps.append((rows, locations, quantities, {}))
+    rows = [(case, "K3" if case == "A5" else kist, item) for case, kist, item in rows]
+    steps.append((rows, locations, quantities, {}))
+    locations = {**locations, "K1": "GENK"}
+    steps.append((rows, locations, quantities, {}))
+    quantities = {**quantities, "T2": 0, "T9": 1}
+    steps.append((rows, locations, quantities, {}))
+    steps.append((rows, locations, quantities, {"A3": "dringend"}))
+    steps.append((rows, locations, quantities, {}))
+
+    modes = []
+    for step_rows, step_locations, step_quantities, comments in steps:
+        stats = assert_same(builder, pils(step_rows), erp(step_locations), stock(step_quantities), comments)
+        modes.append(stats["mode"])
+    assert "incremental" in modes
+
+
+def test_item_move_reallocates_stock_of_other_cases():
+    builder = IncrementalOverview(build_overview, max_changed_ratio=1.0)
+    rows = [("A0", "K0", "T1"), ("A1", "K1", "T1"), ("A2", "K2", "T2"), ("A3", "K3", "T3")]
+    locations = {"K0": "GENK", "K1": "GENK", "K2": "GENK", "K3": "GENK"}
+    assert_same(builder, pils(rows), erp(locations), stock({"T1": 1}))
+
+    rows[0] = ("A0", "K0", "T9")
+    stats = assert_same(builder, pils(rows), erp(locations), stock({"T1": 1}))
+    assert stats["mode"] == "incremental"
+
+
+def test_build_that_is_not_per_group_stays_full():
+    def global_build(df_pils, df_erp, df_stock=None, comments_map=None):
+        overview, transport = build_overview(df_pils, df_erp, df_stock, comments_map)
+        overview["position"] = range(len(overview))
+        return overview, transport
+
+    builder = IncrementalOverview(global_build, max_changed_ratio=1.0)
+    rows = [(f"A{i}", f"K{i}", f"T{i}") for i in range(10)]
+    locations = {f"K{i}": "GENK" for i in range(10)}
+    builder.build(pils(rows), erp(locations), stock({}))
+    assert not builder._patchable
+
+    overview, _ = builder.build(pils(rows[1:]), erp(locations), stock({}))
+    expected, _ = global_build(pils(rows[1:]), erp(locations), stock({}))
+    pd.testing.assert_frame_equal(overview, expected)
+    assert builder.last_stats["mode"] == "full"